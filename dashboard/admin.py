@@ -1,5 +1,16 @@
-from django.contrib import admin
-from .models import User, Warehouse, Store, Role, Product, OrderFulfillment, UserWarehouseRole
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Q
+
+from .models import (
+    User, Warehouse, Store, Role, Product, OrderFulfillment, UserWarehouseRole, OrderStatusEvent,
+    DeletionJob, Job, JobSchedule, ShippingLabel, ProductThumbnail, WebhookSubscription, WebhookDelivery,
+    InventoryMovement, InventoryLevel, Bin, PickWave, AuditEntry,
+)
+from . import inventory
+from .pagination import EstimatedCountPaginator
+from .transitions import bulk_transition
 
 # Register your models here so you can see them in the admin panel.
 
@@ -22,6 +33,7 @@ class StoreAdmin(admin.ModelAdmin):
     list_display = ('store_name', 'warehouse', 'store_type', 'is_active')
     search_fields = ('store_name', 'warehouse__name')
     list_filter = ('is_active', 'store_type', 'warehouse')
+    ordering = ('store_name',)
 
 class RoleAdmin(admin.ModelAdmin):
     list_display = ('name', 'get_name_display')
@@ -29,12 +41,253 @@ class RoleAdmin(admin.ModelAdmin):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('product_name', 'code', 'code_type', 'minimum_price')
     search_fields = ('product_name', 'code')
+    ordering = ('product_name',)
     list_filter = ('code_type',)
 
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Sidebar filter on a foreign key that searches through the admin's
+    autocomplete view instead of listing every related row. The related
+    model's admin needs search_fields.
+    """
+    template = 'admin/dashboard/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f'{self.field_name}__id__exact'
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field(self.field_name)
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.related_model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'parameter_name': self.parameter_name,
+            'widget': self.form_field.widget.render(
+                self.parameter_name, self.value(), attrs={'id': f'filter_{self.parameter_name}'},
+            ),
+            'clear_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+class StoreFilter(AutocompleteFilter):
+    title = 'store'
+    field_name = 'store'
+
+class ProductFilter(AutocompleteFilter):
+    title = 'product'
+    field_name = 'product'
+
 class OrderFulfillmentAdmin(admin.ModelAdmin):
+    # Sized for millions of orders: estimated page counts, one joined query
+    # for the list, related-row filters that search instead of listing every
+    # store/product, and a search box that only does indexed exact matches.
     list_display = ('id', 'product', 'store', 'quantity', 'status', 'created_at')
-    search_fields = ('product__product_name', 'store__store_name', 'amazon_order_id')
-    list_filter = ('status', 'store', 'expected_delivery_date')
+    list_select_related = ('product', 'store__warehouse')
+    list_filter = ('status', StoreFilter, ProductFilter, 'expected_delivery_date')
+    search_fields = ('=amazon_order_id',)
+    search_help_text = "Exact order #, Amazon order ID, tracker ID or product code."
+    autocomplete_fields = ('store', 'product')
+    raw_id_fields = ('created_by', 'action_taken_by')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['mark_delivered', 'mark_out_of_stock', 'mark_ready_to_ship', 'mark_completed']
+
+    @property
+    def media(self):
+        field = OrderFulfillment._meta.get_field('store')
+        return super().media + AutocompleteSelect(field, self.admin_site).media
+
+    def get_search_results(self, request, queryset, search_term):
+        # icontains across joins can't use an index; match the indexed
+        # columns exactly instead (see OrderFulfillment.Meta.indexes).
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        match = (
+            Q(amazon_order_id=term) | Q(tracker_id=term) |
+            Q(product__in=Product.objects.filter(code=term))
+        )
+        if term.isdigit():
+            match |= Q(pk=int(term))
+        return queryset.filter(match), False
+
+    # --- Bulk status actions (one UPDATE + one event INSERT each) ---
+
+    def _bulk_transition(self, request, queryset, status):
+        moved = bulk_transition(queryset, status, request.user)
+        label = dict(OrderFulfillment.STATUS_CHOICES)[status]
+        self.message_user(request, f"{moved} order(s) marked as {label}.", messages.SUCCESS)
+
+    @admin.action(description="Mark selected orders as Delivered to Warehouse", permissions=['change'])
+    def mark_delivered(self, request, queryset):
+        self._bulk_transition(request, queryset, 'delivered')
+
+    @admin.action(description="Mark selected orders as Out of Stock", permissions=['change'])
+    def mark_out_of_stock(self, request, queryset):
+        self._bulk_transition(request, queryset, 'out_of_stock')
+
+    @admin.action(description="Mark selected orders as Ready to Ship", permissions=['change'])
+    def mark_ready_to_ship(self, request, queryset):
+        self._bulk_transition(request, queryset, 'ready_to_ship')
+
+    @admin.action(description="Mark selected orders as Completed", permissions=['change'])
+    def mark_completed(self, request, queryset):
+        self._bulk_transition(request, queryset, 'completed')
+
+class OrderStatusEventAdmin(admin.ModelAdmin):
+    # Append-only history: viewable, never editable.
+    list_display = ('order', 'previous_status', 'status', 'warehouse', 'actor', 'at')
+    list_filter = ('status',)
+    list_select_related = ('order__product', 'warehouse', 'actor')
+    raw_id_fields = ('order',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class DeletionJobAdmin(admin.ModelAdmin):
+    # Progress of background warehouse/store purges; written only by the job.
+    list_display = ('object_repr', 'status', 'rows_processed', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = [f.name for f in DeletionJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'progress_done', 'progress_total', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('attempts', 'locked_by', 'heartbeat_at', 'started_at', 'finished_at', 'error')
+
+class ShippingLabelAdmin(admin.ModelAdmin):
+    # Local label copies; written by the fetch_labels job.
+    list_display = ('order', 'status', 'content_type', 'size', 'fetched_at')
+    list_filter = ('status',)
+    list_select_related = ('order__product',)
+    raw_id_fields = ('order',)
+    readonly_fields = ('sha256', 'content_type', 'size', 'fetched_at', 'error')
+
+class ProductThumbnailAdmin(admin.ModelAdmin):
+    # Generated by the generate_thumbnails job.
+    list_display = ('product', 'status', 'size', 'generated_at')
+    list_filter = ('status',)
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+    readonly_fields = ('source_sha256', 'size', 'generated_at', 'error')
+
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'url', 'warehouse', 'statuses', 'is_active')
+    list_filter = ('is_active',)
+
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    # Outbox rows; written by transitions.py and the deliver_webhooks job.
+    list_display = ('event', 'subscription', 'status', 'attempts', 'next_attempt_at', 'delivered_at')
+    list_filter = ('status', 'subscription')
+    list_select_related = ('event', 'subscription')
+    raw_id_fields = ('event',)
+    readonly_fields = ('attempts', 'last_error', 'delivered_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+class BinAdmin(admin.ModelAdmin):
+    # `occupied` is kept by dashboard/putaway.py; fix drift with `manage.py recount_bins`.
+    list_display = ('code', 'warehouse', 'zone', 'sequence', 'capacity', 'occupied', 'is_active')
+    list_filter = ('warehouse', 'is_active', 'zone')
+    list_select_related = ('warehouse',)
+    search_fields = ('code',)
+    ordering = ('warehouse', 'sequence', 'code')
+    readonly_fields = ('occupied',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+class PickWaveAdmin(admin.ModelAdmin):
+    # Planned from the Ready To Shipment page (dashboard/waves.py).
+    list_display = ('id', 'warehouse', 'status', 'order_count', 'unit_count', 'created_by', 'created_at', 'completed_at')
+    list_filter = ('status', 'warehouse')
+    list_select_related = ('warehouse', 'created_by')
+    readonly_fields = ('order_count', 'unit_count', 'created_by', 'completed_by', 'completed_at')
+
+    def has_add_permission(self, request):
+        return False
+
+class InventoryMovementAdmin(admin.ModelAdmin):
+    # The stock ledger: append-only. Adding a row here records a manual
+    # adjustment and updates the on-hand level with it.
+    list_display = ('at', 'product', 'warehouse', 'quantity', 'reason', 'order', 'actor')
+    list_filter = ('reason', 'warehouse')
+    list_select_related = ('product', 'warehouse', 'actor')
+    fields = ('product', 'warehouse', 'quantity')
+    raw_id_fields = ('product', 'order')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        movement = inventory.adjust(obj.product, obj.warehouse, obj.quantity, user=request.user)
+        obj.pk = movement.pk
+
+class InventoryLevelAdmin(admin.ModelAdmin):
+    # Running totals of the ledger; fixed with `manage.py reconcile_inventory`.
+    list_display = ('product', 'warehouse', 'on_hand', 'updated_at')
+    list_filter = ('warehouse',)
+    list_select_related = ('product', 'warehouse')
+    search_fields = ('product__code',)
+    readonly_fields = ('product', 'warehouse', 'on_hand', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+class AuditEntryAdmin(admin.ModelAdmin):
+    # Written by dashboard/audit.py; read-only. Filter one object's history
+    # with ?content_type__id__exact=<id>&object_id=<pk>.
+    list_display = ('at', 'action', 'content_type', 'object_id', 'actor', 'changes')
+    list_filter = ('action', 'content_type')
+    list_select_related = ('content_type', 'actor')
+    readonly_fields = ('at', 'action', 'content_type', 'object_id', 'actor', 'changes')
+    raw_id_fields = ('actor',)
+    ordering = ('-at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class JobScheduleAdmin(admin.ModelAdmin):
+    # Rows are overwritten from settings.JOB_SCHEDULES whenever workers start.
+    list_display = ('name', 'job_name', 'interval_seconds', 'next_run_at', 'enabled')
 
 # Register all models
 admin.site.register(User, UserAdmin)
@@ -44,4 +297,16 @@ admin.site.register(Role, RoleAdmin) # <-- This is the important one
 admin.site.register(Product, ProductAdmin)
 admin.site.register(OrderFulfillment, OrderFulfillmentAdmin)
 admin.site.register(UserWarehouseRole)
-
+admin.site.register(OrderStatusEvent, OrderStatusEventAdmin)
+admin.site.register(DeletionJob, DeletionJobAdmin)
+admin.site.register(Job, JobAdmin)
+admin.site.register(JobSchedule, JobScheduleAdmin)
+admin.site.register(ShippingLabel, ShippingLabelAdmin)
+admin.site.register(ProductThumbnail, ProductThumbnailAdmin)
+admin.site.register(WebhookSubscription, WebhookSubscriptionAdmin)
+admin.site.register(WebhookDelivery, WebhookDeliveryAdmin)
+admin.site.register(InventoryMovement, InventoryMovementAdmin)
+admin.site.register(InventoryLevel, InventoryLevelAdmin)
+admin.site.register(Bin, BinAdmin)
+admin.site.register(PickWave, PickWaveAdmin)
+admin.site.register(AuditEntry, AuditEntryAdmin)
@@ -0,0 +1,197 @@
+from itertools import islice
+
+import numpy as np
+from django.db.models import Case, FloatField, Func, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import OrderFulfillment, OrderStatusEvent
+
+# ---------------------------------
+# VECTORISED FULFILLMENT ANALYTICS
+# ---------------------------------
+# Orders and status events are pulled as one values_list() stream each,
+# with timestamps/enums already converted to numbers by the database, and
+# packed into NumPy column arrays. Everything after extraction is array maths.
+
+STATUSES = [code for code, _ in OrderFulfillment.STATUS_CHOICES]
+STATUS_LABELS = dict(OrderFulfillment.STATUS_CHOICES)
+STATUS_INDEX = {code: i for i, code in enumerate(STATUSES)}
+
+SECONDS_PER_DAY = 86400.0
+CHUNK_SIZE = 100_000
+
+
+class Epoch(Func):
+    """Seconds since 1970-01-01 UTC as a float (PostgreSQL)."""
+    template = 'CAST(EXTRACT(EPOCH FROM %(expressions)s) AS double precision)'
+    output_field = FloatField()
+
+
+def _status_code(field='status'):
+    return Case(
+        *[When(**{field: code}, then=Value(i)) for code, i in STATUS_INDEX.items()],
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+
+
+def _columns(rows, names, dtypes):
+    """Drain a values_list iterator into one NumPy array per column."""
+    # Rows go straight into a record array, so ids and counts never pass
+    # through float64; None -> NaN for the float columns (ints are
+    # Coalesced in SQL).
+    record = np.dtype(list(zip(names, dtypes)))
+    chunks = []
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=record))
+    block = np.concatenate(chunks) if chunks else np.empty(0, dtype=record)
+    return {name: np.ascontiguousarray(block[name]) for name in names}
+
+
+def extract_orders(queryset=None):
+    queryset = OrderFulfillment.objects.all() if queryset is None else queryset
+    names = ('id', 'status', 'created', 'actioned', 'store', 'warehouse', 'product', 'quantity', 'expected')
+    dtypes = (np.int64, np.int8, np.float64, np.float64, np.int64, np.int64, np.int64, np.int32, np.float64)
+    rows = queryset.order_by().values_list(
+        'id',
+        _status_code(),
+        Epoch('created_at'),
+        Epoch('action_taken_at'),
+        Coalesce('store_id', Value(-1)),
+        Coalesce('store__warehouse_id', Value(-1)),
+        Coalesce('product_id', Value(-1)),
+        'quantity',
+        Epoch('expected_delivery_date'),
+    ).iterator(chunk_size=CHUNK_SIZE)
+    return _columns(rows, names, dtypes)
+
+
+def extract_events(queryset=None):
+    """Status events sorted by (order, at), which the (order, at) index serves directly."""
+    queryset = OrderStatusEvent.objects.all() if queryset is None else queryset
+    names = ('order', 'status', 'at')
+    dtypes = (np.int64, np.int8, np.float64)
+    rows = queryset.order_by('order_id', 'at').values_list(
+        'order_id', _status_code(), Epoch('at'),
+    ).iterator(chunk_size=CHUNK_SIZE)
+    return _columns(rows, names, dtypes)
+
+
+def _sorted_events(events):
+    order_ids, status, at = events['order'], events['status'], events['at']
+    d_order = np.diff(order_ids)
+    if np.any(d_order < 0) or np.any((d_order == 0) & (np.diff(at) < 0)):
+        order = np.lexsort((at, order_ids))
+        return order_ids[order], status[order], at[order]
+    return order_ids, status, at
+
+
+def dwell_percentiles(events, percentiles=(50, 90, 95)):
+    """
+    Hours spent in each status before the next event, as
+    {status: {'count': n, 'p50': h, ...}}. Open stages are ignored.
+    """
+    order_ids, status, at = _sorted_events(events)
+    same_order = order_ids[1:] == order_ids[:-1]
+    dwell = (at[1:] - at[:-1])[same_order] / 3600.0
+    stage = status[:-1][same_order]
+
+    result = {}
+    for code, i in STATUS_INDEX.items():
+        hours = dwell[stage == i]
+        if not hours.size:
+            continue
+        values = np.percentile(hours, percentiles)
+        result[code] = {'count': int(hours.size), **{f'p{p}': float(v) for p, v in zip(percentiles, values)}}
+    return result
+
+
+def late_delivery_rates(orders, events):
+    """
+    Share of orders whose first 'delivered' event came after the end of
+    their expected_delivery_date, overall and per warehouse.
+    """
+    order_ids, status, at = _sorted_events(events)
+    delivered = status == STATUS_INDEX['delivered']
+    first_ids, first_idx = np.unique(order_ids[delivered], return_index=True)
+    delivered_at = at[delivered][first_idx]
+
+    # Line the delivered orders up with their order row (ids are unique).
+    by_id = np.argsort(orders['id'])
+    pos = np.searchsorted(orders['id'], first_ids, sorter=by_id)
+    pos = np.clip(pos, 0, max(len(by_id) - 1, 0))
+    known = (orders['id'][by_id[pos]] == first_ids) if len(by_id) else np.zeros(0, bool)
+    rows = by_id[pos[known]]
+    delivered_at = delivered_at[known]
+
+    expected = orders['expected'][rows]
+    has_date = ~np.isnan(expected)
+    late = delivered_at[has_date] > expected[has_date] + SECONDS_PER_DAY
+    warehouse = orders['warehouse'][rows][has_date]
+
+    per_warehouse = {}
+    if warehouse.size:
+        keys, inverse = np.unique(warehouse, return_inverse=True)
+        totals = np.bincount(inverse)
+        lates = np.bincount(inverse, weights=late)
+        per_warehouse = {
+            int(k): {'orders': int(t), 'late': int(l), 'rate': float(l / t)}
+            for k, t, l in zip(keys, totals, lates)
+        }
+    return {
+        'orders': int(late.size),
+        'late': int(late.sum()),
+        'rate': float(late.mean()) if late.size else 0.0,
+        'per_warehouse': per_warehouse,
+    }
+
+
+def out_of_stock_rates(orders, min_orders=1, limit=20):
+    """Products ranked by out-of-stock count, with their OOS rate."""
+    has_product = orders['product'] >= 0
+    product = orders['product'][has_product]
+    if not product.size:
+        return []
+    is_oos = orders['status'][has_product] == STATUS_INDEX['out_of_stock']
+    keys, inverse = np.unique(product, return_inverse=True)
+    totals = np.bincount(inverse)
+    oos = np.bincount(inverse, weights=is_oos)
+
+    eligible = (totals >= min_orders) & (oos > 0)
+    ranked = np.lexsort((-(oos / np.maximum(totals, 1)), -oos))
+    ranked = ranked[eligible[ranked]][:limit]
+    return [
+        {'product_id': int(keys[i]), 'orders': int(totals[i]), 'out_of_stock': int(oos[i]), 'rate': float(oos[i] / totals[i])}
+        for i in ranked
+    ]
+
+
+def store_throughput(orders, since_epoch, until_epoch, limit=20):
+    """Completed orders and units per store per day within the window."""
+    window = (
+        (orders['status'] == STATUS_INDEX['completed'])
+        & (orders['actioned'] >= since_epoch)
+        & (orders['actioned'] < until_epoch)
+        & (orders['store'] >= 0)
+    )
+    store = orders['store'][window]
+    if not store.size:
+        return []
+    days = max((until_epoch - since_epoch) / SECONDS_PER_DAY, 1.0)
+    keys, inverse = np.unique(store, return_inverse=True)
+    shipped = np.bincount(inverse)
+    units = np.bincount(inverse, weights=orders['quantity'][window])
+    ranked = np.argsort(-units, kind='stable')[:limit]
+    return [
+        {
+            'store_id': int(keys[i]),
+            'shipped': int(shipped[i]),
+            'units': int(units[i]),
+            'orders_per_day': float(shipped[i] / days),
+            'units_per_day': float(units[i] / days),
+        }
+        for i in ranked
+    ]
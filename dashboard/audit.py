@@ -0,0 +1,185 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import AuditEntry, Product, Store, User, UserWarehouseRole, Warehouse
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------
+# AUDIT LOG
+# ---------------------------------
+# Saves and deletes of the audited models are turned into AuditEntry rows
+# by the receivers in signals.py: every instance keeps a snapshot of its
+# field values from when it was loaded (post_init), so an update's diff is
+# computed in memory without re-reading the row. Nothing is written on the
+# save path itself. An entry joins the current batch once its transaction
+# commits (rolled-back changes never get there), and AuditMiddleware writes
+# the whole request's batch with one multi-row INSERT after the view has
+# run. Outside a request (jobs, commands) each committed entry is written
+# on its own. QuerySet.update() and bulk_create() send no signals; code
+# that uses them on audited models calls record_bulk() itself.
+
+# Audited model -> fields left out of the diff (bookkeeping, not edits)
+AUDITED_MODELS = {
+    Product: {'change_seq', 'updated_at'},
+    Store: {'change_seq', 'updated_at'},
+    Warehouse: set(),
+    User: {'last_login'},
+    UserWarehouseRole: set(),
+}
+# Stored as "changed" markers, never as values
+REDACTED_FIELDS = {'password'}
+REDACTED = '***'
+
+_fields = {}
+_batch = ContextVar('audit_batch', default=None)
+
+
+def audited_fields(model):
+    if model not in _fields:
+        _fields[model] = [
+            field.attname for field in model._meta.concrete_fields
+            if field.name not in AUDITED_MODELS[model]
+        ]
+    return _fields[model]
+
+
+def values(instance):
+    """The instance's audited field values that are loaded (deferred ones are skipped)."""
+    loaded = instance.__dict__
+    return {name: loaded[name] for name in audited_fields(type(instance)) if name in loaded}
+
+
+def _redact(name, value):
+    return REDACTED if name in REDACTED_FIELDS and value else value
+
+
+def diff(old, new):
+    """{field: [old, new]} for the fields whose value changed."""
+    return {
+        name: [_redact(name, old[name]), _redact(name, value)]
+        for name, value in new.items()
+        if name in old and old[name] != value
+    }
+
+
+def snapshot(instance):
+    # A plain copy is cheapest on load; diff() only looks at audited fields
+    instance._audit_values = instance.__dict__.copy()
+
+
+# --- Recording ---
+
+class Batch:
+    """Entries of one request, written together by flush()."""
+
+    def __init__(self, get_actor=None):
+        self.get_actor = get_actor
+        self.entries = []
+        self.closed = False
+
+    def actor_id(self):
+        user = self.get_actor() if self.get_actor else None
+        return user.pk if user is not None and user.is_authenticated else None
+
+
+def _committed(entry, batch):
+    if batch is not None and not batch.closed:
+        batch.entries.append(entry)
+        return
+    try:
+        entry.save()
+    except DatabaseError:
+        logger.exception("Could not write audit entry for %s #%s", entry.content_type_id, entry.object_id)
+
+
+def record(model, object_id, action, changes, using=None):
+    """Queue one entry; it is kept only if the current transaction commits."""
+    batch = _batch.get()
+    entry = AuditEntry(
+        content_type=ContentType.objects.get_for_model(model),
+        object_id=object_id,
+        action=action,
+        changes=changes,
+        actor_id=batch.actor_id() if batch else None,
+        at=timezone.now(),
+    )
+    transaction.on_commit(partial(_committed, entry, batch), using=using)
+
+
+def record_saved(instance, created, using=None):
+    new = values(instance)
+    if created:
+        changes = {name: _redact(name, value) for name, value in new.items() if value not in (None, '')}
+    else:
+        changes = diff(getattr(instance, '_audit_values', {}), new)
+    instance._audit_values = new
+    if changes:
+        record(type(instance), instance.pk, 'create' if created else 'update', changes, using)
+
+
+def record_deleted(instance, using=None):
+    changes = {name: _redact(name, value) for name, value in values(instance).items() if value not in (None, '')}
+    record(type(instance), instance.pk, 'delete', changes, using)
+
+
+def record_bulk(model, rows, action, using=None):
+    """Entries for writes that bypass signals; `rows` yields (object_id, changes)."""
+    for object_id, changes in rows:
+        record(model, object_id, action, changes, using)
+
+
+def history(obj):
+    """Entries for one object, newest first (audit_object_idx)."""
+    return AuditEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk,
+    ).order_by('-at')
+
+
+def changes_by(user):
+    """Entries made by one user, newest first (audit_actor_idx)."""
+    return AuditEntry.objects.filter(actor=user).select_related('content_type').order_by('-at')
+
+
+# --- Per-request batches ---
+
+def flush(batch):
+    """Write the batch's entries with one INSERT; an audit failure never fails the request."""
+    batch.closed = True
+    if not batch.entries:
+        return 0
+    try:
+        AuditEntry.objects.bulk_create(batch.entries)
+    except DatabaseError:
+        logger.exception("Could not write %d audit entries", len(batch.entries))
+        return 0
+    return len(batch.entries)
+
+
+@contextmanager
+def batched(get_actor=None):
+    """Collect the entries committed inside the block and write them at the end."""
+    batch = Batch(get_actor)
+    token = _batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _batch.reset(token)
+        flush(batch)
+
+
+class AuditMiddleware:
+    """Batches each request's audit entries; the actor is the request's user."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with batched(lambda: getattr(request, 'user', None)):
+            return self.get_response(request)
@@ -0,0 +1,125 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Min
+from django.utils.connection import ConnectionProxy
+
+from .models import Role, User, UserWarehouseRole
+
+# ---------------------------------
+# CACHED AUTH LOOKUPS
+# ---------------------------------
+# Every authenticated request needs the user row and, for non-super-admins,
+# the active UserWarehouseRole. Both are cached here and dropped by the
+# receivers in dashboard/signals.py whenever the underlying rows change.
+# The 'auth' cache is per process, so those receivers only reach the
+# process that made the change; other workers can serve the old copy for
+# up to CACHE_TIMEOUT. Users are cached as field values without the
+# password hash; the session auth hash checked on every request (already
+# stored in each session) is cached in its place.
+
+AUTH_CACHE_ALIAS = 'auth'
+CACHE_TIMEOUT = 60
+
+auth_cache = ConnectionProxy(caches, AUTH_CACHE_ALIAS)
+
+
+def user_cache_key(user_id):
+    return f'auth:user-fields:{user_id}'
+
+
+def assignment_cache_key(assignment_id):
+    return f'auth:assignment:{assignment_id}'
+
+
+def role_choices_cache_key(user_id):
+    return f'auth:role_choices:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request get_user() is served from the cache."""
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        cached = auth_cache.get(key)
+        if cached is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                auth_cache.set(key, _user_fields(user), CACHE_TIMEOUT)
+            return user
+        return _cached_user(cached)
+
+
+def _user_fields(user):
+    fields = {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields if field.attname != 'password'
+    }
+    return {'fields': fields, 'session_auth_hash': user.get_session_auth_hash()}
+
+
+def _cached_user(cached):
+    """A User with the password deferred; reading it (check_password) loads it."""
+    fields = cached['fields']
+    user = User.from_db(DEFAULT_DB_ALIAS, list(fields), list(fields.values()))
+    user._session_auth_hash = cached['session_auth_hash']
+    return user
+
+
+def get_assignment(assignment_id, user):
+    """The user's UserWarehouseRole with warehouse/role/store loaded, or None."""
+    key = assignment_cache_key(assignment_id)
+    assignment = auth_cache.get(key)
+    if assignment is None:
+        assignment = (
+            UserWarehouseRole.objects
+            .select_related('warehouse', 'role', 'store')
+            .filter(pk=assignment_id)
+            .first()
+        )
+        if assignment is None:
+            return None
+        auth_cache.set(key, assignment, CACHE_TIMEOUT)
+    if assignment.user_id != user.pk:
+        return None
+    # Soft-deleted warehouses/stores stop granting access before the purge runs
+    if assignment.warehouse.deleted_at or (assignment.store_id and assignment.store.deleted_at):
+        return None
+    return assignment
+
+
+def get_super_admin_role():
+    role = auth_cache.get('auth:role:super_admin')
+    if role is None:
+        role = Role.objects.filter(name='super_admin').first() or Role(name='super_admin')
+        if role.pk:
+            auth_cache.set('auth:role:super_admin', role, CACHE_TIMEOUT)
+    return role
+
+
+def get_role_choices(user):
+    """
+    One assignment per (warehouse, role) the user holds - the lowest id when
+    several stores share a role - ordered for the role picker. A single
+    grouped query; the list and each assignment are cached so that
+    set_active_role() and the next request are served without the database.
+    """
+    key = role_choices_cache_key(user.pk)
+    choices = auth_cache.get(key)
+    if choices is None:
+        first_per_role = (
+            UserWarehouseRole.objects
+            .filter(user=user, warehouse__deleted_at__isnull=True)
+            .values('warehouse_id', 'role_id')
+            .annotate(first_id=Min('id'))
+            .values('first_id')
+        )
+        choices = list(
+            UserWarehouseRole.objects
+            .filter(id__in=first_per_role)
+            .select_related('warehouse', 'role', 'store')
+            .order_by('warehouse__name', 'role__name')
+        )
+        auth_cache.set(key, choices, CACHE_TIMEOUT)
+        auth_cache.set_many({assignment_cache_key(a.pk): a for a in choices}, CACHE_TIMEOUT)
+    return choices
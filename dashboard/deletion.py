@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import close_old_connections, models, transaction
+from django.utils import timezone
+
+from . import audit, jobs
+from .backends import assignment_cache_key, auth_cache, role_choices_cache_key
+from .models import (
+    ChangeTracked, DeletionJob, Store, UserWarehouseRole, Warehouse, next_change_seq,
+)
+
+# ---------------------------------
+# SOFT DELETE, THEN PURGE IN BATCHES
+# ---------------------------------
+# Deleting a warehouse or store from a view only stamps deleted_at (the
+# default managers hide it from then on) and queues a DeletionJob. The job
+# walks every relation pointing at the row, nulls or deletes the dependents
+# BATCH_SIZE rows per transaction and finally deletes the row itself, so no
+# single statement or lock has to cover the whole warehouse. The purge runs
+# on the job queue (dashboard/jobs.py).
+
+BATCH_SIZE = 1000
+# For `manage.py purge_deleted` only: a running DeletionJob that made no
+# progress for this long is taken over. Jobs run by the queue rely on the
+# queue's own heartbeat lease instead (see run_job).
+STALE_AFTER = timedelta(minutes=30)
+
+
+def soft_delete(obj, user=None):
+    """Hide `obj` now and queue the purge once this transaction commits."""
+    with transaction.atomic():
+        now = timezone.now()
+        if isinstance(obj, Warehouse):
+            # Its stores disappear together with it
+            stores = Store.objects.filter(warehouse=obj)
+            audit.record_bulk(Store, (
+                (store_id, {'deleted_at': [None, now]}) for store_id in stores.values_list('pk', flat=True)
+            ), 'update')
+            stores.update(
+                deleted_at=now,
+                change_seq=next_change_seq(),
+                updated_at=now,
+            )
+        obj.deleted_at = now
+        obj.save(update_fields=['deleted_at'])
+        job = DeletionJob.objects.create(
+            model_label=obj._meta.label,
+            object_id=obj.pk,
+            object_repr=str(obj)[:255],
+            requested_by=user,
+        )
+        # Same transaction: workers only see the job once the soft delete commits
+        jobs.enqueue('purge_deletion', {'deletion_job_id': job.pk}, created_by=user)
+    return job
+
+
+def runnable_jobs():
+    """Queued or failed jobs, plus running ones whose worker stopped reporting."""
+    return DeletionJob.objects.filter(
+        models.Q(status__in=['queued', 'failed']) |
+        models.Q(status='running', updated_at__lt=timezone.now() - STALE_AFTER)
+    )
+
+
+def run_job(job_id, report=None, leased=False):
+    """
+    Purge one DeletionJob; `report(rows_processed)` is called after each batch.
+    `leased` means the caller holds the job queue's lease on it: the queue
+    only re-runs a purge_deletion job once its previous worker stopped
+    heartbeating, so a DeletionJob that worker left 'running' is resumed
+    right away. Raises if the DeletionJob is still unfinished but can't be
+    claimed, so the queue retries instead of recording success.
+    """
+    try:
+        with transaction.atomic():
+            candidates = DeletionJob.objects.exclude(status='done') if leased else runnable_jobs()
+            job = candidates.select_for_update(skip_locked=True).filter(pk=job_id).first()
+            if job is None:
+                if leased and DeletionJob.objects.filter(pk=job_id).exclude(status='done').exists():
+                    raise RuntimeError(f"Deletion job {job_id} is locked by another process")
+                return
+            job.status = 'running'
+            job.error = ''
+            job.save(update_fields=['status', 'error', 'updated_at'])
+        try:
+            model = apps.get_model(job.model_label)
+            _purge(model, job.object_id, job, report)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            raise
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    finally:
+        close_old_connections()
+
+
+def _dependents(model):
+    """Reverse relations the collector would follow (including related_name='+')."""
+    return [
+        rel for rel in model._meta.get_fields(include_hidden=True)
+        if rel.auto_created and not rel.concrete and (rel.one_to_many or rel.one_to_one)
+        and rel.on_delete in (models.CASCADE, models.SET_NULL)
+    ]
+
+
+def _batches(queryset):
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        yield ids
+
+
+def _progress(job, count, report):
+    job.rows_processed += count
+    job.save(update_fields=['rows_processed', 'updated_at'])
+    if report:
+        report(job.rows_processed)
+
+
+def _purge(model, pk, job, report):
+    for rel in _dependents(model):
+        related = rel.related_model
+        manager = related._base_manager
+        dependents = manager.filter(**{rel.field.name: pk})
+
+        if rel.on_delete is models.CASCADE:
+            nested = bool(_dependents(related))
+            for ids in _batches(dependents):
+                if nested:
+                    for child_pk in ids:
+                        _purge(related, child_pk, job, report)
+                else:
+                    with transaction.atomic():
+                        manager.filter(pk__in=ids).delete()
+                    _progress(job, len(ids), report)
+            continue
+
+        for ids in _batches(dependents):
+            with transaction.atomic():
+                updates = {rel.field.name: None}
+                if issubclass(related, ChangeTracked):
+                    updates['change_seq'] = next_change_seq()
+                    updates['updated_at'] = timezone.now()
+                if related in audit.AUDITED_MODELS:
+                    # update() sends no post_save
+                    audit.record_bulk(related, (
+                        (dependent_pk, {rel.field.attname: [pk, None]}) for dependent_pk in ids
+                    ), 'update')
+                manager.filter(pk__in=ids).update(**updates)
+            if related is UserWarehouseRole:
+                # Cached assignments embed their store; see dashboard/backends.py
+                user_ids = set(manager.filter(pk__in=ids).values_list('user_id', flat=True))
+                auth_cache.delete_many(
+                    [assignment_cache_key(i) for i in ids] + [role_choices_cache_key(i) for i in user_ids]
+                )
+            _progress(job, len(ids), report)
+
+    with transaction.atomic():
+        model._base_manager.filter(pk=pk).delete()
+    _progress(job, 1, report)
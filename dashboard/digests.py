@@ -0,0 +1,127 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from . import jobs
+from .models import COMMIT_LAG, OrderStatusEvent, Watermark
+
+# ---------------------------------
+# STORE-MANAGER DIGESTS
+# ---------------------------------
+# Instead of one email per order, the scheduled send_digests job (every
+# DIGEST_WINDOW_SECONDS) reads the OrderStatusEvent log since its watermark
+# with one grouped query - one row per (store manager, store, status) - and
+# builds a single email per store manager. The emails are queued as one
+# send_digest_emails job in the same transaction that advances the
+# watermark, so no SMTP traffic happens under the watermark lock. The job
+# sends them over one SMTP connection and drops each sent email from its
+# payload, so a retry after a failure only sends the rest.
+
+WATERMARK_NAME = 'store_digests'
+DIGEST_STATUSES = ('out_of_stock', 'ready_to_ship')
+MAX_LISTED_ORDERS = 25
+
+
+def digest_rows(after_id, upto_id):
+    """(store manager, store, status) groups for events in (after_id, upto_id]."""
+    manager = 'store__userwarehouserole__'
+    return (
+        OrderStatusEvent.objects.filter(**{
+            'id__gt': after_id,
+            'id__lte': upto_id,
+            'status__in': DIGEST_STATUSES,
+            f'{manager}role__name': 'store_manager',
+            f'{manager}user__is_active': True,
+            f'{manager}user__email__gt': '',
+            f'{manager}warehouse__deleted_at__isnull': True,
+        })
+        .values(
+            user_id=F(f'{manager}user_id'),
+            email=F(f'{manager}user__email'),
+            full_name=F(f'{manager}user__full_name'),
+            store_name=F('store__store_name'),
+            event_status=F('status'),
+        )
+        .annotate(
+            orders=Count('order_id', distinct=True),
+            order_ids=ArrayAgg('order_id', distinct=True, ordering='order_id'),
+        )
+        .order_by('user_id', 'store_name', 'event_status')
+    )
+
+
+def build_messages(rows):
+    by_user = defaultdict(list)
+    for row in rows:
+        by_user[(row['user_id'], row['email'], row['full_name'])].append(row)
+
+    labels = dict(OrderStatusEvent._meta.get_field('status').choices)
+    links = {
+        'out_of_stock': settings.SITE_URL + reverse('out_of_stock'),
+        'ready_to_ship': settings.SITE_URL + reverse('ready_to_ship'),
+    }
+    messages = []
+    for (user_id, email, full_name), groups in by_user.items():
+        totals = defaultdict(int)
+        for group in groups:
+            totals[group['event_status']] += group['orders']
+            group['label'] = labels[group['event_status']]
+            group['listed'] = ", ".join(f"#{order_id}" for order_id in group['order_ids'][:MAX_LISTED_ORDERS])
+            group['unlisted'] = max(0, len(group['order_ids']) - MAX_LISTED_ORDERS)
+        subject = "Warehouse360: " + ", ".join(
+            f"{totals[status]} {labels[status].lower()}" for status in DIGEST_STATUSES if totals[status]
+        )
+        body = render_to_string('dashboard/emails/store_digest.txt', {
+            'name': full_name,
+            'groups': groups,
+            'links': [(labels[status], links[status]) for status in DIGEST_STATUSES if totals[status]],
+        })
+        messages.append({'subject': subject, 'body': body, 'to': [email]})
+    return messages
+
+
+def send_digests(now=None):
+    """Queue the digests for every event since the last run; returns how many emails were queued."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        mark, created = Watermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+        if created:
+            # First run: start from now instead of mailing the whole history
+            mark.last_event_id = OrderStatusEvent.objects.aggregate(last=Max('id'))['last'] or 0
+            mark.save(update_fields=['last_event_id', 'updated_at'])
+            return 0
+
+        upto_id = (
+            OrderStatusEvent.objects.filter(id__gt=mark.last_event_id, at__lt=now - COMMIT_LAG)
+            .aggregate(last=Max('id'))['last']
+        )
+        if upto_id is None:
+            return 0
+        messages = build_messages(digest_rows(mark.last_event_id, upto_id))
+        if messages:
+            jobs.enqueue('send_digest_emails', {'messages': messages})
+        mark.last_event_id = upto_id
+        mark.save(update_fields=['last_event_id', 'updated_at'])
+    return len(messages)
+
+
+def deliver(messages, sent=None):
+    """
+    Send build_messages() output over one SMTP connection. `sent(remaining)`
+    is called after each email with the ones still to go. Raises on SMTP
+    errors.
+    """
+    connection = get_connection(fail_silently=False)
+    with connection:
+        for i, message in enumerate(messages):
+            EmailMessage(message['subject'], message['body'], to=message['to'], connection=connection).send()
+            if sent:
+                sent(messages[i + 1:])
+    return len(messages)
@@ -0,0 +1,171 @@
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import SECONDS_PER_DAY, Epoch
+from .models import OrderFulfillment, OrderStatusEvent
+
+# ---------------------------------
+# INBOUND ARRIVALS FORECAST
+# ---------------------------------
+# Per warehouse we cache the pending orders' due dates as a histogram
+# ({epoch day: [orders, units]}) plus a lateness distribution learned from
+# past deliveries. The state is stored under a per-warehouse version token;
+# order create/edit/transition hooks replace the token once their
+# transaction commits, so the next read rebuilds. A reader takes the token
+# before querying, so a build that raced with a commit is filed under the
+# old token and never served. Tokens are never reused, so an evicted token
+# can't bring back an old state.
+
+CACHE_TIMEOUT = 60 * 60          # full rebuild at least hourly
+HISTORY_DAYS = 180               # deliveries used to learn lateness
+EARLIEST_OFFSET = -7             # arrivals up to a week early ...
+LATEST_OFFSET = 14               # ... or two weeks late
+EPOCH = date(1970, 1, 1)
+
+
+def _version_key(warehouse_id):
+    return f'forecast:warehouse:{warehouse_id}:version'
+
+
+def _cache_key(warehouse_id, version):
+    return f'forecast:warehouse:{warehouse_id}:{version}'
+
+
+def day_number(value):
+    return (value - EPOCH).days
+
+
+def pending_key(order):
+    """(warehouse_id, due day, quantity) for a pending, dated order, else None."""
+    if order.status != 'pending' or not order.expected_delivery_date or not order.store_id:
+        return None
+    return (order.store.warehouse_id, day_number(order.expected_delivery_date), order.quantity)
+
+
+def _lateness_pmf(warehouse_id):
+    """P(arrival = due day + k) for k in EARLIEST_OFFSET..LATEST_OFFSET."""
+    since = timezone.now() - timedelta(days=HISTORY_DAYS)
+    rows = OrderStatusEvent.objects.filter(
+        warehouse_id=warehouse_id, status='delivered', at__gte=since,
+        order__expected_delivery_date__isnull=False,
+    ).order_by('order_id', 'at').values_list(
+        'order_id', Epoch('at'), Epoch('order__expected_delivery_date'),
+    )
+    data = np.array(list(rows), dtype=np.float64).reshape(-1, 3)
+
+    size = LATEST_OFFSET - EARLIEST_OFFSET + 1
+    if not data.size:
+        pmf = np.zeros(size)
+        pmf[-EARLIEST_OFFSET] = 1.0
+        return pmf
+
+    # First delivery per order only (OfS -> DTW re-deliveries don't count).
+    first = np.r_[True, data[1:, 0] != data[:-1, 0]]
+    offsets = np.floor((data[first, 1] - data[first, 2]) / SECONDS_PER_DAY).astype(np.int64)
+    offsets = np.clip(offsets, EARLIEST_OFFSET, LATEST_OFFSET) - EARLIEST_OFFSET
+    counts = np.bincount(offsets, minlength=size)
+    return counts / counts.sum()
+
+
+def _build(warehouse_id):
+    rows = OrderFulfillment.objects.filter(
+        status='pending', store__warehouse_id=warehouse_id,
+        expected_delivery_date__isnull=False,
+    ).order_by().values_list(Epoch('expected_delivery_date'), 'quantity')
+    data = np.array(list(rows), dtype=np.float64).reshape(-1, 2)
+    due_days = (data[:, 0] // SECONDS_PER_DAY).astype(np.int64)
+    days, inverse = np.unique(due_days, return_inverse=True)
+    orders = np.bincount(inverse, minlength=len(days))
+    units = np.bincount(inverse, weights=data[:, 1], minlength=len(days))
+    return {
+        'due': {int(d): [int(o), int(u)] for d, o, u in zip(days, orders, units)},
+        'lateness': _lateness_pmf(warehouse_id).tolist(),
+    }
+
+
+def _version(warehouse_id):
+    version = cache.get(_version_key(warehouse_id))
+    if version is None:
+        cache.add(_version_key(warehouse_id), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(warehouse_id))
+    return version
+
+
+def get_state(warehouse_id):
+    key = _cache_key(warehouse_id, _version(warehouse_id))
+    state = cache.get(key)
+    if state is None:
+        state = _build(warehouse_id)
+        cache.set(key, state, CACHE_TIMEOUT)
+    return state
+
+
+def invalidate(warehouse_ids):
+    """Retire the cached state of `warehouse_ids`; the next read rebuilds it."""
+    cache.set_many({_version_key(warehouse_id): uuid.uuid4().hex for warehouse_id in warehouse_ids}, None)
+
+
+def record_changes(removed=(), added=()):
+    """
+    Invalidate the affected forecasts once the current transaction commits.
+    `removed` / `added` are iterables of pending_key() tuples.
+    """
+    warehouse_ids = {key[0] for keys in (removed, added) for key in keys if key is not None}
+    if warehouse_ids:
+        transaction.on_commit(lambda: invalidate(warehouse_ids))
+
+
+def forecast(warehouse_id, horizon=14, today=None):
+    """
+    Daily expected arrivals for the next `horizon` days plus overdue totals.
+    Scheduled counts are spread over the lateness distribution with a
+    single convolution; arrivals that should already have happened are
+    folded into today.
+    """
+    today = day_number(today or timezone.localdate())
+    state = get_state(warehouse_id)
+    pmf = np.asarray(state['lateness'], dtype=np.float64)
+
+    due = state['due']
+    days = np.fromiter(due.keys(), dtype=np.int64, count=len(due))
+    values = np.array(list(due.values()), dtype=np.float64).reshape(-1, 2)
+
+    overdue = days < today
+    start = min(int(days.min()) if days.size else today, today)
+    end = today + horizon
+    # Orders due up to a week past the horizon can still arrive early inside it.
+    length = end - start - EARLIEST_OFFSET
+    index = days - start
+    in_range = index < length
+    scheduled_orders = np.bincount(index[in_range], weights=values[in_range, 0], minlength=length)
+    scheduled_units = np.bincount(index[in_range], weights=values[in_range, 1], minlength=length)
+
+    # full[m] is the expected arrivals on day start + EARLIEST_OFFSET + m.
+    full_orders = np.convolve(scheduled_orders, pmf)
+    full_units = np.convolve(scheduled_units, pmf)
+    past = today - start - EARLIEST_OFFSET
+    full_orders[past] += full_orders[:past].sum()
+    full_units[past] += full_units[:past].sum()
+
+    offset = today - start
+    rows = [
+        {
+            'date': EPOCH + timedelta(days=today + i),
+            'scheduled_orders': int(scheduled_orders[offset + i]),
+            'scheduled_units': int(scheduled_units[offset + i]),
+            'expected_orders': float(full_orders[past + i]),
+            'expected_units': float(full_units[past + i]),
+        }
+        for i in range(horizon)
+    ]
+    return {
+        'rows': rows,
+        'overdue_orders': int(values[overdue, 0].sum()),
+        'overdue_units': int(values[overdue, 1].sum()),
+        'on_time_rate': float(pmf[:-EARLIEST_OFFSET + 1].sum()),
+    }
@@ -169,6 +169,13 @@ class UserUpdateForm(forms.ModelForm):
             user.save()
         return user
 
+# --- Bulk User Import Form ---
+class UserImportForm(forms.Form):
+    csv_file = forms.FileField(
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv'}),
+        help_text="Columns: username, password, full_name, email, phone_number, primary_role, warehouse, role, store",
+    )
+
 # --- User Assignment Form ---
 class UserAssignmentForm(forms.ModelForm):
     class Meta:
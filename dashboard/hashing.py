@@ -0,0 +1,42 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------------------------------
+# PARALLEL PASSWORD HASHING
+# ---------------------------------
+# Kept free of model imports: pool workers are started with 'spawn' (forking
+# a threaded web server is unsafe), so they import this module and run
+# django.setup() before any model code could load.
+
+MIN_PARALLEL = 4
+
+
+def _setup_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hash(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password() for every password, spread across a process per core."""
+    from django.conf import settings
+
+    passwords = list(passwords)
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    # Workers load settings by module name; settings.configure() has none
+    if workers < 2 or len(passwords) < MIN_PARALLEL or not settings.SETTINGS_MODULE:
+        return [_hash(password) for password in passwords]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_setup_worker,
+        initargs=(settings.SETTINGS_MODULE,),
+    ) as pool:
+        return list(pool.map(_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+# ---------------------------------
+# THUMBNAIL RENDERING (PROCESS POOL)
+# ---------------------------------
+# Kept free of Django imports, like dashboard/hashing.py: pool workers are
+# started with 'spawn' and only need Pillow, so they import nothing else.
+
+FORMATS = (('webp', 'WEBP', {'quality': 80, 'method': 4}), ('jpg', 'JPEG', {'quality': 82, 'optimize': True}))
+MIN_PARALLEL = 4
+
+
+def thumbnail_names(key, size):
+    """File names for `key` (the source image's SHA-256) at `size` px, by extension."""
+    return {extension: f"{key}-{size}.{extension}" for extension, _, _ in FORMATS}
+
+
+def render(source_path, dest_dir, key, size):
+    """Write every thumbnail format for one image; returns `key`."""
+    names = thumbnail_names(key, size)
+    with Image.open(source_path) as image:
+        image.draft('RGB', (size * 2, size * 2))  # JPEG: decode at reduced scale
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        if image.mode == 'RGBA':
+            # JPEG has no alpha; flatten onto white for both outputs
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        for extension, format_name, options in FORMATS:
+            path = os.path.join(dest_dir, names[extension])
+            incoming = f"{path}.incoming-{os.getpid()}"
+            image.save(incoming, format_name, **options)
+            os.replace(incoming, path)
+    return key
+
+
+def render_many(tasks, workers=None):
+    """
+    Run render() for every (source_path, dest_dir, key, size) task across a
+    process per core. Yields (key, exception or None) as tasks finish.
+    """
+    tasks = list(tasks)
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers < 2 or len(tasks) < MIN_PARALLEL:
+        for task in tasks:
+            try:
+                yield render(*task), None
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                yield task[2], e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(render, *task): task[2] for task in tasks}
+        for future, key in futures.items():
+            try:
+                yield future.result(), None
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                yield key, e
@@ -0,0 +1,136 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import InventoryLevel, InventoryMovement
+
+# ---------------------------------
+# INVENTORY LEDGER
+# ---------------------------------
+# Stock is never stored as "the" number; InventoryMovement is the source of
+# truth and InventoryLevel keeps its running sum per (product, warehouse) so
+# on-hand is one unique-index read. transitions.py records a movement when
+# an order is received (-> delivered) or shipped (-> completed), in the
+# same transaction as the status change. `manage.py reconcile_inventory`
+# rebuilds the levels from the ledger.
+
+# status entered -> (reason, sign of the movement)
+MOVEMENT_FOR_STATUS = {
+    'delivered': ('received', 1),
+    'completed': ('shipped', -1),
+}
+
+
+def on_hand(product_id, warehouse_id):
+    """Units of a product on hand in a warehouse."""
+    return (
+        InventoryLevel.objects.filter(product_id=product_id, warehouse_id=warehouse_id)
+        .values_list('on_hand', flat=True).first() or 0
+    )
+
+
+def apply_deltas(deltas):
+    """Add {(product_id, warehouse_id): units} to the on-hand levels."""
+    deltas = {key: units for key, units in deltas.items() if units}
+    if not deltas:
+        return
+    # Rows must exist before they can be incremented; concurrent creators
+    # are absorbed by the unique constraint.
+    InventoryLevel.objects.bulk_create(
+        [InventoryLevel(product_id=product_id, warehouse_id=warehouse_id) for product_id, warehouse_id in deltas],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    # Fixed key order so two transactions never lock the same rows in opposite order
+    for (product_id, warehouse_id), units in sorted(deltas.items()):
+        InventoryLevel.objects.filter(product_id=product_id, warehouse_id=warehouse_id).update(
+            on_hand=F('on_hand') + units, updated_at=now,
+        )
+
+
+@transaction.atomic
+def record_status_changes(changes, status, user=None, at=None):
+    """
+    Ledger entries for orders that just entered `status`. `changes` yields
+    (order_id, product_id, warehouse_id, quantity, previous_status); orders
+    that were already in `status` (a repeated action) and orders without a
+    product or warehouse are skipped. Returns the movements written.
+    """
+    if status not in MOVEMENT_FOR_STATUS:
+        return []
+    reason, sign = MOVEMENT_FOR_STATUS[status]
+    at = at or timezone.now()
+    movements = [
+        InventoryMovement(
+            product_id=product_id, warehouse_id=warehouse_id, quantity=sign * quantity,
+            reason=reason, order_id=order_id, actor=user, at=at,
+        )
+        for order_id, product_id, warehouse_id, quantity, previous_status in changes
+        if previous_status != status and product_id and warehouse_id and quantity
+    ]
+    InventoryMovement.objects.bulk_create(movements)
+
+    deltas = defaultdict(int)
+    for movement in movements:
+        deltas[(movement.product_id, movement.warehouse_id)] += movement.quantity
+    apply_deltas(deltas)
+    return movements
+
+
+@transaction.atomic
+def adjust(product, warehouse, quantity, user=None):
+    """Manual stock correction (cycle count, damage...)."""
+    movement = InventoryMovement.objects.create(
+        product=product, warehouse=warehouse, quantity=quantity,
+        reason='adjustment', actor=user, at=timezone.now(),
+    )
+    apply_deltas({(product.pk, warehouse.pk): quantity})
+    return movement
+
+
+def ledger_totals():
+    return {
+        (row['product_id'], row['warehouse_id']): row['total']
+        for row in InventoryMovement.objects.values('product_id', 'warehouse_id').annotate(total=Sum('quantity'))
+    }
+
+
+def reconcile(fix=True):
+    """
+    Compare every level with the ledger sum and, if `fix`, rewrite the ones
+    that drifted. Returns {(product_id, warehouse_id): (level, ledger)} for
+    each mismatch.
+    """
+    with transaction.atomic():
+        # Movements and level updates commit together; SHARE mode waits for
+        # in-flight ones and blocks new ones, so both sides are comparable.
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {InventoryLevel._meta.db_table} IN SHARE MODE')
+        totals = ledger_totals()
+        levels = {
+            (level.product_id, level.warehouse_id): level
+            for level in InventoryLevel.objects.all()
+        }
+        drift = {}
+        for key in totals.keys() | levels.keys():
+            expected = totals.get(key, 0)
+            level = levels.get(key)
+            actual = level.on_hand if level else 0
+            if actual != expected:
+                drift[key] = (actual, expected)
+        if fix and drift:
+            now = timezone.now()
+            stale = []
+            for key, (_, expected) in drift.items():
+                level = levels.get(key)
+                if level is None:
+                    levels[key] = InventoryLevel(product_id=key[0], warehouse_id=key[1], on_hand=expected)
+                else:
+                    level.on_hand = expected
+                    level.updated_at = now
+                    stale.append(level)
+            InventoryLevel.objects.bulk_create([levels[key] for key in drift if levels[key].pk is None])
+            InventoryLevel.objects.bulk_update(stale, ['on_hand', 'updated_at'], batch_size=1000)
+    return drift
@@ -0,0 +1,216 @@
+import logging
+import os
+import random
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobSchedule
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------
+# DATABASE-BACKED JOB QUEUE
+# ---------------------------------
+# Jobs are rows in dashboard_job. Workers (`manage.py run_workers`) claim
+# them with SELECT ... FOR UPDATE SKIP LOCKED, so any number of processes
+# and threads can poll the same table without handing one job out twice.
+# Handlers are plain functions registered with @job('name') in
+# dashboard/tasks.py and are called as handler(job, **payload).
+
+# Jobs a housekeeping thread runs between schedule/stale-job checks
+HOUSEKEEPING_EVERY = 10
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# Running jobs refresh heartbeat_at this often; one whose heartbeat is
+# older than STALE_AFTER is assumed orphaned by a dead worker.
+HEARTBEAT_SECONDS = 60
+STALE_AFTER = timedelta(minutes=10)
+
+_registry = {}
+
+
+def job(name, max_attempts=3):
+    """Register a handler under `name`."""
+    def decorator(func):
+        _registry[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_at=None, created_by=None):
+    """
+    Queue `name` with a JSON-serialisable payload. The row is inserted in the
+    caller's transaction, so workers only see it once that commits.
+    """
+    if name not in _registry:
+        raise KeyError(f"Unknown job: {name}")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=_registry[name][1],
+        created_by=created_by,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: ~30s, 60s, 120s ... capped at an hour."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+# --- Claiming and running ---
+
+def claim(worker):
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_at__lte=timezone.now())
+            .order_by('run_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_by = worker
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def _heartbeat(job, finished):
+    try:
+        while not finished.wait(HEARTBEAT_SECONDS):
+            job.lease().update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def execute(job):
+    """
+    Run a claimed job and record the outcome; returns the new status, or
+    None when the job was handed to another worker meanwhile (its run owns
+    the row, so this one's result is dropped).
+    """
+    entry = _registry.get(job.name)
+    finished = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job, finished), daemon=True).start()
+    try:
+        if entry is None:
+            raise KeyError(f"Unknown job: {job.name}")
+        entry[0](job, **job.payload)
+    except Exception as e:
+        logger.exception("Job %s #%s failed (attempt %s)", job.name, job.pk, job.attempts)
+        job.error = f"{type(e).__name__}: {e}"
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        job.status = 'done'
+        job.error = ''
+        job.finished_at = timezone.now()
+    finally:
+        finished.set()
+    recorded = job.lease().update(
+        status=job.status, run_at=job.run_at, error=job.error, finished_at=job.finished_at,
+    )
+    if not recorded:
+        logger.warning("Job %s #%s was requeued while running; dropping this run's result", job.name, job.pk)
+        return None
+    return job.status
+
+
+def run_pending(worker=None, limit=None):
+    """Run claimable jobs in this thread until none are due; returns how many ran."""
+    worker = worker or worker_name()
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        execute(job)
+        close_old_connections()
+        ran += 1
+    return ran
+
+
+# --- Housekeeping (cheap; any worker may run it) ---
+
+def requeue_stale():
+    """Hand orphaned running jobs (worker died) back to the queue, or fail them."""
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=now - STALE_AFTER)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error='Worker stopped responding.', finished_at=now,
+    )
+    return stale.update(status='queued', run_at=now, locked_by='')
+
+
+def sync_schedules():
+    """Mirror settings.JOB_SCHEDULES into JobSchedule rows."""
+    configured = getattr(settings, 'JOB_SCHEDULES', {})
+    for name, spec in configured.items():
+        JobSchedule.objects.update_or_create(name=name, defaults={
+            'job_name': spec['job'],
+            'payload': spec.get('payload', {}),
+            'interval_seconds': spec['every'],
+            'enabled': True,
+        })
+    JobSchedule.objects.exclude(name__in=list(configured)).update(enabled=False)
+
+
+def enqueue_due_schedules():
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            JobSchedule.objects.select_for_update(skip_locked=True)
+            .filter(enabled=True, next_run_at__lte=now)
+        )
+        for schedule in due:
+            enqueue(schedule.job_name, schedule.payload)
+            schedule.next_run_at = now + timedelta(seconds=schedule.interval_seconds)
+            schedule.save(update_fields=['next_run_at'])
+    return len(due)
+
+
+def housekeeping():
+    requeue_stale()
+    enqueue_due_schedules()
+
+
+# --- Worker loop ---
+
+def work(stop, poll_interval=2.0, housekeeper=False):
+    """Thread body for run_workers: claim and run jobs until `stop` is set."""
+    worker = worker_name()
+    try:
+        while not stop.is_set():
+            try:
+                if housekeeper:
+                    housekeeping()
+                ran = run_pending(worker, limit=HOUSEKEEPING_EVERY)
+            except Exception:
+                # e.g. the database went away; back off and reconnect
+                logger.exception("Worker %s poll failed", worker)
+                connection.close()
+                ran = 0
+            if not ran:
+                stop.wait(poll_interval)
+    finally:
+        connection.close()
@@ -0,0 +1,262 @@
+import hashlib
+import http.client
+import ipaddress
+import mimetypes
+import os
+import socket
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+
+from . import jobs
+from .models import OrderFulfillment, ShippingLabel
+
+# ---------------------------------
+# LOCAL SHIPPING-LABEL CACHE
+# ---------------------------------
+# Packers used to pull every label from the carrier's host on each click.
+# Now an order's label is queued when the order is created or reaches
+# ready_to_ship, the fetch_labels job downloads a batch in a bounded thread
+# pool, and each file is stored once under its SHA-256 (identical labels
+# share a file). Views serve the local copy with FileResponse, which the
+# WSGI server can hand to sendfile(), or via an X-Accel-Redirect/X-Sendfile
+# header when LABEL_SENDFILE_HEADER is set.
+
+FETCH_TIMEOUT = 15
+MAX_LABEL_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def storage_root():
+    return Path(settings.LABEL_STORAGE_ROOT)
+
+
+def label_path(sha256):
+    return storage_root() / sha256[:2] / sha256
+
+
+# --- Queueing ---
+
+def queue_labels(orders, enqueue=True, user=None):
+    """
+    Make sure every order in the `orders` queryset that has a label URL has
+    an up-to-date ShippingLabel; (re)queue the missing, failed and stale
+    ones. Returns the ids of the labels that need fetching.
+    """
+    wanted = dict(
+        orders.exclude(Q(shipping_label_url__isnull=True) | Q(shipping_label_url=''))
+        .values_list('id', 'shipping_label_url')
+    )
+    if not wanted:
+        return []
+    existing = {
+        label.order_id: label
+        for label in ShippingLabel.objects.filter(order_id__in=list(wanted))
+    }
+
+    new_labels = []
+    stale = []
+    for order_id, url in wanted.items():
+        label = existing.get(order_id)
+        if label is None:
+            new_labels.append(ShippingLabel(order_id=order_id, source_url=url))
+        elif label.source_url != url or label.status == 'failed':
+            label.source_url = url
+            label.status = 'queued'
+            label.error = ''
+            stale.append(label)
+    ShippingLabel.objects.bulk_create(new_labels)
+    ShippingLabel.objects.bulk_update(stale, ['source_url', 'status', 'error'])
+
+    label_ids = [label.pk for label in new_labels + stale]
+    if label_ids and enqueue:
+        # Inserted in the caller's transaction, like the orders themselves
+        jobs.enqueue('fetch_labels', {'label_ids': label_ids}, created_by=user)
+    # Labels already queued have a job of their own
+    return label_ids + [
+        label.pk for label in existing.values() if label.status == 'queued' and label not in stale
+    ]
+
+
+# --- Fetching ---
+# Label and image URLs are typed in by users, so the server must not become
+# a proxy into its own network: every connection (redirects included) is
+# checked after it is made, against the address actually connected to, and
+# refused unless that address is public. Checking the socket rather than a
+# prior DNS lookup also defeats names that resolve differently next time.
+
+class UnsafeURL(ValueError):
+    pass
+
+
+def check_address(address):
+    """Raise UnsafeURL unless `address` is a public internet address."""
+    if settings.FETCH_ALLOW_PRIVATE_ADDRESSES:
+        return
+    ip = ipaddress.ip_address(address.split('%')[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    if not ip.is_global:
+        raise UnsafeURL(f"Refusing to fetch from non-public address {ip}")
+
+
+def _create_connection(address, *args, **kwargs):
+    sock = socket.create_connection(address, *args, **kwargs)
+    try:
+        check_address(sock.getpeername()[0])
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _RedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        # urllib would also follow redirects to ftp://
+        if urlsplit(newurl).scheme not in ('http', 'https'):
+            raise UnsafeURL(f"Refusing redirect to {newurl}")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(_PublicHTTPHandler, _PublicHTTPSHandler, _RedirectHandler)
+
+
+def download(url, root=None, max_bytes=MAX_LABEL_BYTES):
+    """
+    Stream `url` into the content-addressed store at `root` (the label
+    store by default) and return (sha256, content_type, size). Only public
+    addresses are fetched (UnsafeURL otherwise). Runs in pool threads, so
+    it touches the filesystem only, never the ORM.
+    """
+    if urlsplit(url).scheme not in ('http', 'https'):
+        raise ValueError(f"Unsupported URL: {url}")
+    root = Path(root or storage_root())
+    root.mkdir(parents=True, exist_ok=True)
+
+    request = urllib.request.Request(url, headers={'User-Agent': 'Warehouse360 label fetcher'})
+    with _opener.open(request, timeout=FETCH_TIMEOUT) as response:
+        content_type = response.headers.get_content_type()
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=root, prefix='.incoming-', delete=False) as incoming:
+            try:
+                while chunk := response.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"File is larger than {max_bytes} bytes")
+                    digest.update(chunk)
+                    incoming.write(chunk)
+            except BaseException:
+                os.unlink(incoming.name)
+                raise
+
+    sha256 = digest.hexdigest()
+    path = root / sha256[:2] / sha256
+    if path.exists():
+        os.unlink(incoming.name)  # same bytes are already stored
+    else:
+        path.parent.mkdir(exist_ok=True)
+        os.replace(incoming.name, path)
+    return sha256, content_type, size
+
+
+def fetch_labels(label_ids, report=None):
+    """
+    Download the given labels concurrently (LABEL_FETCH_WORKERS threads).
+    `report(done, total)` is called as each one finishes. Returns the number
+    that failed; failures are recorded on the label.
+    """
+    labels = list(ShippingLabel.objects.filter(pk__in=label_ids).exclude(status='stored'))
+    if not labels:
+        return 0
+    failed = 0
+    workers = min(settings.LABEL_FETCH_WORKERS, len(labels))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='label-fetch') as pool:
+        futures = {pool.submit(download, label.source_url): label for label in labels}
+        for done, future in enumerate(as_completed(futures), start=1):
+            label = futures[future]
+            try:
+                sha256, content_type, size = future.result()
+            except (OSError, ValueError) as e:
+                failed += 1
+                updates = {'status': 'failed', 'error': str(e)[:1000]}
+            else:
+                updates = {
+                    'status': 'stored', 'error': '', 'sha256': sha256,
+                    'content_type': content_type, 'size': size, 'fetched_at': timezone.now(),
+                }
+            # An edit may have pointed the order at a new URL meanwhile;
+            # that one was queued again and must not be overwritten here.
+            ShippingLabel.objects.filter(pk=label.pk, source_url=label.source_url).update(**updates)
+            if report:
+                report(done, len(labels))
+    return failed
+
+
+# --- Serving ---
+
+def stored_label(order):
+    """The order's local label if it is fetched, current and still on disk."""
+    label = ShippingLabel.objects.filter(
+        order=order, status='stored', source_url=order.shipping_label_url,
+    ).first()
+    if label is None:
+        return None
+    if not label_path(label.sha256).exists():
+        # Storage was cleared; fetch it again in the background
+        ShippingLabel.objects.filter(pk=label.pk).update(status='failed', error='File missing from storage.')
+        queue_labels(OrderFulfillment.objects.filter(pk=order.pk))
+        return None
+    return label
+
+
+def serve(request, label):
+    etag = f'"{label.sha256}"'
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified()
+
+    path = label_path(label.sha256)
+    extension = mimetypes.guess_extension(label.content_type) or ''
+    filename = f"label-{label.order_id}{extension}"
+    header = settings.LABEL_SENDFILE_HEADER
+    if header:
+        response = HttpResponse(content_type=label.content_type)
+        if header == 'X-Accel-Redirect':
+            response[header] = f"{settings.LABEL_SENDFILE_PREFIX}{label.sha256[:2]}/{label.sha256}"
+        else:
+            response[header] = str(path)
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=label.content_type, filename=filename)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
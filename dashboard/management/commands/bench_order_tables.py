@@ -0,0 +1,71 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+
+from dashboard.rows import OrderRow, render_order_rows
+
+# The per-row {% url %} table body the status pages used before the Jinja2 path.
+DJANGO_TABLE_BODY = """{% for order in orders %}
+<tr>
+    <td>{{ forloop.counter }}</td>
+    <td>{{ order.store_name|default:"N/A" }}</td>
+    <td class="fw-bold">{{ order.bin_code|default:"--" }}</td>
+    <td>{{ order.product_code|default:"N/A" }}</td>
+    <td>{{ order.code_type|default:"--" }}</td>
+    <td>{{ order.team_code|default:"--" }}</td>
+    <td style="min-width: 200px;">{{ order.product_name|default:"N/A" }}</td>
+    <td>{{ order.supplier_order_id|default:"--" }}</td>
+    <td>{{ order.quantity }}</td>
+    <td>{{ order.amazon_order_id|default:"--" }}</td>
+    <td>{% if order.shipping_label_url %}<a href="{{ order.shipping_label_url }}" target="_blank">View Link</a>{% else %}--{% endif %}</td>
+    <td>{{ order.expected_delivery_date|date:"Y-m-d" }}</td>
+    <td>{{ order.tracker_id|default:"--" }}</td>
+    <td style="min-width: 150px;">{{ order.notes|default:"--" }}</td>
+    <td style="min-width: 100px;">
+        {% if can_take_action %}
+            <a href="{% url 'rts_action' order.id %}" class="btn btn-sm btn-info w-100" onclick="return confirm('Mark this order as READY TO SHIP?')">Ready To SHIPMENT</a>
+        {% else %}
+            <span class="text-muted small">--</span>
+        {% endif %}
+    </td>
+</tr>
+{% empty %}
+<tr><td colspan="14" class="text-center">No orders are currently waiting for shipment.</td></tr>
+{% endfor %}"""
+
+
+class Command(BaseCommand):
+    help = "Compare per-row render cost of the Django {% url %} table body and the Jinja2 one."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        count = options['rows']
+        orders = [
+            OrderRow(
+                i, 'delivered', f'Store {i % 50}', f'B0{i:08d}', f'Product {i}',
+                'asin', 'T1', f'SUP-{i}', 1 + i % 5, f'111-{i:07d}',
+                'https://labels.example.com/label.pdf', date(2025, 1, 1), f'TRK{i}', 'Fragile', f'A-{i % 300:03d}',
+            )
+            for i in range(count)
+        ]
+        django_template = engines['django'].from_string(DJANGO_TABLE_BODY)
+
+        def best(render):
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                render()
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        before = best(lambda: django_template.render({'orders': orders, 'can_take_action': True}))
+        after = best(lambda: render_order_rows(orders, 'delivered', can_take_action=True))
+
+        for label, seconds in (('django {% url %} per row', before), ('jinja2, urls reversed once', after)):
+            self.stdout.write(f"{label:<28} {seconds * 1000:9.1f} ms  {seconds / count * 1e6:7.2f} us/row")
+        self.stdout.write(self.style.SUCCESS(f"Speed-up: {before / after:.1f}x on {count} rows"))
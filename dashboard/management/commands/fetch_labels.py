@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.labels import fetch_labels, queue_labels
+from dashboard.models import OrderFulfillment
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Fetch missing, failed or stale shipping labels into the local label store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', action='append', default=None,
+            help="Only orders in this status (repeatable). Default: pending and ready_to_ship.",
+        )
+
+    def handle(self, *args, **options):
+        statuses = options['status'] or ['pending', 'ready_to_ship']
+        order_ids = list(
+            OrderFulfillment.objects.filter(status__in=statuses)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        fetched = failed = 0
+        for start in range(0, len(order_ids), BATCH_SIZE):
+            batch = OrderFulfillment.objects.filter(pk__in=order_ids[start:start + BATCH_SIZE])
+            label_ids = queue_labels(batch, enqueue=False)
+            batch_failed = fetch_labels(label_ids)
+            failed += batch_failed
+            fetched += len(label_ids) - batch_failed
+        self.stdout.write(self.style.SUCCESS(f"Fetched {fetched} label(s), {failed} failed."))
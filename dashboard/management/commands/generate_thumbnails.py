@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.models import Product
+from dashboard.thumbnails import generate_thumbnails, queue_thumbnails
+
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = "Generate missing, failed or stale product image thumbnails."
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        generated = failed = 0
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            batch = Product.objects.filter(pk__in=product_ids[start:start + BATCH_SIZE])
+            thumbnail_ids = queue_thumbnails(batch, enqueue=False)
+            batch_failed = generate_thumbnails(thumbnail_ids)
+            failed += batch_failed
+            generated += len(thumbnail_ids) - batch_failed
+        self.stdout.write(self.style.SUCCESS(f"Generated {generated} thumbnail(s), {failed} failed."))
@@ -0,0 +1,24 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import Warehouse
+from dashboard.putaway import import_bins
+
+
+class Command(BaseCommand):
+    help = "Create or update a warehouse's bins from a CSV file with columns code,zone,sequence,capacity."
+
+    def add_arguments(self, parser):
+        parser.add_argument('warehouse', help="Warehouse name")
+        parser.add_argument('csv_path')
+
+    def handle(self, *args, **options):
+        warehouse = Warehouse.objects.filter(name__iexact=options['warehouse']).first()
+        if warehouse is None:
+            raise CommandError(f"No warehouse named {options['warehouse']!r}.")
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as lines:
+                written = import_bins(warehouse, lines)
+        except ValidationError as e:
+            raise CommandError("Nothing was imported:\n" + "\n".join(e.messages))
+        self.stdout.write(self.style.SUCCESS(f"Imported {written} bin(s) into {warehouse.name}."))
@@ -0,0 +1,21 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.provisioning import import_users
+
+
+class Command(BaseCommand):
+    help = "Bulk-create users and warehouse assignments from a CSV file (see dashboard/provisioning.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as lines:
+                users_created, assignments_created = import_users(lines)
+        except ValidationError as e:
+            raise CommandError("Nothing was imported:\n" + "\n".join(e.messages))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {users_created} user(s) with {assignments_created} assignment(s)."
+        ))
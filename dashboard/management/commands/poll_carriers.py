@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.tracking import poll
+
+
+class Command(BaseCommand):
+    help = "Check due pending orders against their carriers once and mark delivered ones."
+
+    def handle(self, *args, **options):
+        counts = poll()
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {counts['checked']} order(s): {counts['delivered']} delivered, "
+            f"{counts['errors']} error(s), {counts['skipped']} without a carrier."
+        ))
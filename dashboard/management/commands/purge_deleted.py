@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.deletion import run_job, runnable_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued, failed or stalled warehouse/store deletion jobs."
+
+    def handle(self, *args, **options):
+        job_ids = list(runnable_jobs().order_by('created_at').values_list('pk', flat=True))
+        for job_id in job_ids:
+            try:
+                run_job(job_id)
+            except Exception as e:
+                self.stderr.write(f"Deletion job {job_id} failed: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(job_ids)} deletion job(s)."))
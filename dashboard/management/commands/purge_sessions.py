@@ -0,0 +1,28 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+def purge_expired_sessions(batch_size=5000):
+    """Delete expired django_session rows in bounded batches; returns the count."""
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in batches (schedule this, e.g. hourly from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_sessions(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired session(s)."))
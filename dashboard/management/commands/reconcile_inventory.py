@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.inventory import reconcile
+
+
+class Command(BaseCommand):
+    help = "Check every on-hand level against the inventory ledger and rewrite the ones that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report the drift; leave the levels as they are.",
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=not options['dry_run'])
+        for (product_id, warehouse_id), (level, ledger) in sorted(drift.items()):
+            self.stdout.write(f"product {product_id} / warehouse {warehouse_id}: level {level}, ledger {ledger}")
+        if not drift:
+            self.stdout.write("Inventory levels match the ledger.")
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} level(s) out of step with the ledger."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(drift)} level(s) from the ledger."))
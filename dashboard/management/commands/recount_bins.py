@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.putaway import recount
+
+
+class Command(BaseCommand):
+    help = "Recompute each bin's occupied units from the delivered / ready-to-ship orders stored in it."
+
+    def handle(self, *args, **options):
+        changed = recount()
+        self.stdout.write(self.style.SUCCESS(f"Corrected {changed} bin(s)."))
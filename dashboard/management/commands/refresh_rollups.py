@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Refresh the daily store/warehouse rollups for days touched since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Ignore the watermark and rebuild every day in the event log.",
+        )
+
+    def handle(self, *args, **options):
+        days = refresh_rollups(full=options['full'])
+        if days:
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {len(days)} day(s): {days[0]} .. {days[-1]}"
+            ))
+        else:
+            self.stdout.write("Rollups already up to date.")
@@ -0,0 +1,79 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from dashboard import jobs
+
+
+def run_process(threads, poll_interval):
+    """One worker process: `threads` polling threads, the first also does housekeeping."""
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+
+    workers = [
+        threading.Thread(
+            target=jobs.work, args=(stop, poll_interval, i == 0),
+            name=f'worker-{i}',
+        )
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    # Wake up regularly so signals are handled while the threads block
+    while any(worker.is_alive() for worker in workers):
+        for worker in workers:
+            worker.join(timeout=1)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (dashboard/jobs.py) until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4, help="Threads per process.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Run everything that is due in this process, then exit (for cron or debugging).",
+        )
+
+    def handle(self, *args, **options):
+        jobs.sync_schedules()
+
+        if options['once']:
+            jobs.housekeeping()
+            ran = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} job(s)."))
+            return
+
+        self.stdout.write(
+            f"Starting {options['processes']} process(es) x {options['threads']} thread(s)."
+        )
+        if options['processes'] == 1:
+            run_process(options['threads'], options['poll_interval'])
+            return
+
+        # Forked children must not share the parent's database sockets
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=run_process, args=(options['threads'], options['poll_interval']))
+            for _ in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # children get Ctrl+C themselves
+        for child in children:
+            child.join()
+        self.stdout.write("Workers stopped.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = "Email store managers a digest of out-of-stock / ready-to-ship orders since the last run."
+
+    def handle(self, *args, **options):
+        queued = send_digests()
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} digest(s)."))
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_events(apps, schema_editor):
+    # History before this migration is lost; seed each order with its
+    # creation event plus, if it has moved on, its current status.
+    OrderFulfillment = apps.get_model('dashboard', 'OrderFulfillment')
+    OrderStatusEvent = apps.get_model('dashboard', 'OrderStatusEvent')
+
+    rows = OrderFulfillment.objects.values_list(
+        'id', 'status', 'store_id', 'store__warehouse_id',
+        'created_by_id', 'created_at', 'action_taken_by_id', 'action_taken_at',
+    ).order_by('id')
+
+    batch = []
+    for order_id, status, store_id, warehouse_id, created_by_id, created_at, actor_id, action_at in rows.iterator(chunk_size=2000):
+        batch.append(OrderStatusEvent(
+            order_id=order_id, warehouse_id=warehouse_id, store_id=store_id,
+            status='pending', actor_id=created_by_id, at=created_at,
+        ))
+        if status != 'pending':
+            batch.append(OrderStatusEvent(
+                order_id=order_id, warehouse_id=warehouse_id, store_id=store_id,
+                status=status, previous_status='pending', actor_id=actor_id,
+                at=action_at or created_at,
+            ))
+        if len(batch) >= 2000:
+            OrderStatusEvent.objects.bulk_create(batch)
+            batch = []
+    OrderStatusEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_alter_userwarehouserole_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered to Warehouse'), ('out_of_stock', 'Out of Stock'), ('ready_to_ship', 'Ready to Ship'), ('completed', 'Completed')], max_length=20)),
+                ('previous_status', models.CharField(blank=True, max_length=20)),
+                ('at', models.DateTimeField()),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='dashboard.orderfulfillment')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dashboard.store')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dashboard.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['warehouse', 'status', 'at'], name='orderevent_wh_status_at_idx'), models.Index(fields=['order', 'at'], name='orderevent_order_at_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_orderstatusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyStoreMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders_created', models.PositiveIntegerField(default=0)),
+                ('delivered', models.PositiveIntegerField(default=0)),
+                ('out_of_stock', models.PositiveIntegerField(default=0)),
+                ('shipped', models.PositiveIntegerField(default=0)),
+                ('units_ordered', models.PositiveIntegerField(default=0)),
+                ('units_shipped', models.PositiveIntegerField(default=0)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.store')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['warehouse', 'day'], name='storemetrics_wh_day_idx')],
+                'unique_together': {('store', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyWarehouseMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders_created', models.PositiveIntegerField(default=0)),
+                ('delivered', models.PositiveIntegerField(default=0)),
+                ('out_of_stock', models.PositiveIntegerField(default=0)),
+                ('shipped', models.PositiveIntegerField(default=0)),
+                ('units_ordered', models.PositiveIntegerField(default=0)),
+                ('units_shipped', models.PositiveIntegerField(default=0)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='whmetrics_day_idx')],
+                'unique_together': {('warehouse', 'day')},
+            },
+        ),
+    ]
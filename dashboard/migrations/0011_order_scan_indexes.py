@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderfulfillment',
+            index=models.Index(fields=['tracker_id'], name='order_tracker_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderfulfillment',
+            index=models.Index(fields=['amazon_order_id'], name='order_amazon_order_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderfulfillment',
+            index=models.Index(fields=['product', 'status'], name='order_product_status_idx'),
+        ),
+    ]
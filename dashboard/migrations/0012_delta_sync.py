@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:26
+
+from django.db import migrations, models
+
+
+def stamp_existing_rows(apps, schema_editor):
+    # Number existing rows by id so the first sync pages through them
+    # instead of returning one giant sequence number.
+    last = 0
+    for model_name in ('OrderFulfillment', 'Product', 'Store'):
+        model = apps.get_model('dashboard', model_name)
+        model.objects.update(change_seq=models.F('id'))
+        last = max(last, model.objects.aggregate(last=models.Max('id'))['last'] or 0)
+    Watermark = apps.get_model('dashboard', 'Watermark')
+    Watermark.objects.update_or_create(name='change_seq', defaults={'last_event_id': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_order_scan_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('warehouse_id', models.BigIntegerField(blank=True, null=True)),
+                ('change_seq', models.BigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderfulfillment',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='orderfulfillment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(stamp_existing_rows, migrations.RunPython.noop),
+    ]
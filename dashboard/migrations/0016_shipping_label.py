@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0015_user_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShippingLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('stored', 'Stored'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='label', to='dashboard.orderfulfillment')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0016_shipping_label'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductThumbnail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField()),
+                ('source_sha256', models.CharField(blank=True, max_length=64)),
+                ('size', models.PositiveSmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('ready', 'Ready'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnail', to='dashboard.product')),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0017_product_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderfulfillment',
+            name='tracking_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderfulfillment',
+            name='tracking_next_check_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderfulfillment',
+            name='tracking_status',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='orderfulfillment',
+            index=models.Index(condition=models.Q(('status', 'pending'), models.Q(('tracker_id', ''), _negated=True)), fields=['tracking_next_check_at'], name='order_tracking_due_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    # Replay past deliveries (stock in) and completions (stock out) from the
+    # status history so on-hand levels start from what already happened.
+    OrderStatusEvent = apps.get_model('dashboard', 'OrderStatusEvent')
+    InventoryMovement = apps.get_model('dashboard', 'InventoryMovement')
+    InventoryLevel = apps.get_model('dashboard', 'InventoryLevel')
+    signs = {'delivered': ('received', 1), 'completed': ('shipped', -1)}
+    events = (
+        OrderStatusEvent.objects.filter(
+            status__in=list(signs), warehouse__isnull=False, order__product__isnull=False, order__quantity__gt=0,
+        )
+        .values_list('order_id', 'order__product_id', 'warehouse_id', 'order__quantity', 'status', 'actor_id', 'at')
+        .order_by('id')
+    )
+    batch = []
+    for order_id, product_id, warehouse_id, quantity, status, actor_id, at in events.iterator(chunk_size=5000):
+        reason, sign = signs[status]
+        batch.append(InventoryMovement(
+            order_id=order_id, product_id=product_id, warehouse_id=warehouse_id,
+            quantity=sign * quantity, reason=reason, actor_id=actor_id, at=at,
+        ))
+        if len(batch) >= 5000:
+            InventoryMovement.objects.bulk_create(batch)
+            batch = []
+    InventoryMovement.objects.bulk_create(batch)
+
+    totals = InventoryMovement.objects.values('product_id', 'warehouse_id').annotate(total=models.Sum('quantity'))
+    InventoryLevel.objects.bulk_create(
+        [InventoryLevel(product_id=row['product_id'], warehouse_id=row['warehouse_id'], on_hand=row['total']) for row in totals],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0019_webhooks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.warehouse')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'warehouse'), name='inventory_level_product_wh_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(help_text='Positive for stock in, negative for stock out')),
+                ('reason', models.CharField(choices=[('received', 'Received'), ('shipped', 'Shipped'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('at', models.DateTimeField()),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dashboard.orderfulfillment')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'warehouse'], name='inventory_move_product_wh_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0020_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=30)),
+                ('zone', models.CharField(blank=True, max_length=20)),
+                ('sequence', models.PositiveIntegerField(default=0, help_text='Position along the pick path; lower is nearer the dock')),
+                ('capacity', models.PositiveIntegerField(help_text='Units the bin can hold')),
+                ('occupied', models.PositiveIntegerField(default=0, editable=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bins', to='dashboard.warehouse')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderfulfillment',
+            name='bin',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='dashboard.bin'),
+        ),
+        migrations.AddConstraint(
+            model_name='bin',
+            constraint=models.UniqueConstraint(fields=('warehouse', 'code'), name='bin_warehouse_code_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='bin',
+            constraint=models.CheckConstraint(condition=models.Q(('occupied__lte', models.F('capacity'))), name='bin_occupied_within_capacity'),
+        ),
+    ]
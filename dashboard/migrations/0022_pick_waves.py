@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0021_bins'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickWave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('completed', 'Completed')], default='open', max_length=10)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('unit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pick_waves', to='dashboard.warehouse')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderfulfillment',
+            name='wave',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='dashboard.pickwave'),
+        ),
+        migrations.AddIndex(
+            model_name='pickwave',
+            index=models.Index(fields=['warehouse', 'status'], name='pickwave_warehouse_status_idx'),
+        ),
+    ]
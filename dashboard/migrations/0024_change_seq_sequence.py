@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.models import Max
+
+
+def create_sequence(apps, schema_editor):
+    # Continue after every number handed out by the old row-locked counter
+    Watermark = apps.get_model('dashboard', 'Watermark')
+    start = max([
+        Watermark.objects.filter(name='change_seq').values_list('last_event_id', flat=True).first() or 0,
+        *(
+            apps.get_model('dashboard', name).objects.aggregate(last=Max('change_seq'))['last'] or 0
+            for name in ('OrderFulfillment', 'Product', 'Store', 'Tombstone')
+        ),
+    ])
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("CREATE SEQUENCE dashboard_change_seq")
+        if start:
+            cursor.execute("SELECT setval('dashboard_change_seq', %s)", [start])
+    Watermark.objects.filter(name='change_seq').delete()
+
+
+def drop_sequence(apps, schema_editor):
+    Watermark = apps.get_model('dashboard', 'Watermark')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM dashboard_change_seq"
+        )
+        last = cursor.fetchone()[0]
+        cursor.execute("DROP SEQUENCE dashboard_change_seq")
+    Watermark.objects.update_or_create(name='change_seq', defaults={'last_event_id': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0023_audit_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
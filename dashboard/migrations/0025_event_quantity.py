@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:17
+
+from django.db import migrations, models
+
+
+def backfill_quantity(apps, schema_editor):
+    # Past events only have the order's current quantity to go on
+    OrderStatusEvent = apps.get_model('dashboard', 'OrderStatusEvent')
+    OrderFulfillment = apps.get_model('dashboard', 'OrderFulfillment')
+    OrderStatusEvent.objects.update(quantity=models.Subquery(
+        OrderFulfillment.objects.filter(pk=models.OuterRef('order_id')).values('quantity')[:1]
+    ))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0024_change_seq_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderstatusevent',
+            name='quantity',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_quantity, migrations.RunPython.noop),
+    ]
@@ -1,25 +1,97 @@
+import secrets
+from datetime import timedelta
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Cast, Upper
+from django.db import connection, models
 from django.conf import settings
+from django.utils import timezone
+
+# ---------------------------------
+# DELTA SYNC
+# ---------------------------------
+
+# Delta-sync numbers come from a PostgreSQL sequence: nextval() never
+# waits for another transaction, so stamping a row doesn't serialise
+# writers. Numbers can become visible out of order; dashboard/sync.py
+# holds back rows that are too recent to be sure nothing below them is
+# still uncommitted.
+CHANGE_SEQ_SEQUENCE = 'dashboard_change_seq'
+
+
+def next_change_seq():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s)", [CHANGE_SEQ_SEQUENCE])
+        return cursor.fetchone()[0]
+
+
+class ChangeTracked(models.Model):
+    """
+    Rows served by the delta-sync API (dashboard/sync.py). Every save stamps
+    the row with the next change number; see next_change_seq().
+    """
+    change_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'change_seq', 'updated_at'}
+        self.change_seq = next_change_seq()
+        super().save(*args, **kwargs)
+
+# ---------------------------------
+# SOFT DELETE
+# ---------------------------------
+
+class ActiveManager(models.Manager):
+    """Hides rows that are soft-deleted and waiting for their purge job."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 # ---------------------------------
 # CORE MODELS
 # ---------------------------------
 
 class Warehouse(models.Model):
-    name = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=100)
     location = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            # A warehouse waiting to be purged must not block reusing its name
+            models.UniqueConstraint(
+                fields=['name'], condition=models.Q(deleted_at__isnull=True),
+                name='warehouse_name_active_uniq',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-class Store(models.Model):
+class Store(ChangeTracked):
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='stores')
     store_name = models.CharField(max_length=100)
     store_type = models.CharField(max_length=50, blank=True) 
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return f"{self.store_name} ({self.warehouse.name})"
@@ -63,9 +135,27 @@ class User(AbstractUser):
         related_name='users'
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination of the user list: ORDER BY date_joined DESC, id DESC
+            models.Index(fields=['-date_joined', '-id'], name='user_date_joined_id_idx'),
+            # icontains search compiles to UPPER(col::text) LIKE UPPER('%q%');
+            # trigram GIN indexes on that exact expression serve it.
+            GinIndex(OpClass(Upper(Cast('username', models.TextField())), name='gin_trgm_ops'), name='user_username_trgm_idx'),
+            GinIndex(OpClass(Upper(Cast('full_name', models.TextField())), name='gin_trgm_ops'), name='user_full_name_trgm_idx'),
+            GinIndex(OpClass(Upper(Cast('email', models.TextField())), name='gin_trgm_ops'), name='user_email_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
+    def get_session_auth_hash(self):
+        # Users served by CachedModelBackend are loaded without the password
+        # hash and carry the session hash instead (see dashboard/backends.py)
+        if 'password' not in self.__dict__ and hasattr(self, '_session_auth_hash'):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
 # models.py
 
 class UserWarehouseRole(models.Model):
@@ -89,7 +179,7 @@ class UserWarehouseRole(models.Model):
 # PRODUCT AND FULFILLMENT MODELS
 # ---------------------------------
 
-class Product(models.Model):
+class Product(ChangeTracked):
     code = models.CharField(max_length=100, unique=True, help_text="ASIN or UPC code")
     product_name = models.CharField(max_length=255)
     code_type = models.CharField(max_length=10, choices=[('asin', 'ASIN'), ('upc', 'UPC')])
@@ -101,7 +191,38 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.product_name} ({self.code})"
 
-class OrderFulfillment(models.Model):
+class ProductThumbnail(models.Model):
+    """Local thumbnails of Product.product_image_link (see dashboard/thumbnails.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='thumbnail')
+    # Thumbnails are only rebuilt when the product's link stops matching this
+    source_url = models.URLField()
+    # SHA-256 of the downloaded original; names the thumbnail files
+    source_sha256 = models.CharField(max_length=64, blank=True)
+    size = models.PositiveSmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    error = models.TextField(blank=True)
+    generated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Thumbnail for product {self.product_id} ({self.status})"
+
+    def is_current(self):
+        return self.status == 'ready' and self.source_url == self.product.product_image_link
+
+    @property
+    def webp_name(self):
+        return f"{self.source_sha256}-{self.size}.webp"
+
+    @property
+    def jpeg_name(self):
+        return f"{self.source_sha256}-{self.size}.jpg"
+
+class OrderFulfillment(ChangeTracked):
     
     
     STATUS_CHOICES = [
@@ -132,5 +253,494 @@ class OrderFulfillment(models.Model):
     action_taken_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='actioned_orders')
     action_taken_at = models.DateTimeField(null=True, blank=True)
 
+    # Carrier polling (dashboard/tracking.py). Poller bookkeeping, not order
+    # data: these are written without bumping change_seq.
+    tracking_status = models.CharField(max_length=50, blank=True)
+    tracking_checked_at = models.DateTimeField(null=True, blank=True)
+    tracking_next_check_at = models.DateTimeField(null=True, blank=True)
+
+    # Where a delivered order is stored until it ships (dashboard/putaway.py)
+    bin = models.ForeignKey('Bin', on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    # Pick wave the order is picked in (dashboard/waves.py)
+    wave = models.ForeignKey('PickWave', on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+
+    class Meta:
+        indexes = [
+            # Exact-match lookups from the dock scan station
+            models.Index(fields=['tracker_id'], name='order_tracker_id_idx'),
+            models.Index(fields=['amazon_order_id'], name='order_amazon_order_id_idx'),
+            models.Index(fields=['product', 'status'], name='order_product_status_idx'),
+            # Pending orders the carrier poller has to look at next
+            models.Index(
+                fields=['tracking_next_check_at'], name='order_tracking_due_idx',
+                condition=models.Q(status='pending') & ~models.Q(tracker_id=''),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Order {self.id} for {self.product.product_name if self.product else 'N/A'}"
+
+class ShippingLabel(models.Model):
+    """Local, content-addressed copy of an order's shipping_label_url (see dashboard/labels.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('stored', 'Stored'),
+        ('failed', 'Failed'),
+    ]
+    order = models.OneToOneField(OrderFulfillment, on_delete=models.CASCADE, related_name='label')
+    # The URL the stored file was (or is being) fetched from; a different
+    # shipping_label_url on the order means the copy is stale.
+    source_url = models.URLField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    error = models.TextField(blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Label for order {self.order_id} ({self.status})"
+
+# ---------------------------------
+# INVENTORY MODELS
+# ---------------------------------
+
+class Bin(models.Model):
+    """
+    A storage location in a warehouse. `occupied` counts the units of the
+    orders currently put away in it and is maintained by dashboard/putaway.py.
+    """
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='bins')
+    code = models.CharField(max_length=30)
+    zone = models.CharField(max_length=20, blank=True)
+    sequence = models.PositiveIntegerField(default=0, help_text="Position along the pick path; lower is nearer the dock")
+    capacity = models.PositiveIntegerField(help_text="Units the bin can hold")
+    occupied = models.PositiveIntegerField(default=0, editable=False)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['warehouse', 'code'], name='bin_warehouse_code_uniq'),
+            models.CheckConstraint(condition=models.Q(occupied__lte=models.F('capacity')), name='bin_occupied_within_capacity'),
+        ]
+
+    @property
+    def free(self):
+        return self.capacity - self.occupied
+
+    def clean(self):
+        if self.capacity is not None and self.capacity < self.occupied:
+            raise ValidationError({'capacity': f"Bin currently holds {self.occupied} units."})
+
+    def __str__(self):
+        return self.code
+
+
+class InventoryMovement(models.Model):
+    """
+    Append-only stock ledger (see dashboard/inventory.py): one signed row per
+    unit change of a product in a warehouse. Never update or delete by hand.
+    """
+    REASON_CHOICES = [
+        ('received', 'Received'),
+        ('shipped', 'Shipped'),
+        ('adjustment', 'Adjustment'),
+    ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='+')
+    quantity = models.IntegerField(help_text="Positive for stock in, negative for stock out")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    order = models.ForeignKey(OrderFulfillment, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'warehouse'], name='inventory_move_product_wh_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity:+d} x product {self.product_id} @ warehouse {self.warehouse_id} ({self.reason})"
+
+
+class InventoryLevel(models.Model):
+    """Units on hand per product and warehouse: the running sum of InventoryMovement."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='+')
+    on_hand = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'warehouse'], name='inventory_level_product_wh_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.on_hand} x product {self.product_id} @ warehouse {self.warehouse_id}"
+
+# ---------------------------------
+# PICK WAVE MODELS
+# ---------------------------------
+
+class PickWave(models.Model):
+    """A batch of ready-to-ship orders picked in one walk (see dashboard/waves.py)."""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('completed', 'Completed'),
+    ]
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='pick_waves')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    order_count = models.PositiveIntegerField(default=0)
+    unit_count = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['warehouse', 'status'], name='pickwave_warehouse_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Wave {self.pk} ({self.order_count} orders, {self.unit_count} units)"
+
+# ---------------------------------
+# ORDER HISTORY MODELS
+# ---------------------------------
+
+# Event ids and change_seq numbers are taken before commit, so a row can
+# become visible after one with a higher number. Incremental readers of the
+# event log (digests, rollups) and of delta sync only consume rows older
+# than this; transactions are assumed to commit within it.
+COMMIT_LAG = timedelta(minutes=1)
+
+
+class OrderStatusEventQuerySet(models.QuerySet):
+
+    def with_exit_time(self):
+        """
+        Annotate each event with `left_at`, the time of the same order's next
+        event (NULL while the order is still sitting in that status).
+        Resolved per row through the (order, at) index.
+        """
+        next_event = OrderStatusEvent.objects.filter(
+            order_id=models.OuterRef('order_id'),
+            at__gt=models.OuterRef('at'),
+        ).order_by('at').values('at')[:1]
+        return self.annotate(left_at=models.Subquery(next_event))
+
+    def time_in_stage(self, warehouse, status, since=None):
+        """
+        Average / max time orders spent in `status` for one warehouse,
+        counting only stages that have been left. Pass warehouse=None for all.
+        """
+        events = self.filter(status=status)
+        if warehouse is not None:
+            events = events.filter(warehouse=warehouse)
+        if since is not None:
+            events = events.filter(at__gte=since)
+        duration = models.ExpressionWrapper(
+            models.F('left_at') - models.F('at'),
+            output_field=models.DurationField(),
+        )
+        return events.with_exit_time().filter(left_at__isnull=False).aggregate(
+            orders=models.Count('id'),
+            average=models.Avg(duration),
+            longest=models.Max(duration),
+        )
+
+
+class OrderStatusEvent(models.Model):
+    """
+    Append-only log of every status an order has entered.
+    Rows are written by dashboard.transitions in the same transaction as
+    the status change; never update or delete them by hand.
+    """
+    order = models.ForeignKey(OrderFulfillment, on_delete=models.CASCADE, related_name='status_events')
+    # Denormalised from order.store so per-warehouse queries need no join.
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=OrderFulfillment.STATUS_CHOICES)
+    previous_status = models.CharField(max_length=20, blank=True)
+    # order.quantity when the event was logged, so rollups don't change
+    # when an order is edited afterwards
+    quantity = models.IntegerField(default=0)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    at = models.DateTimeField()
+
+    objects = OrderStatusEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['warehouse', 'status', 'at'], name='orderevent_wh_status_at_idx'),
+            models.Index(fields=['order', 'at'], name='orderevent_order_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.previous_status or '-'} -> {self.status}"
+
+
+# ---------------------------------
+# REPORTING ROLLUP MODELS
+# ---------------------------------
+
+class Watermark(models.Model):
+    """Last OrderStatusEvent id consumed by an incremental background task."""
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
+
+
+class Tombstone(models.Model):
+    """A deleted ChangeTracked row, so delta-sync clients can drop their copy."""
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    # Plain id: the warehouse may be the thing being deleted
+    warehouse_id = models.BigIntegerField(null=True, blank=True)
+    change_seq = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted @ {self.change_seq}"
+
+
+class DailyMetricsBase(models.Model):
+    day = models.DateField()
+    orders_created = models.PositiveIntegerField(default=0)
+    delivered = models.PositiveIntegerField(default=0)
+    out_of_stock = models.PositiveIntegerField(default=0)
+    shipped = models.PositiveIntegerField(default=0)
+    units_ordered = models.PositiveIntegerField(default=0)
+    units_shipped = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyStoreMetrics(DailyMetricsBase):
+    """Per-store, per-day counters maintained by `manage.py refresh_rollups`."""
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='+')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('store', 'day')
+        indexes = [
+            models.Index(fields=['warehouse', 'day'], name='storemetrics_wh_day_idx'),
+        ]
+
+
+class DailyWarehouseMetrics(DailyMetricsBase):
+    """Per-warehouse, per-day counters maintained by `manage.py refresh_rollups`."""
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('warehouse', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='whmetrics_day_idx'),
+        ]
+
+
+# ---------------------------------
+# BACKGROUND DELETION
+# ---------------------------------
+
+class DeletionJob(models.Model):
+    """Progress of purging one soft-deleted Warehouse or Store (dashboard/deletion.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    model_label = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    object_repr = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Delete {self.object_repr} ({self.get_status_display()})"
+
+# ---------------------------------
+# BACKGROUND JOB QUEUE
+# ---------------------------------
+
+class Job(models.Model):
+    """One unit of work for `manage.py run_workers` (see dashboard/jobs.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+
+    progress_done = models.BigIntegerField(default=0)
+    progress_total = models.BigIntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    locked_by = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim with: status = 'queued' AND run_at <= now ORDER BY run_at
+            models.Index(fields=['run_at'], condition=models.Q(status='queued'), name='job_queued_run_at_idx'),
+            models.Index(fields=['status', 'heartbeat_at'], name='job_status_heartbeat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def percent(self):
+        if not self.progress_total:
+            return 100 if self.status == 'done' else 0
+        return min(100, int(self.progress_done * 100 / self.progress_total))
+
+    def lease(self):
+        """
+        This run's row, while the run still owns it: after a missed heartbeat
+        requeue_stale() may have handed the job to another worker.
+        """
+        return Job.objects.filter(pk=self.pk, status='running', locked_by=self.locked_by, attempts=self.attempts)
+
+    def report(self, done, total=None, message=''):
+        """Record progress from inside a running handler; also acts as a heartbeat."""
+        self.progress_done = done
+        if total is not None:
+            self.progress_total = total
+        self.progress_message = message[:255]
+        self.heartbeat_at = timezone.now()
+        self.lease().update(
+            progress_done=self.progress_done,
+            progress_total=self.progress_total,
+            progress_message=self.progress_message,
+            heartbeat_at=self.heartbeat_at,
+        )
+
+
+class JobSchedule(models.Model):
+    """A periodic job; rows are synced from settings.JOB_SCHEDULES by the workers."""
+    name = models.CharField(max_length=100, unique=True)
+    job_name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    interval_seconds = models.PositiveIntegerField()
+    next_run_at = models.DateTimeField(default=timezone.now)
+    enabled = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} every {self.interval_seconds}s"
+
+
+# ---------------------------------
+# OUTBOUND WEBHOOKS
+# ---------------------------------
+
+def webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookSubscription(models.Model):
+    """An external endpoint notified of order status changes (see dashboard/webhooks.py)."""
+    name = models.CharField(max_length=100)
+    url = models.URLField()
+    # Signs every payload (HMAC-SHA256); share it with the subscriber
+    secret = models.CharField(max_length=64, default=webhook_secret)
+    # Statuses to send; empty means every status change
+    statuses = models.JSONField(default=list, blank=True)
+    # Only orders of this warehouse; empty means all warehouses
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    def wants(self, event):
+        return (
+            (not self.statuses or event.status in self.statuses) and
+            (self.warehouse_id is None or self.warehouse_id == event.warehouse_id)
+        )
+
+
+class WebhookDelivery(models.Model):
+    """Outbox row: one status event still to be (or already) sent to one subscriber."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    event = models.ForeignKey(OrderStatusEvent, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # What the delivery workers claim next
+            models.Index(
+                fields=['subscription', 'next_attempt_at'], name='webhook_delivery_due_idx',
+                condition=models.Q(status='queued'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Event {self.event_id} -> {self.subscription_id} ({self.status})"
+
+
+# ---------------------------------
+# AUDIT LOG
+# ---------------------------------
+
+class AuditEntry(models.Model):
+    """
+    One create, update or delete of an audited row (see dashboard/audit.py).
+    `changes` holds {field: [old, new]} for updates and {field: value} for
+    creates and deletes; foreign keys are stored as ids.
+    """
+    ACTION_CHOICES = [
+        ('create', 'Created'),
+        ('update', 'Updated'),
+        ('delete', 'Deleted'),
+    ]
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # History of one object, newest first
+            models.Index(fields=['content_type', 'object_id', '-at'], name='audit_object_idx'),
+            # Everything one user changed, newest first
+            models.Index(fields=['actor', '-at'], name='audit_actor_idx'),
+        ]
+
     def __str__(self):
-        return f"Order {self.id} for {self.product.product_name if self.product else 'N/A'}"
\ No newline at end of file
+        return f"{self.get_action_display()} {self.content_type.model} #{self.object_id}"
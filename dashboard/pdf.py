@@ -0,0 +1,241 @@
+import io
+import zlib
+from collections.abc import Mapping
+
+from PIL import Image, ImageOps, PdfParser
+
+# ---------------------------------
+# STREAMING PDF WRITER
+# ---------------------------------
+# A small PDF 1.4 writer for print batches (dashboard/printing.py). Every
+# method returns the bytes to send next; only object offsets and page ids
+# are kept until finish() writes the page tree and the xref table, so a
+# document of any length is produced in constant memory. Text uses the
+# built-in Helvetica fonts (nothing embedded), images are embedded as JPEG,
+# and pages of existing PDFs are copied over with Pillow's PDF parser.
+# Kept free of Django imports, like dashboard/imaging.py.
+
+LETTER = (612, 792)
+LABEL_4X6 = (288, 432)
+MARGIN = 36
+INHERITED_PAGE_KEYS = (b'Resources', b'MediaBox', b'CropBox', b'Rotate')
+
+CATALOG_ID = 1
+PAGES_ID = 2
+
+
+def _text(value):
+    """A PDF literal string in WinAnsi (Helvetica's encoding)."""
+    data = str(value).encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def wrap(text, size, width):
+    """Split `text` into lines that fit `width` points (average Helvetica glyph ~0.5em)."""
+    per_line = max(1, int(width / (size * 0.5)))
+    lines = []
+    for paragraph in str(text).splitlines() or ['']:
+        words = paragraph.split(' ')
+        line = ''
+        for word in words:
+            while len(word) > per_line:
+                if line:
+                    lines.append(line)
+                    line = ''
+                lines.append(word[:per_line])
+                word = word[per_line:]
+            candidate = f"{line} {word}" if line else word
+            if len(candidate) > per_line:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+class PdfWriter:
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.next_id = PAGES_ID + 1
+        self.page_ids = []
+        self.font_ids = None
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def reserve(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def object(self, object_id, body, stream=None):
+        """Serialise object `object_id`; `stream` is its (already encoded) stream data."""
+        self.offsets[object_id] = self.offset
+        parts = [b'%d 0 obj\n' % object_id, body]
+        if stream is not None:
+            parts += [b'\nstream\n', stream, b'\nendstream']
+        parts.append(b'\nendobj\n')
+        return self._emit(b''.join(parts))
+
+    def start(self):
+        return self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _page(self, size, content, resources):
+        content = zlib.compress(content)
+        content_id, page_id = self.reserve(), self.reserve()
+        self.page_ids.append(page_id)
+        return b''.join([
+            self.object(content_id, b'<< /Length %d /Filter /FlateDecode >>' % len(content), content),
+            self.object(page_id, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>' % (
+                PAGES_ID, size[0], size[1], resources, content_id,
+            )),
+        ])
+
+    # --- Page types ---
+
+    def text_page(self, lines, size=LETTER):
+        """A page of text. `lines` yields (font size, bold, text); long lines are wrapped."""
+        chunks = []
+        if self.font_ids is None:
+            self.font_ids = (self.reserve(), self.reserve())
+            for font_id, name in zip(self.font_ids, (b'Helvetica', b'Helvetica-Bold')):
+                chunks.append(self.object(
+                    font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % name,
+                ))
+        content = [b'BT']
+        y = size[1] - MARGIN
+        for font_size, bold, text in lines:
+            for line in wrap(text, font_size, size[0] - 2 * MARGIN):
+                y -= font_size * 1.35
+                if y < MARGIN:
+                    break
+                content.append(b'/F%d %d Tf 1 0 0 1 %d %.1f Tm %s Tj' % (
+                    2 if bold else 1, font_size, MARGIN, y, _text(line),
+                ))
+        content.append(b'ET')
+        resources = b'<< /Font << /F1 %d 0 R /F2 %d 0 R >> >>' % self.font_ids
+        chunks.append(self._page(size, b'\n'.join(content), resources))
+        return b''.join(chunks)
+
+    def image_page(self, jpeg, width, height, grayscale=False, size=LABEL_4X6):
+        """A page showing one JPEG, scaled to fit inside the margins and centred."""
+        image_id = self.reserve()
+        chunk = self.object(image_id, (
+            b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /%s '
+            b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>'
+        ) % (width, height, b'DeviceGray' if grayscale else b'DeviceRGB', len(jpeg)), jpeg)
+        margin = MARGIN / 4
+        scale = min((size[0] - 2 * margin) / width, (size[1] - 2 * margin) / height)
+        w, h = width * scale, height * scale
+        content = b'q %.2f 0 0 %.2f %.2f %.2f cm /Im1 Do Q' % (w, h, (size[0] - w) / 2, (size[1] - h) / 2)
+        return chunk + self._page(size, content, b'<< /XObject << /Im1 %d 0 R >> >>' % image_id)
+
+    def import_pages(self, data):
+        """
+        Copy every page of the PDF in `data`. Raises ValueError when the file
+        cannot be copied (encrypted, compressed xref streams...); nothing has
+        been emitted in that case.
+        """
+        try:
+            parser = PdfParser.PdfParser(buf=data)
+            if b'Encrypt' in parser.trailer_dict:
+                raise ValueError("Encrypted PDF")
+            mapping = {}
+            pending = []
+
+            def remap(value):
+                if isinstance(value, PdfParser.IndirectReference):
+                    if value.object_id not in mapping:
+                        mapping[value.object_id] = self.reserve()
+                        pending.append(value)
+                    return PdfParser.IndirectReference(mapping[value.object_id], 0)
+                if isinstance(value, Mapping):
+                    return PdfParser.PdfDict({key: remap(item) for key, item in value.items()})
+                if isinstance(value, list):
+                    return PdfParser.PdfArray([remap(item) for item in value])
+                return value
+
+            pages = []
+            for page_ref in parser.pages:
+                page = dict(parser.read_indirect(page_ref))
+                parent = page.pop(b'Parent', None)
+                while parent is not None:
+                    # Attributes a page can inherit from its page-tree ancestors
+                    node = parser.read_indirect(parent)
+                    for key in INHERITED_PAGE_KEYS:
+                        if key not in page and key in node:
+                            page[key] = node[key]
+                    parent = node.get(b'Parent')
+                page.pop(b'Annots', None)
+                page = remap(page)
+                page[b'Parent'] = PdfParser.IndirectReference(PAGES_ID, 0)
+                pages.append(page)
+
+            objects = []
+            while pending:
+                reference = pending.pop()
+                value = parser.read_indirect(reference)
+                if isinstance(value, PdfParser.PdfStream):
+                    objects.append((mapping[reference.object_id], bytes(remap(value.dictionary)), value.buf))
+                else:
+                    objects.append((mapping[reference.object_id], PdfParser.pdf_repr(remap(value)), None))
+        except Exception as e:
+            # Third-party files: anything the parser trips over means "can't copy"
+            raise ValueError(f"Unsupported PDF: {e}") from e
+        finally:
+            if 'parser' in locals():
+                parser.close()
+        if not pages:
+            raise ValueError("PDF has no pages")
+
+        chunks = [self.object(object_id, body, stream) for object_id, body, stream in objects]
+        for page in pages:
+            page_id = self.reserve()
+            self.page_ids.append(page_id)
+            chunks.append(self.object(page_id, bytes(page)))
+        return b''.join(chunks)
+
+    def finish(self):
+        """Page tree, catalog, xref table and trailer."""
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        chunks = [
+            self.object(PAGES_ID, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids))),
+            self.object(CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES_ID),
+        ]
+        xref_offset = self.offset
+        xref = [b'xref\n0 %d\n' % self.next_id, b'0000000000 65535 f \n']
+        for object_id in range(1, self.next_id):
+            if object_id in self.offsets:
+                xref.append(b'%010d 00000 n \n' % self.offsets[object_id])
+            else:
+                xref.append(b'0000000000 65535 f \n')
+        xref.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            self.next_id, CATALOG_ID, xref_offset,
+        ))
+        chunks.append(self._emit(b''.join(xref)))
+        return b''.join(chunks)
+
+
+def prepare_image(data, max_pixels=2400):
+    """
+    Re-encode image bytes for image_page(): returns (jpeg, width, height,
+    grayscale). Raises OSError/ValueError if Pillow cannot read them.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('1', 'L', 'LA', 'I', 'I;16'):
+            image = image.convert('L')
+        elif image.mode in ('RGBA', 'P', 'PA'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+        image.thumbnail((max_pixels, max_pixels))
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=90)
+        return out.getvalue(), image.width, image.height, image.mode == 'L'
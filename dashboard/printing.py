@@ -0,0 +1,185 @@
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import labels
+from .models import OrderFulfillment, ShippingLabel
+from .pdf import LABEL_4X6, PdfWriter, prepare_image
+
+# ---------------------------------
+# BATCH PRINTING
+# ---------------------------------
+# One PDF for a batch of orders: each order's packing slip followed by its
+# shipping label, in pick-path order. render_batch() is a generator - every
+# page is sent (or written) as soon as it is rendered, and only a sliding
+# window of labels is in flight, so memory stays flat however large the
+# batch. Labels are read from the local label store when fetched already,
+# otherwise downloaded, by LABEL_FETCH_WORKERS threads that touch files only,
+# never the ORM. PDF labels are copied page by page, images are embedded;
+# a label that can't be used gets a page saying so instead of failing the
+# batch. Small batches stream straight to the browser, large ones are built
+# by the build_print_batch job into PRINT_BATCH_ROOT.
+
+# Futures queued per worker: enough to keep every thread busy
+WINDOW_PER_WORKER = 2
+# Built batches are deleted after this long
+KEEP_SECONDS = 24 * 60 * 60
+REPORT_EVERY = 25
+
+
+def storage_root():
+    return Path(settings.PRINT_BATCH_ROOT)
+
+
+def batch_path(job_id):
+    return storage_root() / f'batch-{job_id}.pdf'
+
+
+# --- Pages ---
+
+def slip_lines(order, printed_at):
+    store = order.store
+    product = order.product
+    lines = [
+        (20, True, "Packing Slip"),
+        (10, False, f"Order #{order.pk}    Printed {printed_at:%b %d, %Y %H:%M}"),
+        (12, False, ""),
+        (12, True, f"Store: {store.store_name if store else '-'}"),
+        (11, False, f"Warehouse: {store.warehouse.name if store else '-'}"),
+        (11, False, f"Bin: {order.bin.code if order.bin else '-'}"),
+        (12, False, ""),
+        (14, True, product.product_name if product else "(no product)"),
+        (11, False, f"{(order.code_type or (product.code_type if product else '')).upper()}: {product.code if product else '-'}"),
+        (14, True, f"Quantity: {order.quantity}"),
+        (12, False, ""),
+    ]
+    for label, value in (
+        ("Supplier order", order.supplier_order_id),
+        ("Amazon order", order.amazon_order_id),
+        ("Team code", order.team_code),
+        ("Tracker", order.tracker_id),
+        ("Notes", order.notes),
+    ):
+        if value:
+            lines.append((11, False, f"{label}: {value}"))
+    return lines
+
+
+def _load_label(url, path):
+    """
+    Runs in a pool thread: the label's bytes from the store (downloading
+    them first if needed), decoded as ('pdf', data) or ('image', prepared).
+    """
+    if path is None or not path.exists():
+        sha256, _, _ = labels.download(url)
+        path = labels.label_path(sha256)
+    data = path.read_bytes()
+    if b'%PDF-' in data[:1024]:
+        return 'pdf', data
+    return 'image', prepare_image(data)
+
+
+def _label_pages(writer, order, future):
+    try:
+        kind, payload = future.result()
+        if kind == 'pdf':
+            return writer.import_pages(payload)
+        return writer.image_page(*payload)
+    except Exception as e:
+        # Anything from the download or the decoders (IncompleteRead,
+        # DecompressionBombError, malformed PDFs ...) costs one label, not the batch
+        return writer.text_page([
+            (14, True, f"Shipping label - order #{order.pk}"),
+            (10, False, "This label could not be added to the batch; print it from the link below."),
+            (10, False, str(e)[:200]),
+            (10, False, order.shipping_label_url),
+        ], size=LABEL_4X6)
+
+
+def render_batch(order_ids, report=None):
+    """
+    Yield the batch PDF for `order_ids` in chunks. `report(done, total)` is
+    called as orders are finished.
+    """
+    orders = (
+        OrderFulfillment.objects.filter(pk__in=order_ids)
+        .select_related('store__warehouse', 'product', 'bin')
+        .order_by(F('bin__zone').asc(nulls_last=True), F('bin__sequence').asc(nulls_last=True), 'bin__code', 'id')
+    )
+    total = orders.count()
+    # Stored labels that still match the order's URL
+    stored = {
+        (order_id, url): labels.label_path(sha256)
+        for order_id, url, sha256 in ShippingLabel.objects.filter(order_id__in=order_ids, status='stored')
+        .values_list('order_id', 'source_url', 'sha256')
+    }
+
+    writer = PdfWriter()
+    printed_at = timezone.localtime()
+    yield writer.start()
+    workers = settings.LABEL_FETCH_WORKERS
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='print-label')
+    window = deque()
+    done = 0
+    try:
+        orders = orders.iterator(chunk_size=500)
+        while True:
+            order = next(orders, None)
+            if order is not None:
+                future = None
+                if order.shipping_label_url:
+                    path = stored.get((order.pk, order.shipping_label_url))
+                    future = pool.submit(_load_label, order.shipping_label_url, path)
+                window.append((order, future))
+                if len(window) < workers * WINDOW_PER_WORKER:
+                    continue
+            if not window:
+                break
+            order, future = window.popleft()
+            yield writer.text_page(slip_lines(order, printed_at))
+            if future is not None:
+                yield _label_pages(writer, order, future)
+            done += 1
+            if report and (done % REPORT_EVERY == 0 or done == total):
+                report(done, total)
+    finally:
+        # Also runs when the client goes away mid-download
+        pool.shutdown(wait=False, cancel_futures=True)
+    yield writer.finish()
+
+
+# --- Stored batches ---
+
+def purge_batches(now=None):
+    """Delete built batches older than KEEP_SECONDS; returns how many went."""
+    now = now or time.time()
+    root = storage_root()
+    if not root.exists():
+        return 0
+    purged = 0
+    for path in root.iterdir():
+        if path.stat().st_mtime < now - KEEP_SECONDS:
+            path.unlink(missing_ok=True)
+            purged += 1
+    return purged
+
+
+def write_batch(order_ids, path, report=None):
+    """Render the batch into `path`; the file only appears once complete."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix='.incoming-', delete=False) as incoming:
+        try:
+            for chunk in render_batch(order_ids, report=report):
+                incoming.write(chunk)
+        except BaseException:
+            os.unlink(incoming.name)
+            raise
+    os.replace(incoming.name, path)
+    return path.stat().st_size
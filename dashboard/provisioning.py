@@ -0,0 +1,162 @@
+import csv
+
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from . import audit
+from .hashing import hash_passwords
+from .models import Role, Store, User, UserWarehouseRole, Warehouse
+
+# ---------------------------------
+# BULK USER IMPORT (CSV)
+# ---------------------------------
+# One CSV row per assignment; repeat the username on extra rows to give a
+# user several assignments (user columns are read from its first row).
+# Everything is validated against maps loaded up front, passwords are
+# hashed in a process pool, and users plus assignments are written with two
+# bulk_create calls in one transaction - the import is all or nothing.
+
+CSV_COLUMNS = [
+    'username', 'password', 'full_name', 'email', 'phone_number',
+    'primary_role', 'warehouse', 'role', 'store',
+]
+MAX_ROWS = 5000
+MANAGER_ROLES = ['store_manager', 'warehouse_manager']
+
+
+def import_users(lines, warehouse=None):
+    """
+    Import users from CSV `lines`. `warehouse` limits the import the way the
+    create-user form limits a Warehouse Admin: that warehouse only, manager
+    roles only. Raises ValidationError listing every bad row.
+    Returns (users created, assignments created).
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in ('username', 'warehouse', 'role') if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValidationError(f"Missing CSV column(s): {', '.join(missing)}. Expected: {', '.join(CSV_COLUMNS)}")
+    rows = list(reader)
+    if len(rows) > MAX_ROWS:
+        raise ValidationError(f"At most {MAX_ROWS} rows can be imported at once.")
+
+    # --- Preloaded lookup maps ---
+    warehouses = Warehouse.objects.all() if warehouse is None else Warehouse.objects.filter(pk=warehouse.pk)
+    warehouses_by_name = {w.name.strip().lower(): w for w in warehouses}
+    stores_by_name = {
+        (s.warehouse_id, s.store_name.strip().lower()): s
+        for s in Store.objects.filter(warehouse__in=list(warehouses_by_name.values()))
+    }
+    roles = Role.objects.all() if warehouse is None else Role.objects.filter(name__in=MANAGER_ROLES)
+    roles_by_name = {r.name: r for r in roles}
+    primary_roles = dict(User.ROLE_CHOICES) if warehouse is None else MANAGER_ROLES
+
+    usernames = {(row.get('username') or '').strip().lower() for row in rows}
+    taken = set(
+        User.objects.annotate(lower=Lower('username'))
+        .filter(lower__in=usernames).values_list('lower', flat=True)
+    )
+    username_field = User._meta.get_field('username')
+
+    # --- Validation ---
+    errors = []
+    users = {}
+    first_lines = {}
+    assignments = {}
+    for line, row in enumerate(rows, start=2):
+        row = {key: (value or '').strip() for key, value in row.items() if key}
+        username = row.get('username', '')
+        key = username.lower()
+        row_errors = []
+
+        if not username:
+            row_errors.append("username is required")
+        elif key in taken:
+            row_errors.append(f"user '{username}' already exists")
+        else:
+            try:
+                username_field.run_validators(username)
+            except ValidationError as e:
+                row_errors.extend(e.messages)
+
+        if username and key not in taken and key not in users:
+            primary_role = row.get('primary_role') or row.get('role', '')
+            candidate = User(
+                username=username,
+                full_name=row.get('full_name', ''),
+                email=row.get('email', ''),
+                phone_number=row.get('phone_number', ''),
+                primary_role=primary_role,
+            )
+            password = row.get('password', '')
+            if primary_role not in primary_roles:
+                row_errors.append(f"primary_role '{primary_role}' is not allowed")
+            if candidate.email:
+                try:
+                    validate_email(candidate.email)
+                except ValidationError as e:
+                    row_errors.extend(e.messages)
+            if not password:
+                row_errors.append("password is required on a user's first row")
+            else:
+                try:
+                    password_validation.validate_password(password, candidate)
+                except ValidationError as e:
+                    row_errors.extend(e.messages)
+            if not row_errors:
+                users[key] = (candidate, password)
+                first_lines[key] = line
+
+        target = warehouses_by_name.get(row.get('warehouse', '').lower())
+        role = roles_by_name.get(row.get('role', ''))
+        store = None
+        if target is None:
+            row_errors.append(f"unknown warehouse '{row.get('warehouse', '')}'")
+        if role is None:
+            row_errors.append(f"role '{row.get('role', '')}' is not allowed")
+        if target and row.get('store'):
+            store = stores_by_name.get((target.pk, row['store'].lower()))
+            if store is None:
+                row_errors.append(f"store '{row['store']}' not found in {target.name}")
+        elif role and role.name == 'store_manager':
+            row_errors.append("store is required for store_manager")
+
+        if row_errors:
+            errors.append(f"Line {line}: {'; '.join(row_errors)}")
+        elif target and role:
+            assignments[(key, target.pk, role.pk, store.pk if store else None)] = (key, target, role, store)
+
+    if errors:
+        raise ValidationError(errors)
+
+    # --- Hash (process pool) and insert ---
+    keys = list(users)
+    hashes = hash_passwords(users[key][1] for key in keys)
+    for key, hashed in zip(keys, hashes):
+        users[key][0].password = hashed
+
+    try:
+        with transaction.atomic():
+            created = {user.username.lower(): user for user in User.objects.bulk_create([users[key][0] for key in keys])}
+            roles = UserWarehouseRole.objects.bulk_create([
+                UserWarehouseRole(user=created[key], warehouse=target, role=role, store=store)
+                for key, target, role, store in assignments.values()
+            ])
+            # bulk_create sends no post_save; see dashboard/audit.py
+            for obj in [*created.values(), *roles]:
+                audit.record_saved(obj, created=True)
+    except IntegrityError:
+        # Someone else created one of the usernames since it was checked
+        taken = set(
+            User.objects.annotate(lower=Lower('username'))
+            .filter(lower__in=keys).values_list('lower', flat=True)
+        )
+        if not taken:
+            raise
+        raise ValidationError([
+            f"Line {first_lines[key]}: user '{users[key][0].username}' already exists"
+            for key in keys if key in taken
+        ])
+    return len(created), len(assignments)
@@ -0,0 +1,318 @@
+import csv
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Bin, OrderFulfillment
+
+# ---------------------------------
+# PUTAWAY
+# ---------------------------------
+# Orders get a bin when they are delivered (transitions.py calls
+# record_status_changes) and give it back once they leave the shelf.
+# Suggestions come from a per-process BinIndex for each warehouse: every
+# active bin with room, sorted by (free units, pick-path sequence), so the
+# best fit - the fullest bin that still takes the order, nearest the dock
+# among equals - is one bisect away. The database stays authoritative: the
+# chosen bins are locked and re-checked before anything is written, and the
+# index is corrected from what the lock read once the transaction commits,
+# so a rolled-back putaway never leaves it out of step. An index is rebuilt when its
+# warehouse's bins are edited (signals.py bumps a version in the cache) and
+# after INDEX_MAX_AGE seconds, which picks up space freed by other processes.
+
+HOLDING_STATUSES = ('delivered', 'ready_to_ship')
+INDEX_MAX_AGE = 300
+MAX_ROUNDS = 3
+
+
+def index_version_key(warehouse_id):
+    return f'putaway:bins:{warehouse_id}'
+
+
+class BinIndex:
+    """Bins of one warehouse that have room, ordered for best-fit lookups."""
+
+    def __init__(self, rows):
+        # rows: (bin_id, free, sequence)
+        self.sequence = {}
+        self.free = {}
+        self.entries = []
+        for bin_id, free, sequence in rows:
+            self.sequence[bin_id] = sequence
+            if free > 0:
+                self.free[bin_id] = free
+                self.entries.append((free, sequence, bin_id))
+        self.entries.sort()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def best_fit(self, quantity):
+        """Id of the bin with the least room that still holds `quantity`, or None."""
+        # (quantity,) sorts before every (quantity, sequence, id) entry
+        position = bisect_left(self.entries, (quantity,))
+        return self.entries[position][2] if position < len(self.entries) else None
+
+    def set_free(self, bin_id, free):
+        if bin_id not in self.sequence:
+            # Created after this index was built; the next rebuild adds it
+            return
+        old = self.free.pop(bin_id, None)
+        if old is not None:
+            del self.entries[bisect_left(self.entries, (old, self.sequence[bin_id], bin_id))]
+        if free > 0:
+            self.free[bin_id] = free
+            insort(self.entries, (free, self.sequence[bin_id], bin_id))
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(warehouse_id):
+    """This process's index for a warehouse, rebuilt if stale. Call with _lock held."""
+    version = cache.get(index_version_key(warehouse_id))
+    cached = _indexes.get(warehouse_id)
+    if cached and cached[0] == version and time.monotonic() - cached[1] < INDEX_MAX_AGE:
+        return cached[2]
+    index = BinIndex(
+        Bin.objects.filter(warehouse_id=warehouse_id, is_active=True)
+        .values_list('id', F('capacity') - F('occupied'), 'sequence')
+    )
+    _indexes[warehouse_id] = (version, time.monotonic(), index)
+    return index
+
+
+def invalidate(warehouse_id):
+    """Make every process rebuild this warehouse's index on its next putaway."""
+    cache.set(index_version_key(warehouse_id), time.time_ns(), None)
+    with _lock:
+        _indexes.pop(warehouse_id, None)
+
+
+def suggest(warehouse_id, quantity):
+    """The bin putaway would choose for `quantity` units right now, or None."""
+    with _lock:
+        bin_id = get_index(warehouse_id).best_fit(quantity)
+    return Bin.objects.filter(pk=bin_id).first() if bin_id else None
+
+
+# --- Assigning and releasing ---
+
+def _plan(index, orders, written):
+    """
+    Best-fit bins for [(order_id, quantity)], on top of the uncommitted
+    {bin_id: units} already `written` by this putaway; returns (plan, units
+    needed per bin) and leaves the index as it was. Call with _lock held.
+    """
+    restore = {}
+
+    def take(bin_id, units):
+        restore.setdefault(bin_id, index.free.get(bin_id, 0))
+        index.set_free(bin_id, index.free.get(bin_id, 0) - units)
+
+    for bin_id, units in written.items():
+        take(bin_id, units)
+    plan = {}
+    need = defaultdict(int)
+    for order_id, quantity in orders:
+        bin_id = index.best_fit(quantity)
+        if bin_id is not None:
+            take(bin_id, quantity)
+            plan[order_id] = bin_id
+            need[bin_id] += quantity
+    for bin_id, free in restore.items():
+        index.set_free(bin_id, free)
+    return plan, need
+
+
+def _settle(warehouse_id, free):
+    """Record committed free space {bin_id: units} in this process's index for the warehouse."""
+    with _lock:
+        cached = _indexes.get(warehouse_id)
+        if cached:
+            for bin_id, units in free.items():
+                cached[2].set_free(bin_id, units)
+
+
+def _assign(warehouse_id, orders):
+    """Put away [(order_id, quantity)] in one warehouse; returns {order_id: bin_id}."""
+    assigned = {}
+    # Units this putaway wrote to each bin, and each bin's free space once
+    # it commits; the index only takes either after the commit
+    written = defaultdict(int)
+    settled = {}
+    # Largest orders first leave the small gaps for the small ones
+    pending = sorted(orders, key=lambda order: -order[1])
+    for _ in range(MAX_ROUNDS):
+        with _lock:
+            plan, need = _plan(get_index(warehouse_id), pending, written)
+        if not plan:
+            break
+
+        # Lock in id order so concurrent putaways never deadlock, then re-check
+        free = dict(
+            Bin.objects.select_for_update()
+            .filter(pk__in=list(need), is_active=True)
+            .order_by('pk')
+            .values_list('pk', F('capacity') - F('occupied'))
+        )
+        fits = {bin_id for bin_id, units in need.items() if free.get(bin_id, 0) >= units}
+        for bin_id, units in need.items():
+            settled[bin_id] = free.get(bin_id, 0) - (units if bin_id in fits else 0)
+        # Bins fuller than this process thought hold other putaways' committed
+        # units; the next round must see that now
+        _settle(warehouse_id, {bin_id: free.get(bin_id, 0) + written[bin_id] for bin_id in need.keys() - fits})
+
+        placed = {order_id: bin_id for order_id, bin_id in plan.items() if bin_id in fits}
+        if placed:
+            Bin.objects.filter(pk__in=fits).update(occupied=F('occupied') + Case(
+                *[When(pk=bin_id, then=Value(need[bin_id])) for bin_id in fits],
+                output_field=models.PositiveIntegerField(),
+            ))
+            OrderFulfillment.objects.filter(pk__in=list(placed)).update(bin_id=Case(
+                *[When(pk=order_id, then=Value(bin_id)) for order_id, bin_id in placed.items()],
+                output_field=models.BigIntegerField(),
+            ))
+            for bin_id in fits:
+                written[bin_id] += need[bin_id]
+            assigned.update(placed)
+        if len(fits) == len(need):
+            break
+        # Some bins were fuller than this process thought; retry those orders
+        pending = [order for order in pending if order[0] in plan and order[0] not in placed]
+    if settled:
+        transaction.on_commit(lambda: _settle(warehouse_id, settled))
+    return assigned
+
+
+def _release(rows):
+    """Give back the space of [(order_id, bin_id, warehouse_id, quantity)]."""
+    freed = defaultdict(int)
+    warehouses = {}
+    for _, bin_id, warehouse_id, quantity in rows:
+        freed[bin_id] += quantity
+        warehouses[bin_id] = warehouse_id
+    Bin.objects.filter(pk__in=list(freed)).update(occupied=Greatest(F('occupied') - Case(
+        *[When(pk=bin_id, then=Value(units)) for bin_id, units in freed.items()],
+        output_field=models.PositiveIntegerField(),
+    ), 0))
+    OrderFulfillment.objects.filter(pk__in=[row[0] for row in rows]).update(bin=None)
+
+    def give_back():
+        with _lock:
+            for bin_id, units in freed.items():
+                cached = _indexes.get(warehouses[bin_id])
+                if cached:
+                    index = cached[2]
+                    index.set_free(bin_id, index.free.get(bin_id, 0) + units)
+
+    transaction.on_commit(give_back)
+
+
+@transaction.atomic
+def record_status_changes(order_ids, status):
+    """
+    Keep bins in step with orders that just entered `status`: delivered
+    orders without a bin are put away, orders leaving the shelf free
+    theirs. Returns {order_id: bin_id} for the orders put away.
+    """
+    if status in HOLDING_STATUSES:
+        if status != 'delivered':
+            return {}
+        by_warehouse = defaultdict(list)
+        rows = (
+            OrderFulfillment.objects.filter(pk__in=order_ids, bin__isnull=True, store__isnull=False, quantity__gt=0)
+            .values_list('id', 'store__warehouse_id', 'quantity')
+        )
+        for order_id, warehouse_id, quantity in rows:
+            by_warehouse[warehouse_id].append((order_id, quantity))
+        assigned = {}
+        for warehouse_id, orders in by_warehouse.items():
+            assigned.update(_assign(warehouse_id, orders))
+        return assigned
+
+    rows = list(
+        OrderFulfillment.objects.filter(pk__in=order_ids, bin__isnull=False)
+        .values_list('id', 'bin_id', 'bin__warehouse_id', 'quantity')
+    )
+    if rows:
+        _release(rows)
+    return {}
+
+
+def recount(warehouse_id=None):
+    """Recompute `occupied` from the orders on the shelves; returns the bins changed."""
+    bins = Bin.objects.all() if warehouse_id is None else Bin.objects.filter(warehouse_id=warehouse_id)
+    held = (
+        OrderFulfillment.objects.filter(bin=OuterRef('pk'), status__in=HOLDING_STATUSES)
+        .values('bin').annotate(units=Sum('quantity')).values('units')
+    )
+    with transaction.atomic():
+        changed = bins.annotate(held=Coalesce(Subquery(held), 0)).exclude(occupied=F('held'))
+        counts = list(changed.values_list('pk', 'held', 'warehouse_id'))
+        for bin_id, units, _ in counts:
+            Bin.objects.filter(pk=bin_id).update(occupied=units)
+    for warehouse_id in {row[2] for row in counts}:
+        invalidate(warehouse_id)
+    return len(counts)
+
+
+# --- Bulk import ---
+
+BIN_CSV_COLUMNS = ['code', 'zone', 'sequence', 'capacity']
+
+
+def import_bins(warehouse, lines):
+    """
+    Create or update `warehouse`'s bins from CSV `lines` (BIN_CSV_COLUMNS;
+    rows with an existing code update and reactivate that bin). Raises ValidationError
+    listing every bad row. Returns the number of bins written.
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in ('code', 'capacity') if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValidationError(f"Missing CSV column(s): {', '.join(missing)}. Expected: {', '.join(BIN_CSV_COLUMNS)}")
+    occupied = dict(Bin.objects.filter(warehouse=warehouse).values_list('code', 'occupied'))
+
+    bins = {}
+    errors = []
+    for line, row in enumerate(reader, start=2):
+        code = (row.get('code') or '').strip()
+        try:
+            capacity = int(row['capacity'])
+            sequence = int(row.get('sequence') or 0)
+        except (TypeError, ValueError):
+            errors.append(f"Line {line}: capacity and sequence must be whole numbers.")
+            continue
+        if not code or len(code) > 30:
+            errors.append(f"Line {line}: code is required (at most 30 characters).")
+        elif code in bins:
+            errors.append(f"Line {line}: bin {code} appears twice.")
+        elif sequence < 0:
+            errors.append(f"Line {line}: bin {code} needs a sequence of 0 or more.")
+        elif capacity < max(occupied.get(code, 0), 1):
+            errors.append(f"Line {line}: bin {code} needs a capacity of at least {max(occupied.get(code, 0), 1)}.")
+        else:
+            bins[code] = Bin(
+                warehouse=warehouse, code=code, zone=(row.get('zone') or '').strip()[:20],
+                sequence=sequence, capacity=capacity,
+            )
+    if errors:
+        raise ValidationError(errors)
+
+    with transaction.atomic():
+        Bin.objects.bulk_create(
+            bins.values(), batch_size=5000,
+            update_conflicts=True, unique_fields=['warehouse', 'code'],
+            update_fields=['zone', 'sequence', 'capacity', 'is_active'],
+        )
+    invalidate(warehouse.pk)
+    return len(bins)
@@ -0,0 +1,110 @@
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+# ---------------------------------
+# LIGHTWEIGHT LIST ROWS
+# ---------------------------------
+# The order tables only display a handful of columns, so list views fetch
+# exactly those through values_list() (store/product names come back from
+# the same JOINed query) and wrap each tuple in a __slots__ object instead
+# of building full OrderFulfillment instances.
+
+# Longer notes are cut here in the table, with the full text in the cell's title
+NOTES_PREVIEW = 200
+
+
+class OrderRow:
+    __slots__ = (
+        'id', 'status', 'store_name', 'product_code', 'product_name',
+        'code_type', 'team_code', 'supplier_order_id', 'quantity',
+        'amazon_order_id', 'shipping_label_url', 'expected_delivery_date',
+        'tracker_id', 'notes', 'bin_code',
+    )
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+ORDER_ROW_COLUMNS = (
+    'id', 'status', 'store__store_name', 'product__code', 'product__product_name',
+    'code_type', 'team_code', 'supplier_order_id', 'quantity',
+    'amazon_order_id', 'shipping_label_url', 'expected_delivery_date',
+    'tracker_id', 'notes', 'bin__code',
+)
+
+
+def order_rows(queryset):
+    """Materialise an OrderFulfillment queryset as a list of OrderRow."""
+    return [OrderRow(*values) for values in queryset.values_list(*ORDER_ROW_COLUMNS)]
+
+
+# ---------------------------------
+# ORDER TABLE BODY (Jinja2)
+# ---------------------------------
+# The <tbody> of every order table is rendered by one compiled Jinja2
+# template. Row links are reversed once per page with a sentinel pk and
+# split into (prefix, suffix), so a row only concatenates its id.
+
+URL_SENTINEL = '2147483647'
+
+ORDER_TABLE_MODES = {
+    'pending': {
+        'urls': {
+            'edit': ('order_fulfillment_update',),
+            'dtw': ('order_fulfillment_action', 'dtw'),
+            'ofs': ('order_fulfillment_action', 'ofs'),
+        },
+        'empty_message': "No orders found.",
+    },
+    'delivered': {
+        'urls': {'action': ('rts_action',)},
+        'show_bin': True,
+        'action': {'css': 'btn-info', 'confirm': 'Mark this order as READY TO SHIP?', 'label': 'Ready To SHIPMENT'},
+        'empty_message': "No orders are currently waiting for shipment.",
+    },
+    'out_of_stock': {
+        'urls': {'action': ('ofs_to_dtw_action',)},
+        'action': {'css': 'btn-success', 'confirm': 'Move this order back to DELIVERED TO WAREHOUSE?', 'label': 'Delivered To WAREHOUSE'},
+        'empty_message': 'No orders are currently marked as "Out of Stock".',
+    },
+    'ready_to_ship': {
+        'urls': {'action': ('cs_action',)},
+        'show_bin': True,
+        # Checkboxes feed the page's batch form (pick waves)
+        'selectable': True,
+        'action': {'css': 'btn-primary', 'confirm': 'Mark this order as COMPLETED?', 'label': 'Complete SHIPMENT'},
+        'empty_message': "No orders are currently ready for shipment.",
+    },
+    'completed': {
+        'urls': {},
+        'empty_message': "No completed shipments found.",
+    },
+}
+
+
+def url_pattern(name, *args):
+    """Reverse `name` for a sentinel pk and return the (prefix, suffix) around it."""
+    prefix, suffix = reverse(name, args=[URL_SENTINEL, *args]).split(URL_SENTINEL)
+    return prefix, suffix
+
+
+def render_order_rows(orders, mode, **flags):
+    """Render the shared order table body; `flags` are the page's permission flags."""
+    config = ORDER_TABLE_MODES[mode]
+    context = {
+        'orders': orders,
+        'mode': mode,
+        'urls': {
+            'label': url_pattern('order_label'),
+            **{key: url_pattern(*spec) for key, spec in config['urls'].items()},
+        },
+        'action': config.get('action'),
+        'show_bin': config.get('show_bin', False),
+        'selectable': config.get('selectable', False),
+        'empty_message': config['empty_message'],
+        'notes_preview': NOTES_PREVIEW,
+        **flags,
+    }
+    return mark_safe(get_template('dashboard/order_rows.html', using='jinja2').render(context))
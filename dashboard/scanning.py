@@ -0,0 +1,100 @@
+from django.db.models import CharField, Value
+
+from .models import OrderFulfillment
+from .transitions import bulk_transition
+
+# ---------------------------------
+# DOCK SCAN STATION
+# ---------------------------------
+# A scan is a tracker id, an Amazon order id or a product ASIN/UPC. The three
+# exact-match lookups run as one UNION ALL over indexed columns. Tracker and
+# Amazon ids identify the order itself, so those matches are marked delivered
+# straight away. A product code only names what is in the box, so it is
+# delivered only when exactly one pending order matches; otherwise the
+# candidates come back for the user to confirm.
+
+MAX_BATCH = 500
+
+
+def _pending_orders(warehouse):
+    orders = OrderFulfillment.objects.filter(status='pending')
+    if warehouse is not None:
+        orders = orders.filter(store__warehouse=warehouse)
+    return orders.order_by()
+
+
+def _match(codes, warehouse):
+    """{code: {'exact': [order ids], 'product': [order ids]}} for the scanned codes."""
+    pending = _pending_orders(warehouse)
+
+    def lookup(field, kind):
+        return pending.filter(**{f'{field}__in': codes}).values_list(
+            field, Value(kind, output_field=CharField()), 'id'
+        )
+
+    matches = {code: {'exact': [], 'product': []} for code in codes}
+    rows = lookup('tracker_id', 'exact').union(
+        lookup('amazon_order_id', 'exact'),
+        lookup('product__code', 'product'),
+        all=True,
+    )
+    for code, kind, order_id in rows:
+        if order_id not in matches[code][kind]:
+            matches[code][kind].append(order_id)
+    return matches
+
+
+def _describe(order_ids):
+    return {
+        row['id']: row
+        for row in OrderFulfillment.objects.filter(id__in=order_ids).values(
+            'id', 'quantity', 'supplier_order_id', 'amazon_order_id', 'tracker_id',
+            'store__store_name', 'product__code', 'product__product_name',
+        )
+    }
+
+
+def process_scans(codes, warehouse, user, confirm_ids=()):
+    """
+    Resolve a batch of scanned codes (plus any confirmed order ids) and mark
+    the resolved pending orders delivered in a single bulk transition.
+    Raises ValueError for more than MAX_BATCH codes; callers send larger
+    backlogs in slices.
+    """
+    if len(codes) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} scans can be sent at once.")
+    codes = list(dict.fromkeys(str(code).strip() for code in codes if str(code).strip()))
+    matches = _match(codes, warehouse) if codes else {}
+
+    results = []
+    deliver_ids = set()
+    for code in codes:
+        exact, by_product = matches[code]['exact'], matches[code]['product']
+        if exact:
+            results.append({'code': code, 'result': 'delivered', 'order_ids': exact})
+            deliver_ids.update(exact)
+        elif len(by_product) == 1:
+            results.append({'code': code, 'result': 'delivered', 'order_ids': by_product})
+            deliver_ids.update(by_product)
+        elif by_product:
+            results.append({'code': code, 'result': 'confirm', 'order_ids': by_product})
+        else:
+            results.append({'code': code, 'result': 'not_found', 'order_ids': []})
+
+    if confirm_ids:
+        confirmed = list(_pending_orders(warehouse).filter(id__in=confirm_ids).values_list('id', flat=True))
+        deliver_ids.update(confirmed)
+
+    delivered = 0
+    if deliver_ids:
+        delivered = bulk_transition(
+            _pending_orders(warehouse).filter(id__in=deliver_ids), 'delivered', user
+        )
+
+    confirm_needed = {i for r in results if r['result'] == 'confirm' for i in r['order_ids']}
+    details = _describe(confirm_needed) if confirm_needed else {}
+    for result in results:
+        if result['result'] == 'confirm':
+            result['candidates'] = [details[i] for i in result['order_ids'] if i in details]
+
+    return {'delivered': delivered, 'results': results}
@@ -0,0 +1,126 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import audit, putaway
+from .backends import assignment_cache_key, auth_cache, role_choices_cache_key, user_cache_key
+from .models import (
+    Bin, OrderFulfillment, Product, Role, Store, Tombstone, User, UserWarehouseRole,
+    Warehouse, WebhookSubscription, next_change_seq,
+)
+from .webhooks import SUBSCRIPTIONS_CACHE_KEY
+
+# ---------------------------------
+# CACHE INVALIDATION
+# ---------------------------------
+
+
+@receiver([post_save, post_delete], sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    auth_cache.delete(user_cache_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=UserWarehouseRole)
+def drop_cached_assignment(sender, instance, **kwargs):
+    auth_cache.delete_many([assignment_cache_key(instance.pk), role_choices_cache_key(instance.user_id)])
+
+
+@receiver([post_save, post_delete], sender=Warehouse)
+@receiver([post_save, post_delete], sender=Store)
+@receiver([post_save, post_delete], sender=Role)
+def drop_assignments_referencing(sender, instance, **kwargs):
+    # Cached assignments embed their warehouse/store/role, so renames must
+    # evict every assignment that points at the changed row.
+    field = {Warehouse: 'warehouse', Store: 'store', Role: 'role'}[sender]
+    rows = UserWarehouseRole.objects.filter(**{field: instance.pk}).values_list('pk', 'user_id')
+    keys = set()
+    for pk, user_id in rows:
+        keys.update((assignment_cache_key(pk), role_choices_cache_key(user_id)))
+    auth_cache.delete_many(list(keys))
+    if sender is Role:
+        auth_cache.delete('auth:role:super_admin')
+
+
+@receiver([post_save, post_delete], sender=WebhookSubscription)
+def drop_cached_subscriptions(sender, instance, **kwargs):
+    cache.delete(SUBSCRIPTIONS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=Bin)
+def rebuild_bin_index(sender, instance, **kwargs):
+    putaway.invalidate(instance.warehouse_id)
+
+
+# ---------------------------------
+# DELTA SYNC
+# ---------------------------------
+# Deletes run inside the collector's transaction, so the sequence numbers
+# taken here commit together with the delete itself.
+
+SYNC_MODEL_NAMES = {OrderFulfillment: 'order', Product: 'product', Store: 'store'}
+
+
+@receiver(pre_delete, sender=Store)
+@receiver(pre_delete, sender=Product)
+def touch_orders_referencing(sender, instance, **kwargs):
+    # The collector nulls orders.store/product with a plain UPDATE; stamp
+    # those orders so clients pick up the cleared reference.
+    field = 'store' if sender is Store else 'product'
+    OrderFulfillment.objects.filter(**{field: instance.pk}).update(
+        change_seq=next_change_seq(),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_delete, sender=OrderFulfillment)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Store)
+def record_tombstone(sender, instance, **kwargs):
+    if sender is Store:
+        warehouse_id = instance.warehouse_id
+    elif sender is OrderFulfillment and instance.store_id:
+        warehouse_id = Store.all_objects.filter(pk=instance.store_id).values_list('warehouse_id', flat=True).first()
+    else:
+        warehouse_id = None
+    Tombstone.objects.create(
+        model=SYNC_MODEL_NAMES[sender],
+        object_id=instance.pk,
+        warehouse_id=warehouse_id,
+        change_seq=next_change_seq(),
+    )
+
+
+# ---------------------------------
+# AUDIT LOG
+# ---------------------------------
+# See dashboard/audit.py (audit.AUDITED_MODELS); fixtures (raw saves) are
+# not audited.
+
+
+@receiver(post_init, sender=Product)
+@receiver(post_init, sender=Store)
+@receiver(post_init, sender=Warehouse)
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=UserWarehouseRole)
+def audit_snapshot(sender, instance, **kwargs):
+    audit.snapshot(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Store)
+@receiver(post_save, sender=Warehouse)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserWarehouseRole)
+def audit_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if not raw:
+        audit.record_saved(instance, created, using)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Store)
+@receiver(post_delete, sender=Warehouse)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=UserWarehouseRole)
+def audit_delete(sender, instance, using=None, **kwargs):
+    audit.record_deleted(instance, using)
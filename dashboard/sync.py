@@ -0,0 +1,117 @@
+from heapq import merge
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import COMMIT_LAG, Tombstone
+
+# ---------------------------------
+# DELTA SYNC
+# ---------------------------------
+# OrderFulfillment, Product and Store rows carry a change_seq from a
+# PostgreSQL sequence (see next_change_seq), and deletions leave a
+# Tombstone numbered the same way. Sequence numbers are handed out without
+# locking, so a transaction can commit after another one that took a
+# higher number. Pages therefore stop at the first row changed less than
+# COMMIT_LAG ago: a lower-numbered change still in flight would have been
+# made before it, and transactions are assumed to finish within the lag.
+# One bulk write stamps all its rows with the same number, so pages are
+# keyed on (change_seq, source, id) and can split such a write.
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+SYNC_FIELDS = {
+    'orders': (
+        'id', 'status', 'store_id', 'product_id', 'code_type', 'team_code',
+        'supplier_order_id', 'quantity', 'amazon_order_id', 'shipping_label_url',
+        'expected_delivery_date', 'tracker_id', 'notes', 'created_by_id',
+        'created_at', 'action_taken_at', 'updated_at', 'change_seq',
+    ),
+    'products': (
+        'id', 'code', 'product_name', 'code_type', 'product_image_link',
+        'minimum_price', 'updated_at', 'change_seq',
+    ),
+    'stores': (
+        'id', 'warehouse_id', 'store_name', 'store_type', 'is_active',
+        'updated_at', 'change_seq',
+    ),
+}
+# Position of each source in the page key; tombstones come last
+SOURCES = ['orders', 'products', 'stores', 'deleted']
+TOMBSTONE_FIELDS = ('id', 'model', 'object_id', 'change_seq', 'deleted_at')
+
+TOMBSTONE_KINDS = {'order': 'orders', 'product': 'products', 'store': 'stores'}
+
+
+def parse_cursor(value):
+    """
+    '<change_seq>:<source>:<id>' as returned in a page, or a bare change_seq
+    (everything up to and including that number was seen). Raises ValueError.
+    """
+    parts = [int(part) for part in str(value).split(':')]
+    if len(parts) == 1:
+        parts += [len(SOURCES), 0]
+    if len(parts) != 3 or min(parts) < 0:
+        raise ValueError(f"Invalid cursor: {value}")
+    return tuple(parts)
+
+
+def _after(qs, rank, cursor):
+    """Rows of source number `rank` whose page key is after `cursor`."""
+    seq, cursor_rank, cursor_id = cursor
+    if rank > cursor_rank:
+        condition = Q(change_seq__gte=seq)
+    elif rank < cursor_rank:
+        condition = Q(change_seq__gt=seq)
+    else:
+        condition = Q(change_seq__gt=seq) | Q(change_seq=seq, id__gt=cursor_id)
+    return qs.filter(condition).order_by('change_seq', 'id')
+
+
+def changes_since(cursor, querysets, tombstones, limit=DEFAULT_LIMIT, now=None):
+    """
+    Up to `limit` rows from the scoped `querysets` ({'orders': qs, ...}) and
+    `tombstones` changed after `cursor` (a parse_cursor() tuple), oldest
+    change first.
+    """
+    cutoff = (now or timezone.now()) - COMMIT_LAG
+    streams = []
+    for rank, name in enumerate(SOURCES):
+        if name == 'deleted':
+            rows, fields, changed = tombstones, TOMBSTONE_FIELDS, 'deleted_at'
+        else:
+            rows, fields, changed = querysets[name], SYNC_FIELDS[name], 'updated_at'
+        streams.append([
+            ((row['change_seq'], rank, row['id']), row[changed], row)
+            for row in _after(rows, rank, cursor).values(*fields)[:limit + 1]
+        ])
+
+    page = {'cursor': None, 'has_more': False, **{name: [] for name in querysets}}
+    page['deleted'] = {name: [] for name in querysets}
+    last = cursor
+    count = 0
+    for key, changed, row in merge(*streams, key=lambda item: item[0]):
+        if changed >= cutoff:
+            # Too recent: an older number may still be uncommitted
+            break
+        if count == limit:
+            page['has_more'] = True
+            break
+        name = SOURCES[key[1]]
+        if name == 'deleted':
+            page['deleted'][TOMBSTONE_KINDS[row['model']]].append(row['object_id'])
+        else:
+            page[name].append(row)
+        last = key
+        count += 1
+    page['cursor'] = ':'.join(map(str, last))
+    return page
+
+
+def scoped_tombstones(warehouse):
+    tombstones = Tombstone.objects.all()
+    if warehouse is not None:
+        # Product tombstones carry no warehouse and go to everyone
+        tombstones = tombstones.filter(Q(warehouse_id=warehouse.pk) | Q(warehouse_id__isnull=True))
+    return tombstones
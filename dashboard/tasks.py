@@ -0,0 +1,101 @@
+from . import deletion, digests, labels, printing, rollups, thumbnails, tracking, webhooks
+from .jobs import job
+from .management.commands.purge_sessions import purge_expired_sessions
+
+# ---------------------------------
+# JOB HANDLERS
+# ---------------------------------
+# Imported from DashboardConfig.ready() so the registry is filled in every
+# process that enqueues or runs jobs.
+
+
+@job('purge_deletion', max_attempts=5)
+def purge_deletion(job, deletion_job_id):
+    deletion.run_job(
+        deletion_job_id,
+        report=lambda rows: job.report(rows, message=f"{rows} row(s) processed"),
+        leased=True,
+    )
+
+
+@job('refresh_rollups')
+def refresh_rollups(job, full=False):
+    days = rollups.refresh_rollups(full=full)
+    job.report(len(days), len(days), message=f"Rebuilt {len(days)} day(s)")
+
+
+@job('purge_sessions')
+def purge_sessions(job, batch_size=5000):
+    deleted = purge_expired_sessions(batch_size)
+    job.report(deleted, deleted, message=f"Deleted {deleted} expired session(s)")
+
+
+@job('fetch_labels')
+def fetch_labels(job, label_ids):
+    failed = labels.fetch_labels(
+        label_ids,
+        report=lambda done, total: job.report(done, total, message=f"{done} of {total} label(s) fetched"),
+    )
+    if failed:
+        # Retried with backoff; labels stored meanwhile are skipped
+        raise RuntimeError(f"{failed} label(s) could not be fetched")
+
+
+@job('generate_thumbnails')
+def generate_thumbnails(job, thumbnail_ids):
+    failed = thumbnails.generate_thumbnails(
+        thumbnail_ids,
+        report=lambda done, total: job.report(done, total, message=f"{done} of {total} image(s) processed"),
+    )
+    if failed:
+        raise RuntimeError(f"{failed} image(s) could not be processed")
+
+
+@job('poll_carriers', max_attempts=1)
+def poll_carriers(job):
+    # Not retried: the next scheduled run picks up whatever is still due
+    counts = tracking.poll(report=lambda done, total: job.report(done, total))
+    job.report(counts['checked'], counts['checked'], message=(
+        f"{counts['checked']} checked, {counts['delivered']} delivered, "
+        f"{counts['errors']} error(s), {counts['skipped']} without a carrier"
+    ))
+
+
+@job('deliver_webhooks', max_attempts=1)
+def deliver_webhooks(job):
+    # Deliveries carry their own retry state; a failed run isn't retried
+    sent = webhooks.deliver(
+        report=lambda done, total, sent: job.report(done, total, message=f"{sent} event(s) sent"),
+    )
+    job.report(job.progress_done, message=f"{sent} event(s) sent")
+
+
+@job('send_digests', max_attempts=1)
+def send_digests(job):
+    # Not retried: the next scheduled run picks up from the watermark
+    queued = digests.send_digests()
+    job.report(queued, queued, message=f"Queued {queued} digest(s)")
+
+
+@job('send_digest_emails', max_attempts=5)
+def send_digest_emails(job, messages):
+    total = len(messages)
+
+    def sent(remaining):
+        # A retry only sends what is left
+        job.payload = {'messages': remaining}
+        job.lease().update(payload=job.payload)
+        job.report(total - len(remaining), total, message=f"{total - len(remaining)} of {total} digest(s) sent")
+
+    digests.deliver(messages, sent=sent)
+
+
+@job('build_print_batch', max_attempts=1)
+def build_print_batch(job, order_ids):
+    # Not retried: the user can start the batch again from Ready To Ship
+    printing.purge_batches()
+    size = printing.write_batch(
+        order_ids, printing.batch_path(job.pk),
+        report=lambda done, total: job.report(done, total, message=f"{done} of {total} order(s) printed"),
+    )
+    job.report(job.progress_done, message=f"{job.progress_done} order(s), {size // 1024} KB")
@@ -1,3 +1,964 @@
-from django.test import TestCase
+import hashlib
+import json
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.error import HTTPError
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import (
+    digests, forecast, hashing, inventory, jobs, labels, provisioning, putaway, scanning, sync, tracking, transitions,
+    waves,
+)
+from .backends import CachedModelBackend, auth_cache, user_cache_key
+from .models import (
+    Bin, InventoryLevel, InventoryMovement, Job, OrderFulfillment, OrderStatusEvent, Product, Role, ShippingLabel,
+    Store, Tombstone, User, UserWarehouseRole, Warehouse, Watermark,
+)
+
+# ---------------------------------
+# STAND-IN SERVERS
+# ---------------------------------
+# Real sockets on 127.0.0.1, so the code under test goes through urllib
+# and smtplib exactly as in production. Fetching from a loopback address
+# needs FETCH_ALLOW_PRIVATE_ADDRESSES.
+
+PDF_BYTES = b'%PDF-1.4\n' + b'0' * 5000 + b'\n%%EOF\n'
+
+
+class StandInHTTPHandler(BaseHTTPRequestHandler):
+    """Serves server.routes {path: (status, content_type, body)}; logs each request's time."""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, time.monotonic()))
+        status, content_type, body = self.server.routes.get(self.path, (404, 'text/plain', b'not found'))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib; refuses DATA for mail to any address in server.refuse."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 stand-in')
+        recipients, data = [], None
+        while line := self.rfile.readline():
+            line = line.decode().rstrip('\r\n')
+            if data is not None:
+                if line == '.':
+                    self.server.messages.append((recipients, '\n'.join(data)))
+                    recipients, data = [], None
+                    self.reply('250 queued')
+                else:
+                    data.append(line)
+                continue
+            command = line.upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 stand-in')
+            elif command.startswith('RCPT'):
+                recipients.append(line.split(':', 1)[1].strip(' <>'))
+                self.reply('250 ok')
+            elif command == 'DATA':
+                if self.server.refuse & set(recipients):
+                    recipients = []
+                    self.reply('554 refused')
+                else:
+                    data = []
+                    self.reply('354 go ahead')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+def start_server(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def http_stand_in():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHTTPHandler)
+    server.daemon_threads = True
+    server.routes = {}
+    server.requests = []
+    return start_server(server)
+
+
+def smtp_stand_in():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StandInSMTPHandler)
+    server.daemon_threads = True
+    server.messages = []
+    server.refuse = False
+    return start_server(server)
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+# ---------------------------------
+# SHIPPING LABELS
+# ---------------------------------
+
+class LabelFetchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = http_stand_in()
+        cls.base_url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+        cls.server.routes = {
+            '/label.pdf': (200, 'application/pdf', PDF_BYTES),
+            '/broken.pdf': (500, 'text/plain', b'upstream error'),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_server(cls.server)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def incoming_files(self):
+        return list(self.root.glob('.incoming-*'))
+
+    @override_settings(FETCH_ALLOW_PRIVATE_ADDRESSES=True)
+    def test_download_stores_file_by_content_hash(self):
+        sha256, content_type, size = labels.download(self.base_url + '/label.pdf', root=self.root)
+        self.assertEqual(sha256, hashlib.sha256(PDF_BYTES).hexdigest())
+        self.assertEqual(content_type, 'application/pdf')
+        self.assertEqual(size, len(PDF_BYTES))
+        self.assertEqual((self.root / sha256[:2] / sha256).read_bytes(), PDF_BYTES)
+        self.assertEqual(self.incoming_files(), [])
+
+    @override_settings(FETCH_ALLOW_PRIVATE_ADDRESSES=True)
+    def test_download_refuses_oversize_file(self):
+        with self.assertRaisesMessage(ValueError, 'larger than 1024 bytes'):
+            labels.download(self.base_url + '/label.pdf', root=self.root, max_bytes=1024)
+        self.assertEqual(self.incoming_files(), [])
+
+    @override_settings(FETCH_ALLOW_PRIVATE_ADDRESSES=True)
+    def test_download_raises_on_http_error(self):
+        with self.assertRaises(HTTPError):
+            labels.download(self.base_url + '/missing.pdf', root=self.root)
+        self.assertEqual(self.incoming_files(), [])
+
+    def test_download_refuses_private_address(self):
+        with self.assertRaises(labels.UnsafeURL):
+            labels.download(self.base_url + '/label.pdf', root=self.root)
+        self.assertEqual(self.server.requests, [])
+
+    def test_download_refuses_other_schemes(self):
+        with self.assertRaisesMessage(ValueError, 'Unsupported URL'):
+            labels.download('file:///etc/passwd', root=self.root)
+
+    def test_fetch_labels_records_each_outcome(self):
+        store = Store.objects.create(warehouse=Warehouse.objects.create(name='WH'), store_name='S')
+        stored, failed = (
+            ShippingLabel.objects.create(
+                order=OrderFulfillment.objects.create(store=store, shipping_label_url=self.base_url + path),
+                source_url=self.base_url + path,
+            )
+            for path in ('/label.pdf', '/broken.pdf')
+        )
+        with override_settings(FETCH_ALLOW_PRIVATE_ADDRESSES=True, LABEL_STORAGE_ROOT=self.root):
+            self.assertEqual(labels.fetch_labels([stored.pk, failed.pk]), 1)
+            stored.refresh_from_db()
+            failed.refresh_from_db()
+            self.assertEqual(stored.status, 'stored')
+            self.assertEqual(stored.size, len(PDF_BYTES))
+            self.assertTrue(labels.label_path(stored.sha256).exists())
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('500', failed.error)
+
+
+# ---------------------------------
+# CARRIER TRACKING
+# ---------------------------------
+
+class CarrierPollingTests(TestCase):
+    RATE = 10
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = http_stand_in()
+        cls.base_url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_server(cls.server)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.routes = {}
+        self.store = Store.objects.create(warehouse=Warehouse.objects.create(name='WH'), store_name='S')
+        carriers = {
+            'stand-in': {
+                'pattern': r'^SI',
+                'url': self.base_url + '/track/{tracker_id}',
+                'concurrency': 4,
+                'rate_per_second': self.RATE,
+            },
+        }
+        settings_override = override_settings(TRACKING_CARRIERS=carriers)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def order(self, tracker_id, status=None, code=200):
+        if status is not None:
+            self.server.routes[f'/track/{tracker_id}'] = (code, 'application/json', json.dumps({'status': status}).encode())
+        return OrderFulfillment.objects.create(store=self.store, tracker_id=tracker_id)
+
+    def test_poll_moves_delivered_orders_and_reschedules_the_rest(self):
+        delivered = self.order('SI-1', 'Delivered')
+        in_transit = self.order('SI-2', 'in_transit')
+        broken = self.order('SI-3', 'error', code=503)
+        unknown = self.order('XX-1')
+        now = timezone.now()
+
+        result = tracking.poll(now=now)
+
+        self.assertEqual(result, {'checked': 3, 'delivered': 1, 'errors': 1, 'skipped': 1})
+        for order in (delivered, in_transit, broken, unknown):
+            order.refresh_from_db()
+        self.assertEqual(delivered.status, 'delivered')
+        self.assertIsNone(delivered.tracking_next_check_at)
+        self.assertEqual(in_transit.status, 'pending')
+        self.assertEqual(in_transit.tracking_status, 'in_transit')
+        self.assertEqual(in_transit.tracking_next_check_at, now + tracking.UNKNOWN_DATE_DELAY)
+        self.assertEqual(broken.tracking_next_check_at, now + tracking.RETRY_AFTER_ERROR)
+        self.assertEqual(unknown.tracking_next_check_at, now + timedelta(days=1))
+        # Nothing is due again right away
+        self.assertEqual(tracking.poll(now=now)['checked'], 0)
+
+    def test_far_off_orders_are_checked_less_often(self):
+        today = date(2030, 1, 1)
+        delays = [tracking.next_check_delay(today + timedelta(days=days), today) for days in (0, 2, 3, 4, 6, 10, 60)]
+        self.assertEqual(delays, [
+            timedelta(hours=1), timedelta(hours=4), timedelta(hours=4),
+            timedelta(days=2), timedelta(days=3), timedelta(days=5), tracking.MAX_CHECK_DELAY,
+        ])
+        self.assertEqual(tracking.next_check_delay(None, today), tracking.UNKNOWN_DATE_DELAY)
+
+    def test_poll_respects_carrier_rate(self):
+        count = 6
+        for i in range(count):
+            self.order(f'SI-{i}', 'in_transit')
+
+        tracking.poll()
+
+        times = sorted(at for path, at in self.server.requests)
+        self.assertEqual(len(times), count)
+        # Requests are spaced 1/RATE apart; allow a little timer slack
+        self.assertGreaterEqual(times[-1] - times[0], (count - 1) / self.RATE * 0.9)
+
+
+# ---------------------------------
+# STORE-MANAGER DIGESTS
+# ---------------------------------
+
+class DigestSweepTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = smtp_stand_in()
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_server(cls.server)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.messages = []
+        self.server.refuse = set()
+        settings_override = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.server.server_address[1],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        warehouse = Warehouse.objects.create(name='WH')
+        role = Role.objects.create(name='store_manager')
+        self.stores = [Store.objects.create(warehouse=warehouse, store_name=f'Store {i}') for i in (1, 2)]
+        self.managers = []
+        for i, store in enumerate(self.stores, start=1):
+            manager = User.objects.create(username=f'manager{i}', email=f'manager{i}@example.com')
+            UserWarehouseRole.objects.create(user=manager, warehouse=warehouse, role=role, store=store)
+            self.managers.append(manager)
+        # The sweep starts from the log's end on its first run
+        Watermark.objects.create(name=digests.WATERMARK_NAME, last_event_id=0)
+
+    def events(self, store, statuses, at):
+        for status in statuses:
+            order = OrderFulfillment.objects.create(store=store, status=status)
+            OrderStatusEvent.objects.create(
+                order=order, store=store, warehouse=store.warehouse,
+                status=status, previous_status='pending', quantity=1, at=at,
+            )
+
+    def run_jobs(self):
+        # self.run_jobs() minus close_old_connections(), which would close
+        # the test case's connection
+        while job := jobs.claim('tests'):
+            jobs.execute(job)
+
+    def test_one_email_per_manager(self):
+        earlier = timezone.now() - timedelta(minutes=5)
+        self.events(self.stores[0], ['out_of_stock', 'out_of_stock', 'ready_to_ship'], earlier)
+        self.events(self.stores[1], ['ready_to_ship'], earlier)
+
+        self.assertEqual(digests.send_digests(), 2)
+        # Queued with the watermark move; nothing goes out until a worker runs the job
+        self.assertEqual(self.server.messages, [])
+        last_event = OrderStatusEvent.objects.latest('id').pk
+        self.assertEqual(Watermark.objects.get(name=digests.WATERMARK_NAME).last_event_id, last_event)
+        self.run_jobs()
+
+        recipients = sorted(to for to, body in self.server.messages)
+        self.assertEqual(recipients, [['manager1@example.com'], ['manager2@example.com']])
+        first = next(body for to, body in self.server.messages if to == ['manager1@example.com'])
+        self.assertIn('2 out of stock', first)
+        # Already queued; nothing new to report
+        self.assertEqual(digests.send_digests(), 0)
+        self.run_jobs()
+        self.assertEqual(len(self.server.messages), 2)
+
+    def test_recent_events_wait_for_the_next_window(self):
+        self.events(self.stores[0], ['out_of_stock'], timezone.now())
+        self.assertEqual(digests.send_digests(), 0)
+        self.assertFalse(Job.objects.filter(name='send_digest_emails').exists())
+        self.assertEqual(Watermark.objects.get(name=digests.WATERMARK_NAME).last_event_id, 0)
+
+    def test_retry_after_smtp_failure_only_sends_the_rest(self):
+        earlier = timezone.now() - timedelta(minutes=5)
+        self.events(self.stores[0], ['out_of_stock'], earlier)
+        self.events(self.stores[1], ['out_of_stock'], earlier)
+        self.server.refuse = {'manager2@example.com'}
+
+        self.assertEqual(digests.send_digests(), 2)
+        with self.assertLogs('dashboard.jobs', 'ERROR'):
+            self.run_jobs()
+
+        self.assertEqual([to for to, body in self.server.messages], [['manager1@example.com']])
+        job = Job.objects.get(name='send_digest_emails')
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual([m['to'] for m in job.payload['messages']], [['manager2@example.com']])
+
+        self.server.refuse = set()
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.run_jobs()
+        self.assertEqual(
+            [to for to, body in self.server.messages],
+            [['manager1@example.com'], ['manager2@example.com']],
+        )
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'done')
+
+
+# ---------------------------------
+# CACHED AUTH LOOKUPS
+# ---------------------------------
+
+class AuthCacheTests(TestCase):
+
+    def setUp(self):
+        auth_cache.clear()
+        self.user = User.objects.create(username='cached')
+        self.user.set_password('secret')
+        self.user.save()
+
+    def test_user_is_served_from_the_cache_without_its_password(self):
+        backend = CachedModelBackend()
+        first = backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            cached = backend.get_user(self.user.pk)
+            self.assertEqual(cached.get_session_auth_hash(), first.get_session_auth_hash())
+        self.assertNotIn(self.user.password, repr(auth_cache.get(user_cache_key(self.user.pk))))
+        # The deferred password loads on demand
+        self.assertTrue(cached.check_password('secret'))
+
+    def test_saving_the_user_drops_the_cached_copy(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        self.user.full_name = 'Renamed'
+        self.user.save()
+        self.assertIsNone(auth_cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(backend.get_user(self.user.pk).full_name, 'Renamed')
+
+
+# ---------------------------------
+# ORDER STATUS TRANSITIONS
+# ---------------------------------
+
+class TransitionTests(TestCase):
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='WH')
+        self.store = Store.objects.create(warehouse=self.warehouse, store_name='S')
+        self.user = User.objects.create(username='operator')
+
+    def order(self, **fields):
+        order = OrderFulfillment.objects.create(store=self.store, quantity=3, **fields)
+        transitions.record_order_created(order)
+        return order
+
+    def test_transition_locks_the_row_and_logs_one_event(self):
+        order = self.order()
+        seq = order.change_seq
+
+        with CaptureQueriesContext(connection) as queries:
+            moved = transitions.transition_order(order, 'delivered', self.user)
+
+        self.assertEqual(moved, order)
+        self.assertTrue(any('FOR UPDATE' in query['sql'] for query in queries.captured_queries))
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'delivered')
+        self.assertEqual(order.action_taken_by, self.user)
+        self.assertGreater(order.change_seq, seq)
+        event = order.status_events.latest('id')
+        self.assertEqual(
+            (event.status, event.previous_status, event.quantity, event.actor, event.warehouse, event.store),
+            ('delivered', 'pending', 3, self.user, self.warehouse, self.store),
+        )
+        self.assertEqual(event.at, order.action_taken_at)
+
+    def test_transition_to_current_status_is_a_no_op(self):
+        order = self.order()
+        transitions.transition_order(order, 'delivered')
+        seq = OrderFulfillment.objects.get(pk=order.pk).change_seq
+
+        self.assertIsNone(transitions.transition_order(order, 'delivered'))
+
+        self.assertEqual(order.status_events.count(), 2)
+        self.assertEqual(OrderFulfillment.objects.get(pk=order.pk).change_seq, seq)
+
+    def test_transition_rereads_a_stale_instance(self):
+        order = self.order()
+        stale = OrderFulfillment.objects.get(pk=order.pk)
+        transitions.transition_order(order, 'delivered')
+
+        self.assertIsNone(transitions.transition_order(stale, 'delivered'))
+        self.assertEqual(stale.status, 'delivered')
+        self.assertEqual(order.status_events.filter(status='delivered').count(), 1)
+
+    def test_transition_refuses_disallowed_from_status(self):
+        order = self.order()
+        transitions.transition_order(order, 'delivered')
+
+        self.assertIsNone(transitions.transition_order(order, 'completed', from_statuses=('ready_to_ship',)))
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'delivered')
+        self.assertFalse(order.status_events.filter(status='completed').exists())
+
+    def test_bulk_transition_logs_one_event_per_moved_row(self):
+        pending = [self.order() for _ in range(3)]
+        already = self.order()
+        transitions.transition_order(already, 'delivered')
+        seq = max(OrderFulfillment.objects.values_list('change_seq', flat=True))
+
+        moved = transitions.bulk_transition(OrderFulfillment.objects.all(), 'delivered', self.user)
+
+        self.assertEqual(moved, 3)
+        events = OrderStatusEvent.objects.filter(status='delivered')
+        self.assertEqual(sorted(events.values_list('order_id', flat=True)), sorted(o.pk for o in pending + [already]))
+        for order in pending:
+            event = order.status_events.get(status='delivered')
+            self.assertEqual((event.previous_status, event.quantity, event.actor), ('pending', 3, self.user))
+        stamps = set(OrderFulfillment.objects.filter(pk__in=[o.pk for o in pending]).values_list('change_seq', flat=True))
+        self.assertEqual(len(stamps), 1)
+        self.assertGreater(stamps.pop(), seq)
+        self.assertEqual(transitions.bulk_transition(OrderFulfillment.objects.all(), 'delivered'), 0)
+
+
+# ---------------------------------
+# ARRIVALS FORECAST
+# ---------------------------------
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'forecast-tests'},
+    'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth'},
+})
+class ForecastCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.warehouse = Warehouse.objects.create(name='WH')
+        self.store = Store.objects.create(warehouse=self.warehouse, store_name='S')
+        self.due = date(2030, 1, 15)
+
+    def create_order(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = OrderFulfillment.objects.create(store=self.store, quantity=quantity, expected_delivery_date=self.due)
+            transitions.record_order_created(order)
+        return order
+
+    def due_counts(self):
+        return forecast.get_state(self.warehouse.pk)['due'].get(forecast.day_number(self.due))
+
+    def test_commits_invalidate_the_cached_state(self):
+        self.create_order(2)
+        self.assertEqual(self.due_counts(), [1, 2])
+        order = self.create_order(5)
+        self.assertEqual(self.due_counts(), [2, 7])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.transition_order(order, 'delivered')
+        self.assertEqual(self.due_counts(), [1, 2])
+
+    def test_build_racing_a_commit_is_not_served(self):
+        self.create_order(2)
+        # A reader takes the version and reads the database ...
+        version = forecast._version(self.warehouse.pk)
+        state = forecast._build(self.warehouse.pk)
+        # ... a commit lands before it stores its result
+        self.create_order(5)
+        cache.set(forecast._cache_key(self.warehouse.pk, version), state)
+
+        self.assertEqual(self.due_counts(), [2, 7])
+
+    def test_uncommitted_changes_keep_the_cache(self):
+        self.create_order(2)
+        self.assertEqual(self.due_counts(), [1, 2])
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            order = OrderFulfillment.objects.create(store=self.store, quantity=5, expected_delivery_date=self.due)
+            transitions.record_order_created(order)
+        self.assertEqual(len(callbacks), 1)
+        # Still the cached state: the invalidation waits for the commit
+        self.assertEqual(self.due_counts(), [1, 2])
+
+
+# ---------------------------------
+# DOCK SCAN STATION
+# ---------------------------------
+
+class ScanBatchTests(TestCase):
+
+    def setUp(self):
+        self.store = Store.objects.create(warehouse=Warehouse.objects.create(name='WH'), store_name='S')
+        self.user = User.objects.create(username='dock', primary_role='super_admin')
+        self.client.force_login(self.user)
+
+    def post(self, scans):
+        return self.client.post(reverse('scan_api'), json.dumps({'scans': scans}), content_type='application/json')
+
+    def test_full_batch_is_processed(self):
+        orders = [OrderFulfillment.objects.create(store=self.store, tracker_id=f'T{i}') for i in range(scanning.MAX_BATCH)]
+
+        response = self.post([order.tracker_id for order in orders])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['delivered'], scanning.MAX_BATCH)
+        self.assertEqual(len(response.json()['results']), scanning.MAX_BATCH)
+
+    def test_oversize_batch_is_refused_whole(self):
+        orders = [OrderFulfillment.objects.create(store=self.store, tracker_id=f'T{i}') for i in range(scanning.MAX_BATCH + 1)]
+
+        response = self.post([order.tracker_id for order in orders])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['max_batch'], scanning.MAX_BATCH)
+        self.assertFalse(OrderFulfillment.objects.exclude(status='pending').exists())
+
+    def test_process_scans_never_drops_codes(self):
+        with self.assertRaises(ValueError):
+            scanning.process_scans(['X'] * (scanning.MAX_BATCH + 1), None, self.user)
+
+
+# ---------------------------------
+# DELTA SYNC
+# ---------------------------------
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='WH')
+        self.store = Store.objects.create(warehouse=self.warehouse, store_name='S')
+        self.start = sync.parse_cursor(self.store.change_seq)
+        # Past the commit lag for everything written by the test
+        self.later = timezone.now() + sync.COMMIT_LAG * 2
+
+    def page(self, cursor, limit=sync.DEFAULT_LIMIT, now=None):
+        return sync.changes_since(
+            cursor,
+            {
+                'orders': OrderFulfillment.objects.all(),
+                'products': Product.objects.all(),
+                'stores': Store.objects.all(),
+            },
+            sync.scoped_tombstones(self.warehouse),
+            limit=limit,
+            now=now or self.later,
+        )
+
+    def test_pages_split_a_bulk_write_without_repeats(self):
+        orders = [OrderFulfillment.objects.create(store=self.store) for _ in range(12)]
+        cursor = sync.parse_cursor(max(o.change_seq for o in orders))
+        # One bulk UPDATE stamps every row with the same number
+        transitions.bulk_transition(OrderFulfillment.objects.all(), 'delivered')
+        self.assertEqual(OrderFulfillment.objects.values('change_seq').distinct().count(), 1)
+
+        seen, sizes = [], []
+        while True:
+            page = self.page(cursor, limit=5)
+            sizes.append(len(page['orders']))
+            seen += [row['id'] for row in page['orders']]
+            cursor = sync.parse_cursor(page['cursor'])
+            if not page['has_more']:
+                break
+
+        self.assertEqual(sizes, [5, 5, 2])
+        self.assertEqual(seen, sorted(o.pk for o in orders))
+        self.assertEqual(self.page(cursor)['orders'], [])
+
+    def test_recent_changes_are_held_back(self):
+        OrderFulfillment.objects.create(store=self.store)
+
+        page = self.page(self.start, now=timezone.now())
+
+        self.assertEqual(page['orders'], [])
+        self.assertFalse(page['has_more'])
+        self.assertEqual(sync.parse_cursor(page['cursor']), self.start)
+        self.assertEqual(len(self.page(self.start)['orders']), 1)
+
+    def test_deletes_come_through_as_tombstones(self):
+        order = OrderFulfillment.objects.create(store=self.store)
+        order_id = order.pk
+        cursor = sync.parse_cursor(self.page(self.start)['cursor'])
+        order.delete()
+
+        page = self.page(cursor)
+
+        self.assertEqual(page['orders'], [])
+        self.assertEqual(page['deleted']['orders'], [order_id])
+        other = Warehouse.objects.create(name='Elsewhere')
+        self.assertFalse(sync.scoped_tombstones(other).filter(object_id=order_id, model='order').exists())
+        self.assertTrue(Tombstone.objects.filter(object_id=order_id, model='order').exists())
+
+    def test_cursor_parsing(self):
+        self.assertEqual(sync.parse_cursor('7'), (7, len(sync.SOURCES), 0))
+        self.assertEqual(sync.parse_cursor('7:1:42'), (7, 1, 42))
+        for value in ('x', '1:2', '-1', '1:2:3:4'):
+            with self.assertRaises(ValueError):
+                sync.parse_cursor(value)
+
+
+# ---------------------------------
+# JOB QUEUE
+# ---------------------------------
+
+@jobs.job('tests.stalls', max_attempts=3)
+def stalling_job(job, fail=False):
+    # Misses its heartbeat: the job is requeued and claimed elsewhere mid-run
+    Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - jobs.STALE_AFTER * 2)
+    jobs.requeue_stale()
+    jobs.claim('other-worker')
+    if fail:
+        raise RuntimeError("late failure")
+
+
+class JobLeaseTests(TestCase):
+
+    def run_stalling(self, **payload):
+        queued = jobs.enqueue('tests.stalls', payload)
+        job = jobs.claim('first-worker')
+        self.assertEqual(job.pk, queued.pk)
+        with self.assertLogs('dashboard.jobs', 'WARNING') as logs:
+            status = jobs.execute(job)
+        self.assertIn('dropping this run', logs.output[-1])
+        return job, status
+
+    def test_result_of_a_taken_over_run_is_dropped(self):
+        job, status = self.run_stalling()
+
+        self.assertIsNone(status)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('running', 'other-worker', 2))
+
+    def test_failure_of_a_taken_over_run_does_not_requeue(self):
+        job, status = self.run_stalling(fail=True)
+
+        self.assertIsNone(status)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('running', ''))
+
+    def test_progress_only_reaches_the_owned_run(self):
+        jobs.enqueue('tests.stalls')
+        Job.objects.update(max_attempts=1)
+        job = jobs.claim('first-worker')
+        job.report(1, 2, 'halfway')
+        job.refresh_from_db()
+        self.assertEqual(job.progress_message, 'halfway')
+
+        Job.objects.filter(pk=job.pk).update(locked_by='someone-else')
+        job.report(2, 2, 'done')
+        self.assertEqual(Job.objects.get(pk=job.pk).progress_message, 'halfway')
+
+
+# ---------------------------------
+# BULK USER IMPORT
+# ---------------------------------
+
+class UserImportTests(TestCase):
+    CSV = [
+        'username,password,email,warehouse,role,store\n',
+        'alice,Corr3ct-Horse-Battery,alice@example.com,WH,store_manager,S\n',
+        'bob,Corr3ct-Horse-Battery,bob@example.com,WH,store_manager,S\n',
+    ]
+
+    def setUp(self):
+        Role.objects.create(name='store_manager')
+        Store.objects.create(warehouse=Warehouse.objects.create(name='WH'), store_name='S')
+
+    def test_import_creates_users_and_assignments(self):
+        self.assertEqual(provisioning.import_users(self.CSV), (2, 2))
+        self.assertTrue(User.objects.get(username='bob').check_password('Corr3ct-Horse-Battery'))
+
+    def test_username_taken_after_validation_is_a_row_error(self):
+        real_hash = provisioning.hash_passwords
+
+        def hash_while_bob_signs_up(passwords):
+            User.objects.create(username='bob')
+            return real_hash(passwords)
+
+        with mock.patch.object(provisioning, 'hash_passwords', hash_while_bob_signs_up):
+            with self.assertRaises(ValidationError) as raised:
+                provisioning.import_users(self.CSV)
+
+        self.assertEqual(raised.exception.messages, ["Line 3: user 'bob' already exists"])
+        self.assertFalse(User.objects.filter(username='alice').exists())
+
+    @override_settings(SETTINGS_MODULE=None)
+    def test_hashing_without_a_settings_module_stays_in_process(self):
+        hashes = hashing.hash_passwords(['secret'] * hashing.MIN_PARALLEL, workers=4)
+        self.assertEqual(len(hashes), hashing.MIN_PARALLEL)
+        user = User(password=hashes[0])
+        self.assertTrue(user.check_password('secret'))
+
+
+# ---------------------------------
+# INVENTORY LEDGER
+# ---------------------------------
+
+class InventoryLedgerTests(TestCase):
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='WH')
+        self.product = Product.objects.create(code='B000TEST', product_name='Widget', code_type='asin')
+        store = Store.objects.create(warehouse=self.warehouse, store_name='S')
+        self.orders = [OrderFulfillment.objects.create(store=store, quantity=3) for _ in range(3)]
+
+    def change(self, order, previous_status='pending', quantity=3, product=True):
+        return (order.pk, self.product.pk if product else None, self.warehouse.pk, quantity, previous_status)
+
+    def test_receiving_and_shipping_move_the_level(self):
+        received = inventory.record_status_changes(
+            [self.change(self.orders[0]), self.change(self.orders[1], quantity=2)], 'delivered',
+        )
+        self.assertEqual([(m.reason, m.quantity) for m in received], [('received', 3), ('received', 2)])
+        self.assertEqual(inventory.on_hand(self.product.pk, self.warehouse.pk), 5)
+
+        inventory.record_status_changes([self.change(self.orders[0], 'delivered')], 'completed')
+        self.assertEqual(inventory.on_hand(self.product.pk, self.warehouse.pk), 2)
+        self.assertEqual(InventoryMovement.objects.filter(reason='shipped').get().quantity, -3)
+
+    def test_repeats_and_incomplete_rows_are_skipped(self):
+        movements = inventory.record_status_changes([
+            self.change(self.orders[0], previous_status='delivered'),
+            self.change(self.orders[1], product=False),
+            self.change(self.orders[2], quantity=0),
+        ], 'delivered')
+
+        self.assertEqual(movements, [])
+        self.assertFalse(InventoryLevel.objects.exists())
+        self.assertEqual(inventory.record_status_changes([self.change(self.orders[0])], 'out_of_stock'), [])
+        self.assertFalse(InventoryMovement.objects.exists())
+
+    def test_reconcile_reports_and_rewrites_drifted_levels(self):
+        inventory.record_status_changes([self.change(self.orders[0])], 'delivered')
+        other = Warehouse.objects.create(name='Other')
+        key, orphan = (self.product.pk, self.warehouse.pk), (self.product.pk, other.pk)
+        InventoryLevel.objects.filter(warehouse=self.warehouse).update(on_hand=7)
+        InventoryLevel.objects.create(product=self.product, warehouse=other, on_hand=4)
+
+        self.assertEqual(inventory.reconcile(fix=False), {key: (7, 3), orphan: (4, 0)})
+        self.assertEqual(inventory.on_hand(*key), 7)
+
+        self.assertEqual(inventory.reconcile(), {key: (7, 3), orphan: (4, 0)})
+        self.assertEqual((inventory.on_hand(*key), inventory.on_hand(*orphan)), (3, 0))
+        self.assertEqual(inventory.reconcile(), {})
+
+    def test_reconcile_creates_missing_levels(self):
+        inventory.record_status_changes([self.change(self.orders[0])], 'delivered')
+        InventoryLevel.objects.all().delete()
+
+        self.assertEqual(inventory.reconcile(), {(self.product.pk, self.warehouse.pk): (0, 3)})
+        self.assertEqual(inventory.on_hand(self.product.pk, self.warehouse.pk), 3)
+
+
+# ---------------------------------
+# PUTAWAY
+# ---------------------------------
+
+class PutawayTests(TestCase):
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='WH')
+        self.store = Store.objects.create(warehouse=self.warehouse, store_name='S')
+        self.bins = {
+            code: Bin.objects.create(warehouse=self.warehouse, code=code, capacity=capacity, sequence=sequence)
+            for code, capacity, sequence in [('A', 10, 2), ('B', 5, 1), ('C', 5, 3)]
+        }
+        # Build this process's index up front
+        putaway.suggest(self.warehouse.pk, 1)
+
+    def orders(self, *quantities):
+        return [
+            (OrderFulfillment.objects.create(store=self.store, status='delivered', quantity=quantity).pk, quantity)
+            for quantity in quantities
+        ]
+
+    def index_free(self):
+        return {
+            Bin.objects.get(pk=bin_id).code: free
+            for bin_id, free in putaway._indexes[self.warehouse.pk][2].free.items()
+        }
+
+    def occupied(self):
+        return dict(Bin.objects.filter(warehouse=self.warehouse).values_list('code', 'occupied'))
+
+    def test_best_fit_and_index_update_on_commit(self):
+        orders = self.orders(5, 4, 8)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            assigned = putaway._assign(self.warehouse.pk, orders)
+            # Nothing is committed yet, so the shared index must not have moved
+            self.assertEqual(self.index_free(), {'A': 10, 'B': 5, 'C': 5})
+
+        codes = {order_id: Bin.objects.get(pk=bin_id).code for order_id, bin_id in assigned.items()}
+        # Largest first; among equally free bins the one nearer the dock
+        self.assertEqual([codes[order_id] for order_id, _ in orders], ['B', 'C', 'A'])
+        self.assertEqual(self.occupied(), {'A': 8, 'B': 5, 'C': 4})
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.index_free(), {'A': 2, 'C': 1})
+
+    def test_bin_fuller_than_the_index_is_retried_elsewhere(self):
+        # Filled behind this process's back (no signal, so no rebuild)
+        Bin.objects.filter(pk=self.bins['B'].pk).update(occupied=5)
+        [(order_id, _)] = orders = self.orders(5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assigned = putaway._assign(self.warehouse.pk, orders)
+
+        self.assertEqual(assigned, {order_id: self.bins['C'].pk})
+        self.assertEqual(self.occupied(), {'A': 0, 'B': 5, 'C': 5})
+        self.assertEqual(self.index_free(), {'A': 10})
+
+    def test_release_frees_space_after_commit(self):
+        orders = self.orders(3, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            putaway._assign(self.warehouse.pk, orders)
+        self.assertEqual(self.occupied(), {'A': 0, 'B': 5, 'C': 0})
+        rows = [(order_id, self.bins['B'].pk, self.warehouse.pk, quantity) for order_id, quantity in orders]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            putaway._release(rows)
+            self.assertEqual(self.index_free(), {'A': 10, 'C': 5})
+
+        self.assertEqual(self.occupied(), {'A': 0, 'B': 0, 'C': 0})
+        self.assertFalse(OrderFulfillment.objects.filter(bin__isnull=False).exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.index_free(), {'A': 10, 'B': 5, 'C': 5})
+
+    def test_import_reports_each_problem_separately(self):
+        with self.assertRaises(ValidationError) as raised:
+            putaway.import_bins(self.warehouse, [
+                'code,zone,sequence,capacity\n',
+                'X,,-1,5\n',
+                'Y,,0,0\n',
+            ])
+        self.assertEqual(raised.exception.messages, [
+            "Line 2: bin X needs a sequence of 0 or more.",
+            "Line 3: bin Y needs a capacity of at least 1.",
+        ])
+
+
+# ---------------------------------
+# PICK WAVES
+# ---------------------------------
+
+class WavePlanningTests(SimpleTestCase):
+    # Pick-path locations: (zone, sequence, bin code)
+    A1, A2, B1 = ('A', 1, 'A-01'), ('A', 2, 'A-02'), ('B', 1, 'B-01')
+
+    def test_lines_follow_the_pick_path_next_fit(self):
+        rows = [
+            (1, 4, None, 7, 1),
+            (2, 5, self.B1, 7, 1),
+            (3, 3, self.A2, 7, 1),
+            (4, 6, self.A1, 7, 1),
+        ]
+        self.assertEqual(waves.plan_waves(rows, 10), [[4, 3], [2, 1]])
+
+    def test_a_line_stays_in_one_wave(self):
+        rows = [
+            (1, 6, self.A1, 7, 1),
+            (2, 3, self.A2, 7, 1),
+            (3, 3, self.A2, 7, 1),
+            # Same bin, another store: its own line
+            (4, 1, self.A2, 7, 2),
+        ]
+        self.assertEqual(waves.plan_waves(rows, 10), [[1], [2, 3, 4]])
+
+    def test_only_lines_larger_than_a_cart_are_split(self):
+        rows = [
+            (1, 2, self.A1, 7, 1),
+            (2, 6, self.A2, 7, 1),
+            (3, 6, self.A2, 7, 1),
+            (4, 12, self.B1, 7, 1),
+        ]
+        # An order larger than a cart still gets a wave of its own
+        self.assertEqual(waves.plan_waves(rows, 10), [[1, 2], [3], [4]])
+
+    def test_zero_unit_lines_ride_along(self):
+        rows = [
+            (1, 0, self.A1, 7, 1),
+            (2, 10, self.A2, 7, 1),
+            (3, 0, self.B1, 7, 1),
+            (4, 0, None, 7, 1),
+        ]
+        self.assertEqual(waves.plan_waves(rows, 10), [[1, 2, 3, 4]])
+        self.assertEqual(waves.plan_waves([], 10), [])
@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import imaging, jobs, labels
+from .models import ProductThumbnail
+
+# ---------------------------------
+# PRODUCT IMAGE THUMBNAILS
+# ---------------------------------
+# The product list used to hotlink full-size third-party images. Now a
+# product's image is queued whenever its link is saved; the
+# generate_thumbnails job downloads each original once (content-addressed,
+# like shipping labels), renders WebP and JPEG thumbnails in a process pool
+# (dashboard/imaging.py), and the list shows the local files. Thumbnail
+# names contain the original's hash, so they can be cached forever.
+
+FETCH_WORKERS = 8
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+
+
+def storage_root():
+    return Path(settings.THUMBNAIL_STORAGE_ROOT)
+
+
+def originals_root():
+    return storage_root() / 'originals'
+
+
+def thumbnail_path(filename):
+    return storage_root() / filename[:2] / filename
+
+
+# --- Queueing ---
+
+def queue_thumbnails(products, enqueue=True, user=None):
+    """
+    (Re)queue thumbnails for products in the `products` queryset whose image
+    link is new, changed, or failed last time. Returns the thumbnail ids
+    that need generating.
+    """
+    wanted = dict(
+        products.exclude(Q(product_image_link__isnull=True) | Q(product_image_link=''))
+        .values_list('id', 'product_image_link')
+    )
+    if not wanted:
+        return []
+    existing = {
+        thumbnail.product_id: thumbnail
+        for thumbnail in ProductThumbnail.objects.filter(product_id__in=list(wanted))
+    }
+
+    new_thumbnails = []
+    stale = []
+    for product_id, url in wanted.items():
+        thumbnail = existing.get(product_id)
+        if thumbnail is None:
+            new_thumbnails.append(ProductThumbnail(product_id=product_id, source_url=url))
+        elif thumbnail.source_url != url or thumbnail.status == 'failed':
+            thumbnail.source_url = url
+            thumbnail.status = 'queued'
+            thumbnail.error = ''
+            stale.append(thumbnail)
+    ProductThumbnail.objects.bulk_create(new_thumbnails)
+    ProductThumbnail.objects.bulk_update(stale, ['source_url', 'status', 'error'])
+
+    thumbnail_ids = [thumbnail.pk for thumbnail in new_thumbnails + stale]
+    if thumbnail_ids and enqueue:
+        jobs.enqueue('generate_thumbnails', {'thumbnail_ids': thumbnail_ids}, created_by=user)
+    # Thumbnails already queued have a job of their own
+    return thumbnail_ids + [
+        thumbnail.pk for thumbnail in existing.values()
+        if thumbnail.status == 'queued' and thumbnail not in stale
+    ]
+
+
+# --- Generating ---
+
+def _fetch(url):
+    return labels.download(url, originals_root(), MAX_IMAGE_BYTES)
+
+
+def generate_thumbnails(thumbnail_ids, report=None):
+    """
+    Download originals (threads) and render thumbnails (processes) for the
+    given ids. `report(done, total)` is called as images finish. Returns the
+    number that failed; failures are recorded on the thumbnail.
+    """
+    thumbnails = list(ProductThumbnail.objects.filter(pk__in=thumbnail_ids).exclude(status='ready'))
+    if not thumbnails:
+        return 0
+    size = settings.THUMBNAIL_SIZE
+    errors = {}
+    keys = {}
+
+    # 1. Originals: one download per URL, I/O bound
+    urls = sorted({thumbnail.source_url for thumbnail in thumbnails})
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(urls)), thread_name_prefix='image-fetch') as pool:
+        futures = {url: pool.submit(_fetch, url) for url in urls}
+    for url, future in futures.items():
+        try:
+            keys[url] = future.result()[0]
+        except (OSError, ValueError) as e:
+            errors[url] = e
+
+    # 2. Thumbnails: once per distinct original, CPU bound
+    tasks = []
+    for key in set(keys.values()):
+        names = imaging.thumbnail_names(key, size)
+        if not all(thumbnail_path(name).exists() for name in names.values()):
+            thumbnail_path(names['webp']).parent.mkdir(parents=True, exist_ok=True)
+            tasks.append((str(originals_root() / key[:2] / key), str(thumbnail_path(names['webp']).parent), key, size))
+    render_errors = {key: error for key, error in imaging.render_many(tasks) if error is not None}
+
+    # 3. Record results; skip rows whose link changed meanwhile (requeued)
+    failed = 0
+    for done, thumbnail in enumerate(thumbnails, start=1):
+        key = keys.get(thumbnail.source_url)
+        error = errors.get(thumbnail.source_url) or render_errors.get(key)
+        if error is not None:
+            failed += 1
+            updates = {'status': 'failed', 'error': str(error)[:1000]}
+        else:
+            updates = {'status': 'ready', 'error': '', 'source_sha256': key, 'size': size, 'generated_at': timezone.now()}
+        ProductThumbnail.objects.filter(pk=thumbnail.pk, source_url=thumbnail.source_url).update(**updates)
+        if report:
+            report(done, len(thumbnails))
+    return failed
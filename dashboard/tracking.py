@@ -0,0 +1,237 @@
+import asyncio
+import json
+import re
+import time
+import urllib.parse
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OrderFulfillment
+from .transitions import bulk_transition
+
+# ---------------------------------
+# CARRIER TRACKING POLLER
+# ---------------------------------
+# Pending orders with a tracker_id are checked against their carrier
+# (settings.TRACKING_CARRIERS) from the scheduled poll_carriers job. Each
+# run takes the orders whose tracking_next_check_at is due, checks them
+# concurrently on one asyncio loop with a concurrency cap and a request
+# rate per carrier, moves the delivered ones with bulk_transition and
+# pushes the rest back: the further an order is from its expected delivery
+# date, the longer until it is checked again.
+
+BATCH_SIZE = 2000
+TRANSITION_BATCH = 500
+DELIVERED_STATUSES = ('delivered',)
+
+RETRY_AFTER_ERROR = timedelta(hours=1)
+UNKNOWN_DATE_DELAY = timedelta(hours=6)
+MAX_CHECK_DELAY = timedelta(days=7)
+
+
+class TrackingResult(NamedTuple):
+    status: str
+    delivered: bool
+
+
+class CarrierClient(ABC):
+    """
+    One carrier's tracking API; settings' `client` names a subclass. Keys of
+    the carrier's TRACKING_CARRIERS entry (other than pattern, concurrency,
+    rate_per_second and client) are passed as options.
+    """
+
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = options
+
+    @abstractmethod
+    def check(self, tracker_id):
+        """
+        The TrackingResult for `tracker_id`. Runs in a worker thread, so it
+        may block; any exception counts as a failed check and the order is
+        retried after RETRY_AFTER_ERROR.
+        """
+
+
+class JsonHttpCarrierClient(CarrierClient):
+    """
+    GET options['url'] with {tracker_id} filled in; the reply is JSON with a
+    "status" key. Statuses in options['delivered_statuses'] (default
+    'delivered') count as delivered.
+    """
+
+    def check(self, tracker_id):
+        url = self.options['url'].format(tracker_id=urllib.parse.quote(tracker_id, safe=''))
+        request = urllib.request.Request(url, headers=self.options.get('headers', {}))
+        with urllib.request.urlopen(request, timeout=self.options.get('timeout', 10)) as response:
+            status = str(json.load(response).get('status', '')).lower()
+        return TrackingResult(status, status in self.options.get('delivered_statuses', DELIVERED_STATUSES))
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (per carrier, on one event loop)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            delay = self.next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_at = max(self.next_at, time.monotonic()) + self.interval
+
+
+class Carrier:
+    def __init__(self, name, spec):
+        spec = dict(spec)
+        self.name = name
+        self.pattern = re.compile(spec.pop('pattern', '.*'))
+        self.concurrency = spec.pop('concurrency', 4)
+        self.rate = spec.pop('rate_per_second', None)
+        self.client = import_string(spec.pop('client', 'dashboard.tracking.JsonHttpCarrierClient'))(name, **spec)
+
+
+def load_carriers():
+    """Carriers in settings order; the first whose pattern matches a tracker_id owns it."""
+    return [Carrier(name, spec) for name, spec in getattr(settings, 'TRACKING_CARRIERS', {}).items()]
+
+
+def carrier_for(tracker_id, carriers):
+    for carrier in carriers:
+        if carrier.pattern.match(tracker_id):
+            return carrier
+    return None
+
+
+# --- Concurrent checks ---
+
+async def _check_carrier(carrier, items, results):
+    semaphore = asyncio.Semaphore(carrier.concurrency)
+    limiter = RateLimiter(carrier.rate)
+
+    async def check(order_id, tracker_id):
+        async with semaphore:
+            await limiter.wait()
+            try:
+                results[order_id] = await asyncio.to_thread(carrier.client.check, tracker_id)
+            except Exception as e:
+                results[order_id] = e
+
+    await asyncio.gather(*(check(order_id, tracker_id) for order_id, tracker_id in items))
+
+
+async def _check_all(groups):
+    loop = asyncio.get_running_loop()
+    # Blocking clients run in threads; size the pool to the sum of the caps
+    loop.set_default_executor(ThreadPoolExecutor(
+        max_workers=max(1, sum(carrier.concurrency for carrier in groups)),
+        thread_name_prefix='tracking',
+    ))
+    results = {}
+    await asyncio.gather(*(_check_carrier(carrier, items, results) for carrier, items in groups.items()))
+    return results
+
+
+def check_trackers(groups):
+    """{carrier: [(order_id, tracker_id)]} -> {order_id: TrackingResult or exception}."""
+    return asyncio.run(_check_all(groups)) if groups else {}
+
+
+# --- Scheduling ---
+
+def next_check_delay(expected_delivery_date, today):
+    """Check often around the expected date, rarely while it is far off."""
+    if expected_delivery_date is None:
+        return UNKNOWN_DATE_DELAY
+    days_left = (expected_delivery_date - today).days
+    if days_left <= 1:
+        return timedelta(hours=1)
+    if days_left <= 3:
+        return timedelta(hours=4)
+    # Half the remaining time: at least daily, at most weekly
+    return min(max(timedelta(days=days_left / 2), timedelta(days=1)), MAX_CHECK_DELAY)
+
+
+def due_orders(now, limit=BATCH_SIZE):
+    return (
+        OrderFulfillment.objects.filter(status='pending')
+        .exclude(tracker_id='')
+        .filter(Q(tracking_next_check_at__isnull=True) | Q(tracking_next_check_at__lte=now))
+        .order_by(F('tracking_next_check_at').asc(nulls_first=True))
+        .values_list('id', 'tracker_id', 'expected_delivery_date')[:limit]
+    )
+
+
+def poll(now=None, report=None):
+    """
+    One polling pass over the due orders. `report(done, total)` is called
+    once the carriers have answered. Returns counts of orders checked,
+    delivered, failed (errors) and skipped (no carrier matches).
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    carriers = load_carriers()
+    rows = list(due_orders(now))
+
+    groups = defaultdict(list)
+    expected = {}
+    unknown = []
+    for order_id, tracker_id, expected_delivery_date in rows:
+        expected[order_id] = expected_delivery_date
+        carrier = carrier_for(tracker_id, carriers)
+        if carrier is None:
+            unknown.append(order_id)
+        else:
+            groups[carrier].append((order_id, tracker_id))
+
+    results = check_trackers(groups)
+    if report:
+        report(len(results), len(rows))
+
+    delivered = [order_id for order_id, result in results.items() if isinstance(result, TrackingResult) and result.delivered]
+    moved = 0
+    for start in range(0, len(delivered), TRANSITION_BATCH):
+        # Someone may have moved the order by hand while we were polling
+        moved += bulk_transition(
+            OrderFulfillment.objects.filter(id__in=delivered[start:start + TRANSITION_BATCH], status='pending'),
+            'delivered',
+        )
+
+    # One UPDATE per (next check, status) group instead of one per order
+    schedule = defaultdict(list)
+    errors = 0
+    for order_id, result in results.items():
+        if isinstance(result, Exception):
+            errors += 1
+            schedule[(now + RETRY_AFTER_ERROR, None)].append(order_id)
+        elif result.delivered:
+            schedule[(None, result.status)].append(order_id)
+        else:
+            delay = next_check_delay(expected[order_id], today)
+            schedule[(now + delay, result.status)].append(order_id)
+    for order_id in unknown:
+        # No carrier configured for this tracker; look again in a day
+        schedule[(now + timedelta(days=1), None)].append(order_id)
+
+    for (next_check_at, status), order_ids in schedule.items():
+        updates = {'tracking_next_check_at': next_check_at, 'tracking_checked_at': now}
+        if status is not None:
+            updates['tracking_status'] = status[:50]
+        OrderFulfillment.objects.filter(id__in=order_ids).update(**updates)
+
+    return {'checked': len(results), 'delivered': moved, 'errors': errors, 'skipped': len(unknown)}
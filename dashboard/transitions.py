@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import forecast, inventory, labels, putaway, webhooks
+from .models import OrderFulfillment, OrderStatusEvent, next_change_seq
+
+# ---------------------------------
+# ORDER STATUS TRANSITIONS
+# ---------------------------------
+# Every status change goes through this module so that OrderStatusEvent
+# stays in step with OrderFulfillment.status. Label downloads (see
+# dashboard/labels.py) are queued here too: on creation, on edit, and when
+# an order reaches ready_to_ship. Webhook deliveries for status changes
+# (dashboard/webhooks.py), stock movements for received/shipped orders
+# (dashboard/inventory.py) and bin assignments (dashboard/putaway.py) are
+# written in the same transaction.
+
+
+def record_order_created(order, user=None):
+    """Log the initial 'pending' event for a freshly saved order."""
+    forecast.record_changes(added=[forecast.pending_key(order)])
+    if order.shipping_label_url:
+        labels.queue_labels(OrderFulfillment.objects.filter(pk=order.pk), user=user)
+    return OrderStatusEvent.objects.create(
+        order=order,
+        warehouse_id=order.store.warehouse_id if order.store_id else None,
+        store_id=order.store_id,
+        status=order.status,
+        quantity=order.quantity,
+        actor=user,
+        at=order.created_at,
+    )
+
+
+def record_order_edited(order, previous_key):
+    """
+    Keep derived state in step after an order's fields were edited.
+    `previous_key` is forecast.pending_key(order) taken before the edit.
+    """
+    forecast.record_changes(removed=[previous_key], added=[forecast.pending_key(order)])
+    if order.shipping_label_url:
+        # No-op unless the URL changed or the last fetch failed
+        labels.queue_labels(OrderFulfillment.objects.filter(pk=order.pk))
+
+
+@transaction.atomic
+def transition_order(order, status, user=None, from_statuses=None):
+    """
+    Move a single order to `status` and append the matching event. The row
+    is locked and re-read first, so concurrent requests see each other's
+    change; an order already in `status`, or not in `from_statuses` when
+    given, is left alone and None returned.
+    """
+    order.refresh_from_db(from_queryset=OrderFulfillment.objects.select_for_update())
+    previous_status = order.status
+    if previous_status == status or (from_statuses and previous_status not in from_statuses):
+        return None
+    forecast.record_changes(removed=[forecast.pending_key(order)])
+    order.status = status
+    order.action_taken_by = user
+    order.action_taken_at = timezone.now()
+    order.save(update_fields=['status', 'action_taken_by', 'action_taken_at'])
+
+    event = OrderStatusEvent.objects.create(
+        order=order,
+        warehouse_id=order.store.warehouse_id if order.store_id else None,
+        store_id=order.store_id,
+        status=status,
+        previous_status=previous_status,
+        quantity=order.quantity,
+        actor=user,
+        at=order.action_taken_at,
+    )
+    webhooks.record_events([event])
+    inventory.record_status_changes(
+        [(order.pk, order.product_id, event.warehouse_id, order.quantity, previous_status)], status, user, order.action_taken_at,
+    )
+    if status == 'delivered' or order.bin_id:
+        placed = putaway.record_status_changes([order.pk], status)
+        if order.pk in placed:
+            order.bin_id = placed[order.pk]
+        elif status not in putaway.HOLDING_STATUSES:
+            order.bin_id = None
+    if status == 'ready_to_ship' and order.shipping_label_url:
+        labels.queue_labels(OrderFulfillment.objects.filter(pk=order.pk), user=user)
+    return order
+
+
+@transaction.atomic
+def bulk_transition(orders, status, user=None):
+    """
+    Move every order in the `orders` queryset to `status`.
+    One UPDATE for the orders and one multi-row INSERT for the events.
+    Returns the number of orders moved.
+    """
+    rows = list(
+        orders.select_for_update(of=('self',))
+        .exclude(status=status)
+        .values_list(
+            'id', 'status', 'store_id', 'store__warehouse_id', 'expected_delivery_date', 'quantity', 'product_id',
+        )
+    )
+    if not rows:
+        return 0
+
+    now = timezone.now()
+    order_ids = [row[0] for row in rows]
+    # Queryset updates bypass save(), so stamp the delta-sync columns here
+    OrderFulfillment.objects.filter(id__in=order_ids).update(
+        status=status,
+        action_taken_by=user,
+        action_taken_at=now,
+        change_seq=next_change_seq(),
+        updated_at=now,
+    )
+    events = OrderStatusEvent.objects.bulk_create([
+        OrderStatusEvent(
+            order_id=order_id,
+            warehouse_id=warehouse_id,
+            store_id=store_id,
+            status=status,
+            previous_status=previous_status,
+            quantity=quantity,
+            actor=user,
+            at=now,
+        )
+        for order_id, previous_status, store_id, warehouse_id, _, quantity, _ in rows
+    ])
+    forecast.record_changes(removed=[
+        (warehouse_id, forecast.day_number(due), quantity)
+        for _, previous_status, _, warehouse_id, due, quantity, _ in rows
+        if previous_status == 'pending' and warehouse_id and due
+    ])
+    webhooks.record_events(events)
+    inventory.record_status_changes(
+        [
+            (order_id, product_id, warehouse_id, quantity, previous_status)
+            for order_id, previous_status, _, warehouse_id, _, quantity, product_id in rows
+        ],
+        status, user, now,
+    )
+    putaway.record_status_changes(order_ids, status)
+    if status == 'ready_to_ship':
+        labels.queue_labels(OrderFulfillment.objects.filter(id__in=order_ids), user=user)
+    return len(rows)
@@ -16,6 +16,7 @@ urlpatterns = [
     # --- ASIN/UPC (Product) ---
     path('asin-upc/', views.asin_upc_view, name='asin_upc'),
     path('product/update/<int:pk>/', views.asin_upc_view, name='product_update'),
+    path('product/thumbnail/<str:filename>', views.product_thumbnail_view, name='product_thumbnail'),
     
     # --- Order Fulfillment ---
     path('order-fulfillment/', views.order_fulfillment_view, name='order_fulfillment'), 
@@ -26,6 +27,22 @@ urlpatterns = [
     
     # --- NEW CS ACTION URL ---
     path('order-fulfillment/action/cs/<int:pk>/', views.cs_action_view, name='cs_action'), # <-- NEW
+    path('order-fulfillment/label/<int:pk>/', views.order_label_view, name='order_label'),
+
+    # --- Pick Waves ---
+    path('pick-waves/', views.pick_waves_view, name='pick_waves'),
+    path('pick-waves/plan/', views.plan_waves_view, name='plan_waves'),
+    path('pick-waves/<int:pk>/', views.pick_wave_detail_view, name='pick_wave'),
+    path('pick-waves/<int:pk>/complete/', views.complete_wave_view, name='complete_wave'),
+    path('print-batches/', views.print_batch_view, name='print_batch'),
+    path('print-batches/<int:pk>/', views.print_batch_download_view, name='print_batch_download'),
+
+    # --- Scan Station ---
+    path('scan-station/', views.scan_station_view, name='scan_station'),
+    path('api/scan/', views.scan_api_view, name='scan_api'),
+
+    # --- Delta Sync ---
+    path('api/changes/', views.sync_changes_view, name='sync_changes'),
 
     # --- Store (Create/Update) ---
     path('store-management/', views.store_management_view, name='store_management'),
@@ -35,6 +52,7 @@ urlpatterns = [
     path('create-user/', views.create_user_view, name='create_user'),
     path('user/update/<int:pk>/', views.create_user_view, name='user_update'), 
     path('user/assignment/delete/<int:pk>/', views.delete_user_assignment, name='delete_user_assignment'),
+    path('user/import/', views.import_users_view, name='import_users'),
 
     # --- Warehouse (Create/Update) ---
     path('create-warehouse/', views.create_warehouse_view, name='create_warehouse'),
@@ -46,6 +64,15 @@ urlpatterns = [
     path('ready-to-ship/', views.ready_to_ship_view, name='ready_to_ship'),
     path('total-shipment/', views.total_shipment_view, name='total_shipment'),
 
+    # --- Reports ---
+    path('reports/', views.reports_view, name='reports'),
+    path('analytics/', views.analytics_view, name='analytics'),
+    path('forecast/', views.forecast_view, name='forecast'),
+
+    # --- Background Jobs ---
+    path('jobs/', views.jobs_view, name='jobs'),
+    path('api/jobs/', views.job_status_api, name='job_status_api'),
+
     # delete button---
     path('user/delete/<int:pk>/', views.delete_user_view, name='user_delete'),
     path('store/delete/<int:pk>/', views.delete_store_view, name='store_delete'),
@@ -1,18 +1,34 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from .models import * # Import all new models
 # Import all forms
 from .forms import (
     WarehouseForm, StoreForm, 
-    UserCreateForm, UserUpdateForm, UserAssignmentForm,
+    UserCreateForm, UserUpdateForm, UserAssignmentForm, UserImportForm,
     ProductForm, OrderFulfillmentForm
 ) 
-from django.db.models import Q # Import Q for search
+from django.db.models import Exists, OuterRef, Prefetch, Q, Sum # Import Q for search
 from django.contrib import messages # To show success/error messages
 from functools import wraps # For custom decorator
 from django.utils import timezone # For action timestamp
+from datetime import timedelta
+from django.db import transaction
+from .transitions import record_order_created, record_order_edited, transition_order
+from . import analytics, forecast
+from .backends import get_assignment, get_role_choices, get_super_admin_role
+from .rows import order_rows, render_order_rows
+from .scanning import MAX_BATCH as MAX_SCAN_BATCH, process_scans
+from . import jobs, labels, printing, sync, thumbnails, waves
+from .deletion import soft_delete
+from .provisioning import import_users
+from .pagination import keyset_page
+from django.core.exceptions import ValidationError
+import io
+from django.conf import settings
+from django.views.decorators.http import require_POST
+import json
 
 # --- Authentication Views ---
 
@@ -26,13 +42,13 @@ def login_view(request):
             login(request, user)
             
             # --- ROLE SELECTION LOGIC ---
-            assignments = UserWarehouseRole.objects.filter(user=user)
-            assignment_count = assignments.count()
+            # One grouped query (then cached); see dashboard/backends.py
+            choices = get_role_choices(user)
 
-            if assignment_count == 1:
-                request.session['active_assignment_id'] = assignments.first().id
+            if len(choices) == 1:
+                request.session['active_assignment_id'] = choices[0].id
                 return redirect('dashboard')
-            elif assignment_count > 1:
+            elif len(choices) > 1:
                 return redirect('select_role')
             else:
                 if user.is_superuser or user.primary_role == 'super_admin':
@@ -60,15 +76,10 @@ def active_role_required(view_func):
     def _wrapped_view(request, *args, **kwargs):
         # Super Admins (by primary role) are special.
         if request.user.is_superuser or request.user.primary_role == 'super_admin':
-            try:
-                admin_role = Role.objects.get(name='super_admin')
-            except Role.DoesNotExist:
-                admin_role = Role(name='super_admin') 
-                
             request.active_assignment = UserWarehouseRole(
                 user=request.user, 
                 warehouse=None, 
-                role=admin_role
+                role=get_super_admin_role()
             )
             return view_func(request, *args, **kwargs)
             
@@ -76,15 +87,12 @@ def active_role_required(view_func):
         if 'active_assignment_id' not in request.session:
             return redirect('select_role')
         
-        try:
-            assignment = UserWarehouseRole.objects.get(
-                pk=request.session['active_assignment_id'], 
-                user=request.user
-            )
-            request.active_assignment = assignment
-        except UserWarehouseRole.DoesNotExist:
+        # Served from the cache; see dashboard/backends.py
+        assignment = get_assignment(request.session['active_assignment_id'], request.user)
+        if assignment is None:
             del request.session['active_assignment_id']
             return redirect('select_role')
+        request.active_assignment = assignment
             
         return view_func(request, *args, **kwargs)
     return _wrapped_view
@@ -93,28 +101,18 @@ def active_role_required(view_func):
 
 @login_required
 def select_role_view(request):
-    # 1. Get all raw assignments from database
-    all_assignments = UserWarehouseRole.objects.filter(user=request.user)
-    
-    # 2. Group duplicates based on Warehouse + Role
-    # (Ignore the specific 'Store' field for the selection card)
-    unique_assignments = []
-    seen_combinations = set()
-
-    for assignment in all_assignments:
-        # Create a unique key: (Warehouse ID, Role Name)
-        combo = (assignment.warehouse.id, assignment.role.name)
-        
-        if combo not in seen_combinations:
-            seen_combinations.add(combo)
-            unique_assignments.append(assignment)
+    # 1. One assignment per Warehouse + Role, grouped in the database
+    # (the specific 'Store' is ignored for the selection card) and cached.
+    unique_assignments = get_role_choices(request.user)
 
-    # 3. Auto-Redirect Logic (Based on UNIQUE groups)
+    # 2. Auto-Redirect Logic (Based on UNIQUE groups)
     # If the user effectively has only 1 role context (even if multiple stores), auto-login.
     is_superuser_or_global = (request.user.is_superuser or request.user.primary_role == 'super_admin')
 
     if len(unique_assignments) == 1 and not is_superuser_or_global:
-        request.session['active_assignment_id'] = unique_assignments[0].id
+        # Only write when it changes, so the session row isn't re-saved on every visit
+        if request.session.get('active_assignment_id') != unique_assignments[0].id:
+            request.session['active_assignment_id'] = unique_assignments[0].id
         return redirect('dashboard')
     
     if len(unique_assignments) == 0 and is_superuser_or_global:
@@ -127,14 +125,21 @@ def select_role_view(request):
 
 @login_required
 def set_active_role(request, assignment_id):
-    try:
-        assignment = UserWarehouseRole.objects.get(pk=assignment_id, user=request.user)
-        request.session['active_assignment_id'] = assignment.id
-        return redirect('dashboard')
-    except UserWarehouseRole.DoesNotExist:
+    # The role picker only offers the cached choices, so this is normally
+    # answered without touching the database.
+    valid = any(a.id == assignment_id for a in get_role_choices(request.user))
+    if not valid:
+        valid = UserWarehouseRole.objects.filter(
+            pk=assignment_id, user=request.user, warehouse__deleted_at__isnull=True
+        ).exists()
+    if not valid:
         messages.error(request, "Invalid role selection.")
         return redirect('select_role')
 
+    if request.session.get('active_assignment_id') != assignment_id:
+        request.session['active_assignment_id'] = assignment_id
+    return redirect('dashboard')
+
 
 # --- Main Dashboard View ---
 @login_required
@@ -199,7 +204,10 @@ def asin_upc_view(request, pk=None):
             new_product = form.save(commit=False)
             if not pk:
                 new_product.created_by = request.user 
-            new_product.save()
+            with transaction.atomic():
+                new_product.save()
+                # No-op unless the image link is new or changed
+                thumbnails.queue_thumbnails(Product.objects.filter(pk=new_product.pk), user=request.user)
             messages.success(request, f"Successfully saved product: {new_product.code}")
             return redirect('asin_upc')
 
@@ -225,7 +233,7 @@ def asin_upc_view(request, pk=None):
                 Q(code_type__icontains=query)
             ).distinct()
         
-        products = products_query.order_by('-created_at')
+        products = products_query.select_related('thumbnail').order_by('-created_at')
 
     context = {
         'page_title': page_title,
@@ -238,6 +246,23 @@ def asin_upc_view(request, pk=None):
     }
     return render(request, 'dashboard/asin_upc.html', context)
 
+# --- PRODUCT THUMBNAILS (content-addressed, see dashboard/thumbnails.py) ---
+THUMBNAIL_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+
+
+@login_required
+def product_thumbnail_view(request, filename):
+    key, _, extension = filename.rpartition('.')
+    if extension not in THUMBNAIL_TYPES or not key.replace('-', '').isalnum():
+        raise Http404("Unknown thumbnail.")
+    path = thumbnails.thumbnail_path(filename)
+    if not path.exists():
+        raise Http404("Unknown thumbnail.")
+    response = FileResponse(open(path, 'rb'), content_type=THUMBNAIL_TYPES[extension])
+    # The name changes whenever the image does, so browsers never need to revalidate
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
 # --- ORDER FULFILLMENT VIEW (LOGIC FIX) ---
 @login_required
 @active_role_required
@@ -296,17 +321,28 @@ def order_fulfillment_view(request, pk=None):
              messages.error(request, "You do not have permission to perform this action.")
              return redirect('order_fulfillment')
         
+        # Snapshot before the form writes the POSTed values onto the instance
+        previous_key = forecast.pending_key(order) if order else None
         form = OrderFulfillmentForm(request.POST, instance=order)
         if form.is_valid():
-            new_order = form.save(commit=False)
-            if not pk: 
-                new_order.created_by = request.user
-            new_order.save()
+            with transaction.atomic():
+                new_order = form.save(commit=False)
+                if not pk: 
+                    new_order.created_by = request.user
+                if 'tracker_id' in form.changed_data:
+                    # New tracker: let the carrier poller look at it right away
+                    new_order.tracking_next_check_at = None
+                    new_order.tracking_status = ''
+                new_order.save()
+                if not pk:
+                    record_order_created(new_order, request.user)
+                else:
+                    record_order_edited(new_order, previous_key)
             messages.success(request, f"Successfully saved order.")
             return redirect('order_fulfillment')
 
     # --- 5. FILTER LIST VIEW ---
-    orders = OrderFulfillment.objects.none()
+    orders = []
     query = request.GET.get('q')
     
     if can_view_list:
@@ -332,7 +368,14 @@ def order_fulfillment_view(request, pk=None):
                 Q(tracker_id__icontains=query)
             ).distinct()
         
-        orders = orders_query.order_by('-created_at') 
+        orders = order_rows(orders_query.order_by('-created_at'))
+
+    # Row-independent flags, evaluated once instead of inside the table loop
+    can_mark_arrival = (
+        request.user.primary_role in ['warehouse_manager', 'super_admin'] or
+        active_role_name in ['warehouse_manager', 'warehouse_admin']
+    )
+    show_no_action = not can_create_or_edit and request.user.primary_role != 'warehouse_manager'
 
     context = {
         'page_title': page_title,
@@ -341,11 +384,23 @@ def order_fulfillment_view(request, pk=None):
         'orders': orders,
         'can_view_list': can_view_list,
         'can_create_or_edit': can_create_or_edit,
+        'can_mark_arrival': can_mark_arrival,
+        'show_no_action': show_no_action,
+        'order_rows_html': render_order_rows(
+            orders, 'pending',
+            can_create_or_edit=can_create_or_edit,
+            can_mark_arrival=can_mark_arrival,
+            show_no_action=show_no_action,
+        ),
         'query': query or '',
         'active_assignment': active_assignment
     }
     return render(request, 'dashboard/order_fulfillment.html', context)
 
+def putaway_hint(order):
+    """Tail of the flash message naming the bin putaway chose, if any."""
+    return f" Put away in bin {order.bin.code}." if order.bin_id else ""
+
 # --- ORDER FULFILLMENT ACTION (DTW/OfS) - PERMISSION FIX ---
 @login_required
 @active_role_required
@@ -364,17 +419,15 @@ def order_fulfillment_action(request, pk, action_type):
         return redirect('order_fulfillment')
 
     if action_type == 'dtw': 
-        order.status = 'delivered'
-        order.action_taken_by = request.user
-        order.action_taken_at = timezone.now()
-        order.save()
-        messages.success(request, f"Order {order.id} marked as 'Delivered to Warehouse'.")
+        if transition_order(order, 'delivered', request.user, from_statuses=('pending',)):
+            messages.success(request, f"Order {order.id} marked as 'Delivered to Warehouse'.{putaway_hint(order)}")
+        else:
+            messages.info(request, f"Order {order.id} is '{order.get_status_display()}'; nothing was changed.")
     elif action_type == 'ofs': 
-        order.status = 'out_of_stock'
-        order.action_taken_by = request.user
-        order.action_taken_at = timezone.now()
-        order.save()
-        messages.success(request, f"Order {order.id} marked as 'Out of Stock'.")
+        if transition_order(order, 'out_of_stock', request.user, from_statuses=('pending',)):
+            messages.success(request, f"Order {order.id} marked as 'Out of Stock'.")
+        else:
+            messages.info(request, f"Order {order.id} is '{order.get_status_display()}'; nothing was changed.")
     else:
         messages.error(request, "Invalid action.")
 
@@ -474,6 +527,8 @@ def store_management_view(request, pk=None):
     }
     return render(request, 'dashboard/store_management.html', context)
 # --- USER CREATION VIEW (PERMISSION FIX) ---
+USERS_PER_PAGE = 50
+
 @login_required
 @active_role_required
 def create_user_view(request, pk=None):
@@ -561,10 +616,16 @@ def create_user_view(request, pk=None):
                 return redirect('user_update', pk=pk)
 
     # --- 4. LIST FILTERING LOGIC ---
-    user_list_query = User.objects.all().order_by('-date_joined')
+    user_list_query = User.objects.prefetch_related(
+        Prefetch(
+            'userwarehouserole_set',
+            queryset=UserWarehouseRole.objects.select_related('warehouse', 'store', 'role').order_by('warehouse__name'),
+        )
+    )
 
     query = request.GET.get('q')
     if query:
+        # Served by the trigram indexes on UPPER(username/full_name/email)
         user_list_query = user_list_query.filter(
             Q(username__icontains=query) |
             Q(full_name__icontains=query) |
@@ -573,9 +634,12 @@ def create_user_view(request, pk=None):
 
     if active_role_name == 'warehouse_admin':
         current_warehouse = active_assignment.warehouse
-        user_list_query = user_list_query.filter(
-            userwarehouserole__warehouse=current_warehouse
-        ).distinct()
+        # EXISTS instead of JOIN + DISTINCT over every assignment row
+        user_list_query = user_list_query.filter(Exists(
+            UserWarehouseRole.objects.filter(user=OuterRef('pk'), warehouse=current_warehouse)
+        ))
+
+    users_page = keyset_page(user_list_query, 'date_joined', request.GET, size=USERS_PER_PAGE)
 
     context = {
         'page_title': page_title,
@@ -584,13 +648,48 @@ def create_user_view(request, pk=None):
         'assignment_form': assignment_form, 
         'user_to_edit': user_to_edit, 
         'current_assignments': current_assignments,
-        'users_list': user_list_query,
+        'users_list': users_page['items'],
+        'next_after': users_page['next_after'],
+        'prev_before': users_page['prev_before'],
         'query': query or '',
         'active_assignment': active_assignment,
-        'all_warehouses': Warehouse.objects.all(),
-        'all_roles': Role.objects.all(), 
+        'import_form': UserImportForm(),
     }
     return render(request, 'dashboard/create_user.html', context)
+
+# --- BULK USER IMPORT (CSV) ---
+@login_required
+@active_role_required
+@require_POST
+def import_users_view(request):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in ['super_admin', 'warehouse_admin']:
+        messages.error(request, "You do not have permission to perform this action.")
+        return redirect('dashboard')
+
+    form = UserImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        messages.error(request, "Please choose a CSV file to import.")
+        return redirect('create_user')
+
+    # Warehouse Admin: same limits as the single-user form (own warehouse, managers only)
+    warehouse = active_assignment.warehouse if active_role_name == 'warehouse_admin' else None
+    try:
+        lines = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig')
+        users_created, assignments_created = import_users(lines, warehouse=warehouse)
+    except UnicodeDecodeError:
+        messages.error(request, "The file must be a UTF-8 encoded CSV.")
+    except ValidationError as e:
+        errors = e.messages
+        for error in errors[:10]:
+            messages.error(request, error)
+        if len(errors) > 10:
+            messages.error(request, f"...and {len(errors) - 10} more error(s). Nothing was imported.")
+    else:
+        messages.success(request, f"Imported {users_created} user(s) with {assignments_created} assignment(s).")
+    return redirect('create_user')
 # --- DELETE USER ASSIGNMENT (PERMISSION FIX) ---
 @login_required
 def delete_user_assignment(request, pk):
@@ -654,6 +753,7 @@ def create_warehouse_view(request, pk=None):
         'user': request.user,
         'form': form,
         'warehouses': warehouses,
+        'deletion_jobs': DeletionJob.objects.exclude(status='done').order_by('-created_at'),
         'query': query or '',
         'active_assignment': getattr(request, 'active_assignment', None)
     }
@@ -690,18 +790,144 @@ def delivered_to_warehouse_view(request):
             Q(tracker_id__icontains=query)
         ).distinct()
 
-    orders = orders_query.order_by('-action_taken_at') 
+    orders = order_rows(orders_query.order_by('-action_taken_at')) 
 
     context = {
         'page_title': 'Delivered to Warehouse',
         'user': request.user,
         'orders': orders,
         'can_take_action': can_take_action,
+        'order_rows_html': render_order_rows(orders, 'delivered', can_take_action=can_take_action),
         'query': query or '',
         'active_assignment': active_assignment
     }
     return render(request, 'dashboard/delivered_to_warehouse.html', context)
 
+# --- SCAN STATION (DOCK RECEIVING) ---
+SCAN_ROLES = ['super_admin', 'warehouse_admin', 'warehouse_manager']
+
+@login_required
+@active_role_required
+def scan_station_view(request):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in SCAN_ROLES:
+        messages.error(request, "You do not have permission to view this page.")
+        return redirect('dashboard')
+
+    context = {
+        'page_title': 'Scan Station',
+        'user': request.user,
+        'active_assignment': active_assignment,
+        'max_batch': MAX_SCAN_BATCH,
+    }
+    return render(request, 'dashboard/scan_station.html', context)
+
+@login_required
+@active_role_required
+@require_POST
+def scan_api_view(request):
+    """
+    JSON body: {"scans": ["<tracker/amazon id/ASIN/UPC>", ...], "confirm": [order ids]}.
+    Accepts a buffered batch from a scanner that was offline, up to
+    MAX_SCAN_BATCH scans per request; larger batches are refused with a 400.
+    """
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in SCAN_ROLES:
+        return JsonResponse({'error': 'You do not have permission to perform this action.'}, status=403)
+
+    try:
+        payload = json.loads(request.body or b'{}')
+        scans = payload.get('scans', [])
+        confirm_ids = [int(i) for i in payload.get('confirm', [])]
+        if not isinstance(scans, list):
+            raise ValueError
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON payload.'}, status=400)
+    if len(scans) > MAX_SCAN_BATCH:
+        return JsonResponse(
+            {'error': f'At most {MAX_SCAN_BATCH} scans can be sent at once.', 'max_batch': MAX_SCAN_BATCH},
+            status=400,
+        )
+
+    # Super Admin has no warehouse and scans across all of them
+    warehouse = None if active_role_name == 'super_admin' else active_assignment.warehouse
+    result = process_scans(scans, warehouse, request.user, confirm_ids=confirm_ids)
+    return JsonResponse(result)
+
+# --- SHIPPING LABEL (served from the local cache, see dashboard/labels.py) ---
+@login_required
+@active_role_required
+def order_label_view(request, pk):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    order = get_object_or_404(OrderFulfillment.objects.select_related('store'), pk=pk)
+    if active_role_name == 'store_manager':
+        allowed = order.created_by_id == request.user.id
+    elif active_role_name == 'super_admin':
+        allowed = True
+    else:
+        allowed = order.store is not None and order.store.warehouse_id == active_assignment.warehouse_id
+    if not allowed or not order.shipping_label_url:
+        raise Http404("No shipping label for this order.")
+
+    label = labels.stored_label(order)
+    if label is None:
+        # Not fetched yet (or the URL just changed): fall back to the source
+        return redirect(order.shipping_label_url)
+    return labels.serve(request, label)
+
+# --- DELTA SYNC API ---
+@login_required
+@active_role_required
+def sync_changes_view(request):
+    """
+    GET ?cursor=<cursor>&limit=<n>. Returns orders, products and stores
+    changed after `cursor` plus deleted ids, scoped like the list pages.
+    Clients keep the returned (opaque) cursor and call again while has_more
+    is true; changes from the last few seconds show up on a later call.
+    """
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    try:
+        cursor = sync.parse_cursor(request.GET.get('cursor', 0))
+        limit = min(int(request.GET.get('limit', sync.DEFAULT_LIMIT)), sync.MAX_LIMIT)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'cursor must be one returned by this API and limit a positive integer.'}, status=400)
+
+    orders_query = OrderFulfillment.objects.all()
+    stores_query = Store.objects.all()
+    warehouse = None
+
+    if active_role_name in ['warehouse_admin', 'warehouse_manager']:
+        warehouse = active_assignment.warehouse
+        orders_query = orders_query.filter(store__warehouse=warehouse)
+        stores_query = stores_query.filter(warehouse=warehouse)
+    elif active_role_name == 'store_manager':
+        warehouse = active_assignment.warehouse
+        orders_query = orders_query.filter(created_by=request.user)
+        my_store_ids = UserWarehouseRole.objects.filter(
+            user=request.user,
+            warehouse=warehouse,
+            role__name='store_manager'
+        ).values_list('store_id', flat=True)
+        stores_query = stores_query.filter(id__in=my_store_ids)
+
+    page = sync.changes_since(
+        cursor,
+        {'orders': orders_query, 'products': Product.objects.all(), 'stores': stores_query},
+        sync.scoped_tombstones(warehouse),
+        limit=limit,
+    )
+    return JsonResponse(page)
+
 # --- RTS ACTION VIEW ---
 @login_required
 @active_role_required
@@ -721,12 +947,10 @@ def rts_action_view(request, pk):
         messages.error(request, "You are not assigned to this order's warehouse.")
         return redirect('delivered_to_warehouse')
 
-    order.status = 'ready_to_ship'
-    order.action_taken_by = request.user 
-    order.action_taken_at = timezone.now() 
-    order.save()
-    
-    messages.success(request, f"Order {order.id} marked as 'Ready To Shipment'.")
+    if transition_order(order, 'ready_to_ship', request.user, from_statuses=('delivered',)):
+        messages.success(request, f"Order {order.id} marked as 'Ready To Shipment'.")
+    else:
+        messages.info(request, f"Order {order.id} is '{order.get_status_display()}'; nothing was changed.")
     return redirect('delivered_to_warehouse') 
 
 # --- OUT OF STOCK VIEW (NOW FUNCTIONAL) ---
@@ -757,13 +981,14 @@ def out_of_stock_view(request):
             Q(tracker_id__icontains=query)
         ).distinct()
 
-    orders = orders_query.order_by('-action_taken_at') 
+    orders = order_rows(orders_query.order_by('-action_taken_at')) 
 
     context = {
         'page_title': 'Out of Stock',
         'user': request.user,
         'orders': orders,
         'can_take_action': can_take_action,
+        'order_rows_html': render_order_rows(orders, 'out_of_stock', can_take_action=can_take_action),
         'query': query or '',
         'active_assignment': active_assignment
     }
@@ -791,12 +1016,10 @@ def ofs_to_dtw_action_view(request, pk):
         return redirect('out_of_stock')
 
     # Update the status BACK to 'delivered'
-    order.status = 'delivered'
-    order.action_taken_by = request.user 
-    order.action_taken_at = timezone.now() 
-    order.save()
-    
-    messages.success(request, f"Order {order.id} moved back to 'Delivered to Warehouse'.")
+    if transition_order(order, 'delivered', request.user, from_statuses=('out_of_stock',)):
+        messages.success(request, f"Order {order.id} moved back to 'Delivered to Warehouse'.{putaway_hint(order)}")
+    else:
+        messages.info(request, f"Order {order.id} is '{order.get_status_display()}'; nothing was changed.")
     return redirect('out_of_stock') # Redirect back to the OfS list
 
 
@@ -835,13 +1058,14 @@ def ready_to_ship_view(request):
             Q(tracker_id__icontains=query)
         ).distinct()
 
-    orders = orders_query.order_by('-action_taken_at') # Show newest RTS first
+    orders = order_rows(orders_query.order_by('-action_taken_at')) # Show newest RTS first
 
     context = {
         'page_title': 'Ready To Shipment',
         'user': request.user,
         'orders': orders,
         'can_take_action': can_take_action,
+        'order_rows_html': render_order_rows(orders, 'ready_to_ship', can_take_action=can_take_action),
         'query': query or '',
         'active_assignment': active_assignment
     }
@@ -869,15 +1093,170 @@ def cs_action_view(request, pk):
         return redirect('ready_to_ship')
 
     # Update the status to 'completed'
-    order.status = 'completed'
-    order.action_taken_by = request.user 
-    order.action_taken_at = timezone.now() 
-    order.save()
-    
-    messages.success(request, f"Order {order.id} marked as 'Completed'.")
+    if transition_order(order, 'completed', request.user, from_statuses=('ready_to_ship',)):
+        messages.success(request, f"Order {order.id} marked as 'Completed'.")
+    else:
+        messages.info(request, f"Order {order.id} is '{order.get_status_display()}'; nothing was changed.")
     return redirect('ready_to_ship') # Redirect back to RTS page
 
 
+# --- PICK WAVES ---
+WAVE_ROLES = ['super_admin', 'warehouse_admin', 'warehouse_manager']
+
+@login_required
+@active_role_required
+@require_POST
+def plan_waves_view(request):
+    """Group the orders ticked on the Ready To Ship page into pick waves."""
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in WAVE_ROLES:
+        messages.error(request, "You do not have permission to perform this action.")
+        return redirect('ready_to_ship')
+
+    order_ids = [value for value in request.POST.get('order_ids', '').split(',') if value.strip().isdigit()]
+    if not order_ids:
+        messages.error(request, "Select the orders to plan into waves.")
+        return redirect('ready_to_ship')
+    # Cart size in units; blank means settings.PICK_WAVE_MAX_UNITS
+    max_units = request.POST.get('max_units', '').strip()
+    max_units = int(max_units) if max_units.isdigit() and int(max_units) > 0 else None
+
+    orders = OrderFulfillment.objects.filter(id__in=order_ids)
+    if active_role_name != 'super_admin':
+        orders = orders.filter(store__warehouse=active_assignment.warehouse)
+    created = waves.create_waves(orders, request.user, max_units)
+    if created:
+        messages.success(request, f"Planned {sum(w.order_count for w in created)} order(s) into {len(created)} wave(s).")
+    else:
+        messages.error(request, "None of the selected orders can be planned (already in an open wave, or no units to pick?).")
+    return redirect('pick_waves')
+
+@login_required
+@active_role_required
+def pick_waves_view(request):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in WAVE_ROLES:
+        messages.error(request, "You do not have permission to view this page.")
+        return redirect('dashboard')
+
+    wave_query = PickWave.objects.select_related('warehouse', 'created_by')
+    if active_role_name != 'super_admin':
+        wave_query = wave_query.filter(warehouse=active_assignment.warehouse)
+
+    context = {
+        'page_title': 'Pick Waves',
+        'user': request.user,
+        'open_waves': wave_query.filter(status='open').order_by('id'),
+        'completed_waves': wave_query.filter(status='completed').order_by('-completed_at')[:20],
+        'active_assignment': active_assignment,
+    }
+    return render(request, 'dashboard/pick_waves.html', context)
+
+@login_required
+@active_role_required
+def pick_wave_detail_view(request, pk):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in WAVE_ROLES:
+        messages.error(request, "You do not have permission to view this page.")
+        return redirect('dashboard')
+
+    wave = get_object_or_404(PickWave.objects.select_related('warehouse'), pk=pk)
+    if active_role_name != 'super_admin' and wave.warehouse_id != active_assignment.warehouse_id:
+        messages.error(request, "You are not assigned to this wave's warehouse.")
+        return redirect('pick_waves')
+
+    lines, products = waves.pick_list(wave)
+    context = {
+        'page_title': f'Pick Wave {wave.pk}',
+        'user': request.user,
+        'wave': wave,
+        'lines': lines,
+        'products': products,
+        'active_assignment': active_assignment,
+    }
+    return render(request, 'dashboard/pick_wave.html', context)
+
+@login_required
+@active_role_required
+@require_POST
+def complete_wave_view(request, pk):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in WAVE_ROLES:
+        messages.error(request, "You do not have permission to perform this action.")
+        return redirect('pick_waves')
+
+    wave = get_object_or_404(PickWave, pk=pk)
+    if active_role_name != 'super_admin' and wave.warehouse_id != active_assignment.warehouse_id:
+        messages.error(request, "You are not assigned to this wave's warehouse.")
+        return redirect('pick_waves')
+
+    if wave.status != 'open':
+        messages.error(request, f"Wave {wave.pk} is already completed.")
+    else:
+        moved = waves.complete_wave(wave.pk, request.user)
+        messages.success(request, f"Wave {wave.pk} completed: {moved} order(s) marked as 'Completed'.")
+    return redirect('pick_waves')
+
+
+
+# --- BATCH PRINTING (packing slips + shipping labels, see dashboard/printing.py) ---
+@login_required
+@active_role_required
+@require_POST
+def print_batch_view(request):
+    """One PDF for the orders ticked on the Ready To Ship page."""
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    # Same roles as the other Ready To Ship batch actions
+    if active_role_name not in WAVE_ROLES:
+        messages.error(request, "You do not have permission to perform this action.")
+        return redirect('ready_to_ship')
+
+    order_ids = [value for value in request.POST.get('order_ids', '').split(',') if value.strip().isdigit()]
+    orders = OrderFulfillment.objects.filter(id__in=order_ids)
+    if active_role_name != 'super_admin':
+        orders = orders.filter(store__warehouse=active_assignment.warehouse)
+    order_ids = list(orders.values_list('id', flat=True))
+    if not order_ids:
+        messages.error(request, "Select the orders to print.")
+        return redirect('ready_to_ship')
+
+    if len(order_ids) <= settings.PRINT_BATCH_STREAM_LIMIT:
+        response = StreamingHttpResponse(printing.render_batch(order_ids), content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="print-batch-{timezone.localtime():%Y%m%d-%H%M}.pdf"'
+        return response
+
+    job = jobs.enqueue('build_print_batch', {'order_ids': order_ids}, created_by=request.user)
+    messages.success(
+        request,
+        f"Printing {len(order_ids)} orders in the background (job #{job.pk}); "
+        "download the PDF here once it is done.",
+    )
+    return redirect('jobs')
+
+@login_required
+@active_role_required
+def print_batch_download_view(request, pk):
+    active_role_name = getattr(request.active_assignment.role, 'name', None)
+
+    job = get_object_or_404(Job, pk=pk, name='build_print_batch', status='done')
+    if active_role_name != 'super_admin' and job.created_by_id != request.user.id:
+        raise Http404("No such print batch.")
+    path = printing.batch_path(job.pk)
+    if not path.exists():
+        messages.error(request, f"Print batch #{job.pk} has expired; print the orders again.")
+        return redirect('jobs')
+    return FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f"print-batch-{job.pk}.pdf")
+
 # --- TOTAL SHIPMENT VIEW (NOW FUNCTIONAL) ---
 @login_required
 @active_role_required
@@ -907,12 +1286,13 @@ def total_shipment_view(request):
             Q(tracker_id__icontains=query)
         ).distinct()
 
-    orders = orders_query.order_by('-action_taken_at') # Show newest completed first
+    orders = order_rows(orders_query.order_by('-action_taken_at')) # Show newest completed first
 
     context = {
         'page_title': 'Total Shipment (Completed)',
         'user': request.user,
         'orders': orders,
+        'order_rows_html': render_order_rows(orders, 'completed'),
         'query': query or '',
         'active_assignment': active_assignment
     }
@@ -920,6 +1300,217 @@ def total_shipment_view(request):
     return render(request, 'dashboard/total_shipment.html', context)
 
 
+# --- REPORTS VIEW (reads only from the daily rollup tables) ---
+@login_required
+@active_role_required
+def reports_view(request):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    try:
+        days = max(1, min(int(request.GET.get('days', 30)), 366))
+    except ValueError:
+        days = 30
+    since = timezone.localdate() - timedelta(days=days - 1)
+
+    selected_warehouse = None
+    if active_role_name == 'super_admin':
+        warehouse_id = request.GET.get('warehouse')
+        if warehouse_id:
+            selected_warehouse = get_object_or_404(Warehouse, pk=warehouse_id)
+    else:
+        selected_warehouse = active_assignment.warehouse
+
+    if selected_warehouse is None:
+        # Super Admin overview: one row per warehouse per day
+        rows = DailyWarehouseMetrics.objects.select_related('warehouse').order_by('-day', 'warehouse__name')
+    else:
+        rows = DailyStoreMetrics.objects.filter(warehouse=selected_warehouse).select_related('store', 'warehouse').order_by('-day', 'store__store_name')
+        if active_role_name == 'store_manager':
+            my_store_ids = UserWarehouseRole.objects.filter(
+                user=request.user,
+                warehouse=active_assignment.warehouse,
+                role__name='store_manager'
+            ).values_list('store_id', flat=True)
+            rows = rows.filter(store_id__in=my_store_ids)
+
+    rows = rows.filter(day__gte=since)
+    totals = rows.aggregate(
+        orders_created=Sum('orders_created'),
+        delivered=Sum('delivered'),
+        out_of_stock=Sum('out_of_stock'),
+        shipped=Sum('shipped'),
+        units_ordered=Sum('units_ordered'),
+        units_shipped=Sum('units_shipped'),
+    )
+
+    context = {
+        'page_title': 'Reports',
+        'user': request.user,
+        'rows': rows,
+        'totals': totals,
+        'days': days,
+        'selected_warehouse': selected_warehouse,
+        'show_stores': selected_warehouse is not None,
+        'warehouses': Warehouse.objects.order_by('name') if active_role_name == 'super_admin' else None,
+        'active_assignment': active_assignment
+    }
+    return render(request, 'dashboard/reports.html', context)
+
+
+# --- INBOUND FORECAST VIEW ---
+@login_required
+@active_role_required
+def forecast_view(request):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in ['super_admin', 'warehouse_admin', 'warehouse_manager']:
+        messages.error(request, "You do not have permission to view this page.")
+        return redirect('dashboard')
+
+    warehouses = None
+    if active_role_name == 'super_admin':
+        warehouses = Warehouse.objects.order_by('name')
+        warehouse_id = request.GET.get('warehouse')
+        warehouse = get_object_or_404(Warehouse, pk=warehouse_id) if warehouse_id else warehouses.first()
+    else:
+        warehouse = active_assignment.warehouse
+
+    result = forecast.forecast(warehouse.id) if warehouse else None
+
+    context = {
+        'page_title': 'Inbound Forecast',
+        'user': request.user,
+        'warehouse': warehouse,
+        'warehouses': warehouses,
+        'forecast': result,
+        'active_assignment': active_assignment
+    }
+    return render(request, 'dashboard/forecast.html', context)
+
+
+# --- ANALYTICS VIEW (vectorised, see dashboard/analytics.py) ---
+@login_required
+@active_role_required
+def analytics_view(request):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    if active_role_name not in ['super_admin', 'warehouse_admin', 'warehouse_manager']:
+        messages.error(request, "You do not have permission to view this page.")
+        return redirect('dashboard')
+
+    try:
+        days = max(1, min(int(request.GET.get('days', 90)), 730))
+    except ValueError:
+        days = 90
+    until = timezone.now()
+    since = until - timedelta(days=days)
+
+    orders_query = OrderFulfillment.objects.filter(created_at__gte=since)
+    events_query = OrderStatusEvent.objects.filter(at__gte=since)
+    if active_role_name != 'super_admin':
+        orders_query = orders_query.filter(store__warehouse=active_assignment.warehouse)
+        events_query = events_query.filter(warehouse=active_assignment.warehouse)
+
+    orders = analytics.extract_orders(orders_query)
+    events = analytics.extract_events(events_query)
+
+    dwell = analytics.dwell_percentiles(events)
+    late = analytics.late_delivery_rates(orders, events)
+    out_of_stock = analytics.out_of_stock_rates(orders)
+    throughput = analytics.store_throughput(orders, since.timestamp(), until.timestamp())
+
+    # Only the handful of ids that made it into the tables need names.
+    product_names = dict(Product.objects.filter(
+        id__in=[row['product_id'] for row in out_of_stock]
+    ).values_list('id', 'product_name'))
+    store_names = dict(Store.objects.filter(
+        id__in=[row['store_id'] for row in throughput]
+    ).values_list('id', 'store_name'))
+    warehouse_names = dict(Warehouse.objects.filter(
+        id__in=list(late['per_warehouse'])
+    ).values_list('id', 'name'))
+    for row in out_of_stock:
+        row['name'] = product_names.get(row['product_id'], 'N/A')
+    for row in throughput:
+        row['name'] = store_names.get(row['store_id'], 'N/A')
+
+    context = {
+        'page_title': 'Analytics',
+        'user': request.user,
+        'days': days,
+        'order_count': len(orders['id']),
+        'dwell_rows': [
+            {'label': analytics.STATUS_LABELS[code], **stats} for code, stats in dwell.items()
+        ],
+        'late': late,
+        'late_rows': [
+            {'name': warehouse_names.get(warehouse_id, 'N/A'), **stats}
+            for warehouse_id, stats in late['per_warehouse'].items()
+        ],
+        'out_of_stock_rows': out_of_stock,
+        'throughput_rows': throughput,
+        'active_assignment': active_assignment
+    }
+    return render(request, 'dashboard/analytics.html', context)
+
+
+# --- BACKGROUND JOBS ---
+@login_required
+@active_role_required
+def jobs_view(request):
+    active_assignment = request.active_assignment
+    active_role_name = getattr(active_assignment.role, 'name', None)
+
+    jobs_query = Job.objects.select_related('created_by')
+    # Super Admin sees every job; everyone else only what they started
+    if active_role_name != 'super_admin':
+        jobs_query = jobs_query.filter(created_by=request.user)
+
+    status = request.GET.get('status')
+    if status:
+        jobs_query = jobs_query.filter(status=status)
+
+    context = {
+        'page_title': 'Background Jobs',
+        'user': request.user,
+        'jobs': jobs_query.order_by('-created_at')[:100],
+        'status': status or '',
+        'status_choices': Job.STATUS_CHOICES,
+        'active_assignment': active_assignment
+    }
+    return render(request, 'dashboard/jobs.html', context)
+
+@login_required
+@active_role_required
+def job_status_api(request):
+    """GET ?ids=1,2,3 -> progress of those jobs, for the live progress bars."""
+    active_role_name = getattr(request.active_assignment.role, 'name', None)
+    try:
+        ids = [int(i) for i in request.GET.get('ids', '').split(',') if i]
+    except ValueError:
+        return JsonResponse({'error': 'ids must be integers.'}, status=400)
+
+    jobs_query = Job.objects.filter(id__in=ids[:100])
+    if active_role_name != 'super_admin':
+        jobs_query = jobs_query.filter(created_by=request.user)
+
+    return JsonResponse({'jobs': [
+        {
+            'id': job.id,
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'percent': job.percent,
+            'progress_done': job.progress_done,
+            'progress_total': job.progress_total,
+            'progress_message': job.progress_message,
+            'error': job.error,
+        }
+        for job in jobs_query
+    ]})
+
 # --- DELETE USER VIEW ---
 @login_required
 def delete_user_view(request, pk):
@@ -958,8 +1549,9 @@ def delete_store_view(request, pk):
 
     try:
         store = get_object_or_404(Store, pk=pk)
-        store.delete()
-        messages.success(request, f"Store {store.store_name} deleted successfully.")
+        # Hidden right away; dependents are detached in the background
+        soft_delete(store, request.user)
+        messages.success(request, f"Store {store.store_name} deleted. Its orders are being detached in the background (see Background Jobs).")
     except Exception as e:
         messages.error(request, f"Error deleting store: {e}")
 
@@ -975,8 +1567,9 @@ def delete_warehouse_view(request, pk):
 
     try:
         warehouse = get_object_or_404(Warehouse, pk=pk)
-        warehouse.delete()
-        messages.success(request, f"Warehouse {warehouse.name} deleted successfully.")
+        # Hidden right away; stores and dependents are purged in the background
+        soft_delete(warehouse, request.user)
+        messages.success(request, f"Warehouse {warehouse.name} deleted. Its stores and orders are being cleaned up in the background (see Background Jobs).")
     except Exception as e:
         messages.error(request, f"Error deleting warehouse: {e}")
 
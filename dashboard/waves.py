@@ -0,0 +1,135 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import OrderFulfillment, PickWave
+from .transitions import bulk_transition
+
+# ---------------------------------
+# PICK WAVES
+# ---------------------------------
+# Selected ready-to-ship orders are grouped by (location, product, store) -
+# one pick-list line per group - and the lines are laid out along the pick
+# path (bin zone and sequence, as used by putaway; orders without a bin come
+# last). Waves are cut from that path next-fit: lines join the current wave
+# until the next one would overflow the cart, so every wave covers one
+# stretch of the floor. Only a line larger than a whole cart is split, order
+# by order, over as many waves as it fills. Planning is one sort and one
+# pass; saving is one INSERT for the waves and one UPDATE per wave.
+
+
+def plan_waves(rows, max_units):
+    """
+    `rows` yields (order_id, quantity, location, product_id, store_id), where
+    location is a sortable pick-path key or None. Returns the waves in
+    walking order, each a list of order ids.
+    """
+    groups = defaultdict(lambda: [0, []])
+    for order_id, quantity, location, product_id, store_id in rows:
+        group = groups[(location is None, location or (), product_id or 0, store_id or 0)]
+        group[0] += quantity
+        group[1].append((order_id, quantity))
+
+    waves = []
+    units = 0
+    for key in sorted(groups):
+        group_units, orders = groups[key]
+        if group_units <= max_units:
+            # The whole line goes in one wave: this one if it fits, else the next
+            if not waves or units + group_units > max_units:
+                waves.append([])
+                units = 0
+            waves[-1].extend(order_id for order_id, _ in orders)
+            units += group_units
+            continue
+        for order_id, quantity in orders:
+            if not waves or (units and units + quantity > max_units):
+                waves.append([])
+                units = 0
+            waves[-1].append(order_id)
+            units += quantity
+    return waves
+
+
+@transaction.atomic
+def create_waves(orders, user=None, max_units=None):
+    """
+    Plan and save waves for the ready-to-ship orders in `orders` that are
+    not in an open wave already and have units to pick. Orders of different
+    warehouses never share a wave. Returns the waves created.
+    """
+    max_units = max_units or settings.PICK_WAVE_MAX_UNITS
+    rows = (
+        orders.select_for_update(of=('self',))
+        .filter(status='ready_to_ship', store__isnull=False, quantity__gt=0)
+        .exclude(wave__status='open')
+        .values_list(
+            'id', 'quantity', 'store__warehouse_id', 'bin__zone', 'bin__sequence', 'bin__code',
+            'product_id', 'store_id',
+        )
+    )
+    by_warehouse = defaultdict(list)
+    for order_id, quantity, warehouse_id, zone, sequence, code, product_id, store_id in rows:
+        location = (zone, sequence, code) if code is not None else None
+        by_warehouse[warehouse_id].append((order_id, quantity, location, product_id, store_id))
+
+    quantities = {row[0]: row[1] for warehouse_rows in by_warehouse.values() for row in warehouse_rows}
+    planned = [
+        (warehouse_id, order_ids)
+        for warehouse_id, warehouse_rows in sorted(by_warehouse.items())
+        for order_ids in plan_waves(warehouse_rows, max_units)
+    ]
+    waves = PickWave.objects.bulk_create([
+        PickWave(
+            warehouse_id=warehouse_id, order_count=len(order_ids),
+            unit_count=sum(quantities[order_id] for order_id in order_ids), created_by=user,
+        )
+        for warehouse_id, order_ids in planned
+    ])
+    for wave, (_, order_ids) in zip(waves, planned):
+        OrderFulfillment.objects.filter(id__in=order_ids).update(wave=wave)
+    return waves
+
+
+def pick_list(wave):
+    """
+    The wave's pick lines in walking order - units per (bin, product, store)
+    - and the units per product across the whole wave.
+    """
+    lines = list(
+        wave.orders.values(
+            'bin__code', 'bin__zone', 'product__code', 'product__product_name', 'store__store_name',
+        )
+        .annotate(units=Sum('quantity'), orders=Count('id'))
+        .order_by(
+            F('bin__zone').asc(nulls_last=True), F('bin__sequence').asc(nulls_last=True), 'bin__code',
+            'product__code', 'store__store_name',
+        )
+    )
+    totals = defaultdict(int)
+    names = {}
+    for line in lines:
+        totals[line['product__code']] += line['units']
+        names[line['product__code']] = line['product__product_name']
+    products = sorted(
+        ((code, names[code], units) for code, units in totals.items()),
+        key=lambda product: (-product[2], product[0] or ''),
+    )
+    return lines, products
+
+
+@transaction.atomic
+def complete_wave(wave_id, user=None):
+    """Complete every order still ready to ship in an open wave; returns how many moved."""
+    wave = PickWave.objects.select_for_update().get(pk=wave_id)
+    if wave.status != 'open':
+        return 0
+    moved = bulk_transition(wave.orders.filter(status='ready_to_ship'), 'completed', user)
+    wave.status = 'completed'
+    wave.completed_by = user
+    wave.completed_at = timezone.now()
+    wave.save(update_fields=['status', 'completed_by', 'completed_at'])
+    return moved
@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import jobs
+from .models import WebhookDelivery, WebhookSubscription
+
+# ---------------------------------
+# OUTBOUND WEBHOOKS
+# ---------------------------------
+# Status changes are written to a WebhookDelivery outbox in the same
+# transaction as the transition itself (transitions.py calls
+# record_events), so a subscriber sees an event if and only if it
+# committed. Nothing is sent from the request, and nothing is queued from
+# it either: the deliver_webhooks job runs on its JOB_SCHEDULES entry
+# (every minute) and POSTs each subscriber's backlog in batches, one thread per subscriber, so
+# a slow or failing endpoint only delays itself. Failed batches are retried
+# with the job queue's backoff, up to MAX_ATTEMPTS.
+#
+# Each POST carries:
+#     X-Webhook-Timestamp: <unix seconds>
+#     X-Webhook-Signature: sha256=<hex HMAC-SHA256 of "<timestamp>.<body>" keyed with the secret>
+
+SUBSCRIPTIONS_CACHE_KEY = 'webhooks:subscriptions'
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+TIMEOUT = 10
+DELIVERY_WORKERS = 8
+# A claimed batch is hidden from other workers this long; if the worker
+# dies mid-POST the batch simply becomes due again.
+LEASE = timedelta(seconds=TIMEOUT * 3)
+
+
+def active_subscriptions():
+    subscriptions = cache.get(SUBSCRIPTIONS_CACHE_KEY)
+    if subscriptions is None:
+        subscriptions = list(WebhookSubscription.objects.filter(is_active=True))
+        cache.set(SUBSCRIPTIONS_CACHE_KEY, subscriptions)
+    return subscriptions
+
+
+def record_events(events):
+    """Queue deliveries of saved OrderStatusEvents; call inside the transition's transaction."""
+    subscriptions = active_subscriptions()
+    if not subscriptions:
+        return 0
+    deliveries = [
+        WebhookDelivery(subscription_id=subscription.pk, event_id=event.pk)
+        for event in events
+        for subscription in subscriptions
+        if subscription.wants(event)
+    ]
+    WebhookDelivery.objects.bulk_create(deliveries)
+    return len(deliveries)
+
+
+# --- Delivery ---
+
+def sign(secret, timestamp, body):
+    message = f"{timestamp}.".encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _payload(delivery):
+    event = delivery.event
+    order = event.order
+    return {
+        'event_id': event.pk,
+        'order_id': event.order_id,
+        'status': event.status,
+        'previous_status': event.previous_status,
+        'at': event.at.isoformat(),
+        'warehouse_id': event.warehouse_id,
+        'store_id': event.store_id,
+        'amazon_order_id': order.amazon_order_id,
+        'supplier_order_id': order.supplier_order_id,
+        'tracker_id': order.tracker_id,
+        'quantity': order.quantity,
+    }
+
+
+def _claim(subscription_id):
+    """Lease the next batch of due deliveries for one subscriber."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            WebhookDelivery.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(subscription_id=subscription_id, status='queued', next_attempt_at__lte=now)
+            .select_related('event__order')
+            .order_by('next_attempt_at', 'id')[:BATCH_SIZE]
+        )
+        WebhookDelivery.objects.filter(pk__in=[d.pk for d in batch]).update(next_attempt_at=now + LEASE)
+    return batch
+
+
+def post(subscription, deliveries):
+    body = json.dumps({'deliveries': [_payload(d) for d in deliveries]}).encode()
+    timestamp = str(int(time.time()))
+    request = urllib.request.Request(subscription.url, data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        'User-Agent': 'Warehouse360 webhooks',
+        'X-Webhook-Timestamp': timestamp,
+        'X-Webhook-Signature': sign(subscription.secret, timestamp, body),
+    })
+    # urlopen raises HTTPError (an OSError) for non-2xx answers
+    with urllib.request.urlopen(request, timeout=TIMEOUT):
+        pass
+
+
+def deliver_subscription(subscription):
+    """Send one subscriber's due backlog until it is empty or a batch fails."""
+    sent = 0
+    try:
+        while batch := _claim(subscription.pk):
+            ids = [d.pk for d in batch]
+            try:
+                post(subscription, batch)
+            except (OSError, ValueError) as e:
+                attempts = max(d.attempts for d in batch) + 1
+                pending = WebhookDelivery.objects.filter(pk__in=ids)
+                pending.update(
+                    attempts=F('attempts') + 1,
+                    last_error=f"{type(e).__name__}: {e}"[:1000],
+                    next_attempt_at=timezone.now() + jobs.retry_delay(attempts),
+                )
+                pending.filter(attempts__gte=MAX_ATTEMPTS).update(status='failed')
+                break
+            WebhookDelivery.objects.filter(pk__in=ids).update(
+                status='delivered', delivered_at=timezone.now(), last_error='',
+            )
+            sent += len(batch)
+    finally:
+        connection.close()
+    return sent
+
+
+def deliver(report=None):
+    """Deliver every due backlog, subscribers in parallel. Returns the number of events sent."""
+    due = set(
+        WebhookDelivery.objects.filter(status='queued', next_attempt_at__lte=timezone.now())
+        .values_list('subscription_id', flat=True).distinct()
+    )
+    subscriptions = list(WebhookSubscription.objects.filter(pk__in=due, is_active=True))
+    if not subscriptions:
+        return 0
+    sent = 0
+    with ThreadPoolExecutor(max_workers=min(DELIVERY_WORKERS, len(subscriptions)), thread_name_prefix='webhooks') as pool:
+        for done, count in enumerate(pool.map(deliver_subscription, subscriptions), start=1):
+            sent += count
+            if report:
+                report(done, len(subscriptions), sent)
+    return sent
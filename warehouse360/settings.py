@@ -49,6 +49,8 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Writes each request's audit entries in one INSERT (dashboard/audit.py)
+    'dashboard.audit.AuditMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -67,6 +69,13 @@ TEMPLATES = [
             ],
         },
     },
+    {
+        # Hot paths only (e.g. dashboard/jinja2/dashboard/order_rows.html)
+        'NAME': 'jinja2',
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+    },
 ]
 
 WSGI_APPLICATION = 'warehouse360.wsgi.application'
@@ -87,6 +96,126 @@ DATABASES = {
 }
 
 
+# Cache & sessions
+# FileBasedCache lists its whole directory on every write (to cull), so
+# each alias is kept small:
+# - 'default' is shared by every worker process, without an external
+#   service: forecasts, bin-index versions, webhook subscriptions.
+# - 'sessions' holds only sessions. They are read from the cache first and
+#   fall back to django_session on a miss, so culling costs a query, not a
+#   logout. Expired rows are dropped by the scheduled purge_sessions job.
+# - 'auth' is per process, in memory: the user and assignment lookups
+#   made on every request (see dashboard/backends.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'TIMEOUT': 60 * 15,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'session_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
+AUTHENTICATION_BACKENDS = [
+    'dashboard.backends.CachedModelBackend',
+]
+
+# Store-manager digests of out-of-stock / ready-to-ship orders
+# (dashboard/digests.py) go out once per window.
+DIGEST_WINDOW_SECONDS = 15 * 60
+
+# Background jobs
+# Run `manage.py run_workers`; periodic jobs below are enqueued by the
+# workers themselves (seconds between runs).
+
+JOB_SCHEDULES = {
+    'refresh-rollups': {'job': 'refresh_rollups', 'every': 5 * 60},
+    'purge-sessions': {'job': 'purge_sessions', 'every': 60 * 60},
+    'poll-carriers': {'job': 'poll_carriers', 'every': 5 * 60},
+    # Sends new webhook events and due retries; transitions don't queue runs
+    'deliver-webhooks': {'job': 'deliver_webhooks', 'every': 60},
+    'store-digests': {'job': 'send_digests', 'every': DIGEST_WINDOW_SECONDS},
+}
+
+# Carrier tracking (dashboard/tracking.py). The first carrier whose
+# `pattern` matches an order's tracker_id checks it; `client` defaults to
+# dashboard.tracking.JsonHttpCarrierClient, other keys go to the client.
+# For example:
+#     'ups': {
+#         'pattern': r'^1Z', 'url': 'https://tracking.example/ups/{tracker_id}',
+#         'concurrency': 8, 'rate_per_second': 20,
+#     },
+
+TRACKING_CARRIERS = {}
+
+
+# Shipping labels
+# Remote shipping_label_url files are copied to LABEL_STORAGE_ROOT (named by
+# their SHA-256) by the fetch_labels job. Behind nginx/Apache set
+# LABEL_SENDFILE_HEADER to 'X-Accel-Redirect' (with an internal location
+# at LABEL_SENDFILE_PREFIX aliased to LABEL_STORAGE_ROOT) or 'X-Sendfile'
+# so the web server streams the file instead of Django.
+
+LABEL_STORAGE_ROOT = BASE_DIR / 'labels'
+LABEL_FETCH_WORKERS = 8
+LABEL_SENDFILE_HEADER = None
+LABEL_SENDFILE_PREFIX = '/protected-labels/'
+# Label and product-image downloads refuse private, loopback and link-local
+# addresses; only enable this for local development against a stand-in host.
+FETCH_ALLOW_PRIVATE_ADDRESSES = False
+
+
+# Product image thumbnails (dashboard/thumbnails.py): originals are kept
+# under THUMBNAIL_STORAGE_ROOT/originals, THUMBNAIL_SIZE is in pixels.
+
+THUMBNAIL_STORAGE_ROOT = BASE_DIR / 'thumbnails'
+THUMBNAIL_SIZE = 120
+
+
+# Pick waves (dashboard/waves.py): how many units one picker's cart takes
+# unless the planner asks for another size.
+
+PICK_WAVE_MAX_UNITS = 200
+
+
+# Batch printing (dashboard/printing.py): up to PRINT_BATCH_STREAM_LIMIT
+# orders stream straight to the browser; larger batches are built by the
+# build_print_batch job into PRINT_BATCH_ROOT and kept for a day.
+
+PRINT_BATCH_ROOT = BASE_DIR / 'print_batches'
+PRINT_BATCH_STREAM_LIMIT = 50
+
+
+# Email
+# Development points at a local SMTP stand-in, e.g.
+#     python -m aiosmtpd -n -l localhost:1025
+# SITE_URL is used for links in emails sent from background jobs.
+
+EMAIL_HOST = 'localhost'
+EMAIL_PORT = 1025
+DEFAULT_FROM_EMAIL = 'Warehouse360 <no-reply@warehouse360.local>'
+SITE_URL = 'http://localhost:8000'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 